@@ -0,0 +1,128 @@
+"""
+Run the whole benchmark suite and write one JSON document, optionally
+comparing it with an earlier run (exit status 1 if anything regressed or
+a benchmark failed).
+
+    python -m benchmarks --out results.json
+    python -m benchmarks --quick --compare baseline.json --threshold 0.15
+    python -m benchmarks --only extract,prices
+
+Absolute numbers depend on the machine; compare runs from the same host.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.compare import compare
+
+# name -> (module, full-run kwargs, --quick kwargs)
+SUITE = {
+    "prices": ("benchmarks.bench_prices", {"count": 200000}, {"count": 20000}),
+    "auth": ("benchmarks.bench_auth", {"requests": 20000}, {"requests": 2000}),
+    "login": ("benchmarks.bench_login", {"logins": 64, "concurrency": 32, "rounds": 10}, {"logins": 16, "concurrency": 8, "rounds": 6}),
+    "extract": ("benchmarks.bench_extract", {"seconds": 1.0}, {"seconds": 0.2, "sizes": ("small", "large")}),
+    "classify": ("benchmarks.bench_classify", {"items": 20000, "batch": 1000}, {"items": 2000, "batch": 500}),
+    "outfits": ("benchmarks.bench_outfits", {"sizes": "1000,3000,5000", "repeats": 20}, {"sizes": "1000,3000", "repeats": 5}),
+    "search": ("benchmarks.bench_search", {"sizes": "1000,5000", "repeats": 3}, {"sizes": "1000", "repeats": 2}),
+    "api": (
+        "benchmarks.bench_api",
+        {"requests": 300, "concurrency": 32, "bcrypt_rounds": 10},
+        {"requests": 60, "concurrency": 8, "wardrobe": 300, "bcrypt_rounds": 6},
+    ),
+}
+# Benchmarks that accept a Mongo backend
+USES_MONGO = {"extract", "search", "api"}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _cli_args(kwargs: dict) -> list:
+    args = []
+    for key, value in kwargs.items():
+        if isinstance(value, (tuple, list)):
+            value = ",".join(value)
+        args += [f"--{key.replace('_', '-')}", str(value)]
+    return args
+
+
+def _run_one(name: str, quick: bool, mongo_uri: str) -> dict:
+    # Each benchmark gets a fresh interpreter: no shared event loops, Motor
+    # clients or caches between them, and memory figures aren't skewed
+    module, full, fast = SUITE[name]
+    kwargs = dict(fast if quick else full)
+    if name in USES_MONGO and mongo_uri:
+        kwargs["mongo_uri"] = mongo_uri
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-m", module, *_cli_args(kwargs)],
+        capture_output=True, text=True, env={**os.environ, "LOG_LEVEL": "WARNING"},
+    )
+    if proc.returncode != 0:
+        return {"benchmark": name, "error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+    result = json.loads(proc.stdout)
+    result["wall_s"] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(SUITE), help="comma-separated subset of: " + ", ".join(SUITE))
+    parser.add_argument("--quick", action="store_true", help="smaller runs, for a fast sanity check")
+    parser.add_argument("--mongo-uri", default=None, help="local mongod instead of the in-memory stand-in")
+    parser.add_argument("--out", default=None, help="write results here as well as stdout")
+    parser.add_argument("--compare", default=None, help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SUITE]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": args.quick,
+        },
+        "results": {},
+    }
+    for name in names:
+        print(f"running {name}...", file=sys.stderr)
+        results["results"][name] = _run_one(name, args.quick, args.mongo_uri)
+
+    # A benchmark that crashed counts as a regression too
+    regressed = any("error" in result for result in results["results"].values())
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report = compare(baseline.get("results", {}), results["results"], args.threshold)
+        results["comparison"] = {"baseline_commit": baseline.get("meta", {}).get("commit"), **report}
+        regressed = regressed or bool(report["regressions"])
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
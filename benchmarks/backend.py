@@ -0,0 +1,47 @@
+"""
+Point database.py at a benchmark backend before any app module binds its
+collections: a local mongod (--mongo-uri, a throwaway database) or, by
+default, the in-memory mongomock-motor stand-in (pip install mongomock-motor).
+
+Must be called before importing main, routes.* or utils modules that do
+`from database import ..._collection`.
+"""
+
+import os
+import uuid
+
+
+def use_backend(mongo_uri: str = None) -> str:
+    import database
+
+    # Background loops would compete with the measured work
+    os.environ.setdefault("RENDERED_SCRAPING", "0")
+    os.environ.setdefault("PRICE_REFRESH", "0")
+    # utils.token_utils refuses to start without a signing key
+    os.environ.setdefault("SECRET_KEY", uuid.uuid4().hex)
+
+    if mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongo_uri)
+        db = client[f"wardrobe_bench_{uuid.uuid4().hex[:8]}"]
+        label = "mongod"
+    else:
+        try:
+            import mongomock_motor
+        except ImportError:
+            raise SystemExit("In-memory backend needs mongomock-motor (or pass --mongo-uri)")
+        client = mongomock_motor.AsyncMongoMockClient()
+        db = client.wardrobe_db
+        label = "mongomock"
+
+    database.client = client
+    database.db = db
+    for name in list(vars(database)):
+        if name.endswith("_collection"):
+            setattr(database, name, db[getattr(database, name).name])
+    return label
+
+
+async def drop_backend():
+    import database
+    await database.client.drop_database(database.db.name)
@@ -0,0 +1,203 @@
+"""
+In-process load generator for the API: requests go through httpx's ASGI
+transport straight into main.app (no sockets), against the in-memory Motor
+stand-in or a local mongod. Product URLs point at a local fixture server, so
+the background scrapes that /save-item/ queues are real but offline.
+
+Scenarios:
+  save_item   POST /save-item/ with unique URLs, then time until the queue drains
+  list_items  GET  /items/{users_id}/ownership/wishlist, spread over every page
+  login       POST /token/ for pre-registered users
+
+    python -m benchmarks.bench_api --requests 500 --concurrency 32
+    python -m benchmarks.bench_api --mongo-uri mongodb://localhost:27017
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.backend import drop_backend, use_backend
+from benchmarks.corpus import FixtureServer, load_corpus
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def load(request, total: int, concurrency: int) -> dict:
+    """Run request(i) total times, at most concurrency at once; summarize latency."""
+    latencies = []
+    statuses = {}
+    next_index = iter(range(total))
+
+    async def worker():
+        for i in next_index:
+            start = time.perf_counter()
+            status = await request(i)
+            latencies.append(time.perf_counter() - start)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "requests_per_sec": round(total / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "statuses": statuses,
+    }
+
+
+async def _wait_for_queue(items_collection, users_id: str, timeout: float = 120) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if not await items_collection.count_documents({"users_id": users_id, "status": "pending"}):
+            break
+        await asyncio.sleep(0.05)
+    return time.perf_counter() - start
+
+
+async def _seed_wardrobe(items_collection, users_id: str, count: int):
+    now = datetime.utcnow()
+    await items_collection.insert_many([
+        {
+            "users_id": users_id,
+            "source": f"https://shop.example/p/{i}",
+            "ownership": "wishlist",
+            "status": "ready",
+            "title": f"Seeded item {i}",
+            "price": f"£{i % 300}.00",
+            "price_amount": (i % 300) * 100,
+            "price_currency": "GBP",
+            "image_url": f"https://cdn.example/{i}.jpg",
+            "site_name": "shop.example",
+            "images": [],
+            "created_at": now - timedelta(seconds=i),
+        }
+        for i in range(count)
+    ])
+
+
+async def _run(requests: int, concurrency: int, wardrobe: int, logins: int, page_size: int) -> dict:
+    import httpx
+
+    import database
+    from main import app, shutdown_event, startup_event
+    from utils.auth import issue_token
+
+    corpus = load_corpus(("small", "medium"))
+    results = {}
+    await startup_event()
+    try:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+        with FixtureServer(corpus) as server:
+            saver = "bench-saver"
+            headers = {"Authorization": f"Bearer {issue_token(saver)['access_token']}"}
+            pages = list(corpus)
+
+            async def save(i):
+                response = await client.post("/save-item/", headers=headers, json={
+                    "url": server.url(pages[i % len(pages)], f"v={i}"),
+                    "users_id": saver,
+                    "ownership": "wishlist",
+                })
+                return response.status_code
+
+            results["save_item"] = await load(save, requests, concurrency)
+            drain = await _wait_for_queue(database.items_collection, saver)
+            results["save_item"]["queue_drain_s"] = round(drain, 3)
+            results["save_item"]["scrapes_per_sec"] = round(requests / drain, 1) if drain else None
+
+        lister = "bench-lister"
+        await _seed_wardrobe(database.items_collection, lister, wardrobe)
+        list_headers = {"Authorization": f"Bearer {issue_token(lister)['access_token']}"}
+        url = f"/items/{lister}/ownership/wishlist"
+
+        # Collect every page's cursor once so requests can hit deep pages directly
+        cursors = [None]
+        while True:
+            params = {"limit": page_size, **({"cursor": cursors[-1]} if cursors[-1] else {})}
+            cursor = (await client.get(url, headers=list_headers, params=params)).headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            cursors.append(cursor)
+
+        async def list_page(i):
+            cursor = cursors[i % len(cursors)]
+            params = {"limit": page_size, **({"cursor": cursor} if cursor else {})}
+            return (await client.get(url, headers=list_headers, params=params)).status_code
+
+        results["list_items"] = await load(list_page, requests, concurrency)
+        results["list_items"].update({"wardrobe_size": wardrobe, "page_size": page_size})
+
+        for i in range(logins):
+            await client.post("/register/", json={
+                "email": f"bench{i}@example.com", "username": f"bench{i}", "password": "correct horse",
+            })
+
+        async def login(i):
+            response = await client.post("/token/", json={
+                "email_or_username": f"bench{i % logins}", "password": "correct horse",
+            })
+            return response.status_code
+
+        results["login"] = await load(login, requests, concurrency)
+        await client.aclose()
+    finally:
+        await shutdown_event()
+    return results
+
+
+def run(requests: int = 300, concurrency: int = 32, wardrobe: int = 2000, logins: int = 20,
+        page_size: int = 50, mongo_uri: str = None, bcrypt_rounds: int = None) -> dict:
+    if bcrypt_rounds:
+        # Read by utils.passwords at import, so set it before anything imports it
+        os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+    backend = use_backend(mongo_uri)
+    from utils.passwords import BCRYPT_ROUNDS
+
+    async def go():
+        try:
+            return await _run(requests, concurrency, wardrobe, logins, page_size)
+        finally:
+            if mongo_uri:
+                await drop_backend()
+
+    return {
+        "benchmark": "api",
+        "backend": backend,
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+        **asyncio.run(go()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--wardrobe", type=int, default=2000, help="items seeded for list_items")
+    parser.add_argument("--logins", type=int, default=20, help="distinct users for login")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--mongo-uri", default=None, help="local mongod instead of the in-memory stand-in")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="override BCRYPT_ROUNDS for login")
+    args = parser.parse_args()
+    print(json.dumps(run(
+        args.requests, args.concurrency, args.wardrobe, args.logins, args.page_size, args.mongo_uri,
+        args.bcrypt_rounds,
+    ), indent=2))
+
+
+if __name__ == "__main__":
+    main()
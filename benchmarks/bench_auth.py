@@ -0,0 +1,68 @@
+"""
+Per-request auth overhead: verifying a bearer token with a full signature
+check vs a hit in utils.token_utils' verified-token cache, plus the whole
+get_current_user_id dependency as routes run it.
+
+    python -m benchmarks.bench_auth --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+# utils.token_utils refuses to load without a signing key; any will do here
+os.environ.setdefault("SECRET_KEY", uuid.uuid4().hex)
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from utils import token_utils
+from utils.auth import get_current_user_id, issue_token
+
+
+def _per_call_us(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return round((time.perf_counter() - start) / n * 1e6, 2)
+
+
+def run(requests: int) -> dict:
+    token = issue_token("64b7f0c2a1b2c3d4e5f60718")["access_token"]
+
+    def uncached():
+        token_utils._verified.clear()
+        token_utils.decode_access_token(token)
+
+    def cached():
+        token_utils.decode_access_token(token)
+
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    loop = asyncio.new_event_loop()
+
+    def dependency():
+        loop.run_until_complete(get_current_user_id(creds))
+
+    token_utils.decode_access_token(token)
+    result = {
+        "benchmark": "auth",
+        "requests": requests,
+        "signature_check_us": _per_call_us(uncached, requests),
+        "cache_hit_us": _per_call_us(cached, requests),
+        "dependency_cached_us": _per_call_us(dependency, requests),
+    }
+    loop.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Item classification cost (utils.classifier): microseconds per item when
+items are classified one at a time (save_item) and in batches (scrape
+completion bursts, the backfill), plus accuracy on a small hand-labelled
+sample of real-looking titles and product URLs.
+
+Uses the default taxonomy; no database needed.
+
+    python -m benchmarks.bench_classify --items 20000 --batch 1000
+"""
+
+import argparse
+import json
+import random
+import time
+
+LABELLED = [
+    ("Relaxed Linen Shirt", "https://www.cos.com/en_gbp/women/shirts/product.relaxed-linen-shirt-white.1234.html", "Tops", "Shirts"),
+    ("Organic Cotton Crew Neck T-Shirt", "https://www.arket.com/en_gb/women/t-shirts/product.crew-neck-t-shirt.html", "Tops", "T-shirts"),
+    ("Merino Wool Crew Neck Jumper", "https://www.uniqlo.com/uk/en/products/E450535-000", "Tops", "Knitwear"),
+    ("Chunky Cable Knit Cardigan in Cream", "https://www.asos.com/asos-design/chunky-cable-cardigan/prd/2011", "Tops", "Knitwear"),
+    ("Wide Leg Tailored Trousers", "https://www.zara.com/uk/en/wide-leg-trousers-p0123.html", "Bottoms", "Trousers"),
+    ("The Way-High Jean", "https://www.everlane.com/products/womens-way-high-jean-vintage-blue", "Bottoms", "Jeans"),
+    ("90s Straight Leg Denim", "https://www.weekday.com/en_gbp/women/jeans/product.90s-straight.html", "Bottoms", "Jeans"),
+    ("Pleated Satin Midi Skirt", "https://www.mango.com/gb/women/skirts-midi/pleated-satin-skirt_1234.html", "Bottoms", "Skirts"),
+    ("Denim Bermuda Shorts", "https://www.hm.com/en_gb/productpage.1234.html", "Bottoms", "Shorts"),
+    ("Linen Midi Shirt Dress", "https://www.cos.com/en_gbp/women/dresses/product.linen-shirt-dress.html", "Dresses", "Dresses"),
+    ("Bias Cut Satin Slip Dress", "https://www.reformation.com/products/slip-dress", "Dresses", "Dresses"),
+    ("Utility Cotton Jumpsuit", "https://www.asos.com/topshop/utility-jumpsuit/prd/5678", "Dresses", "Jumpsuits"),
+    ("Classic Belted Trench Coat", "https://www.burberry.com/the-kensington-heritage-trench-coat-p80456.html", "Outerwear", "Coats"),
+    ("Recycled Down Puffer", "https://www.arket.com/en_gb/women/jackets-coats/product.down-puffer.html", "Outerwear", "Coats"),
+    ("Single-Breasted Wool Blazer", "https://www.zara.com/uk/en/wool-blazer-p0789.html", "Outerwear", "Jackets"),
+    ("Suede Bomber Jacket", "https://www.allsaints.com/women/leather/suede-bomber-jacket/", "Outerwear", "Jackets"),
+    ("Samba OG Shoes", "https://www.adidas.co.uk/samba-og-shoes/B75806.html", "Shoes", "Trainers"),
+    ("Air Force 1 '07 Sneakers", "https://www.nike.com/gb/t/air-force-1-07-shoes", "Shoes", "Trainers"),
+    ("Leather Chelsea Boots", "https://www.drmartens.com/uk/en_gb/2976-leather-chelsea-boots/p/22227001", "Shoes", "Boots"),
+    ("Pointed Slingback Heels", "https://www.manolo.com/slingback-heels", "Shoes", "Heels"),
+    ("Penny Loafers in Black Leather", "https://www.gh-bass.com/weejuns-penny-loafers", "Shoes", "Flats"),
+    ("Leather Strappy Sandals", "https://www.ancient-greek-sandals.com/products/strappy", "Shoes", "Sandals"),
+    ("Oversized Canvas Tote", "https://www.cos.com/en_gbp/women/bags/product.canvas-tote.html", "Bags", "Bags"),
+    ("Mini Crossbody Bag", "https://www.charleskeith.com/gb/mini-crossbody-bag.html", "Bags", "Bags"),
+    ("Gold Hoop Earrings", "https://www.missoma.com/products/gold-hoop-earrings", "Accessories", "Jewellery"),
+    ("Ribbed Wool Beanie", "https://www.acnestudios.com/uk/en/ribbed-beanie/", "Accessories", "Hats"),
+    ("Cashmere Scarf in Camel", "https://www.johnstonsofelgin.com/cashmere-scarf", "Accessories", "Scarves"),
+    ("Leather Belt with Gold Buckle", "https://www.toteme-studio.com/products/belt", "Accessories", "Belts"),
+    ("Cat Eye Sunglasses", "https://www.ray-ban.com/uk/sunglasses/cat-eye", "Accessories", "Sunglasses"),
+]
+
+
+def _default_tree() -> list:
+    from utils.taxonomy import DEFAULT_TAXONOMY
+
+    return [
+        {"name": category, "keywords": [], "subcategories": [
+            {"name": name, "keywords": keywords} for name, keywords in subcategories.items()
+        ]}
+        for category, subcategories in DEFAULT_TAXONOMY.items()
+    ]
+
+
+def _synthetic_items(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        {"title": title, "source": url}
+        for title, url, _, _ in (rng.choice(LABELLED) for _ in range(count))
+    ]
+
+
+def run(items: int = 20000, batch: int = 1000) -> dict:
+    from utils.classifier import Classifier
+
+    start = time.perf_counter()
+    classifier = Classifier.from_tree(_default_tree())
+    build_s = time.perf_counter() - start
+
+    sample = _synthetic_items(items)
+    single = sample[:max(1, items // 10)]
+    start = time.perf_counter()
+    for item in single:
+        classifier.classify([item])
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for offset in range(0, len(sample), batch):
+        classifier.classify(sample[offset:offset + batch])
+    batched_s = time.perf_counter() - start
+
+    predictions = classifier.classify([{"title": t, "source": u} for t, u, _, _ in LABELLED])
+    correct_category = correct_subcategory = unclassified = 0
+    misses = []
+    for (title, _, category, subcategory), found in zip(LABELLED, predictions):
+        if found is None:
+            unclassified += 1
+            misses.append({"title": title, "expected": f"{category}/{subcategory}", "got": None})
+            continue
+        correct_category += found[0] == category
+        correct_subcategory += found[0] == category and found[1] == subcategory
+        if (found[0], found[1]) != (category, subcategory):
+            misses.append({"title": title, "expected": f"{category}/{subcategory}", "got": f"{found[0]}/{found[1]}"})
+
+    return {
+        "benchmark": "classify",
+        "classes": len(classifier.labels),
+        "vocabulary": len(classifier.vocab),
+        "build_ms": round(build_s * 1000, 3),
+        "single_us": round(single_s / len(single) * 1e6, 2),
+        "single_per_sec": round(len(single) / single_s),
+        "batched_us": round(batched_s / len(sample) * 1e6, 2),
+        "batched_per_sec": round(len(sample) / batched_s),
+        "batch_size": batch,
+        "accuracy": {
+            "sample": len(LABELLED),
+            "category": round(correct_category / len(LABELLED), 3),
+            "subcategory": round(correct_subcategory / len(LABELLED), 3),
+            "unclassified": unclassified,
+            "misses": misses,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20000, help="items to classify in batches")
+    parser.add_argument("--batch", type=int, default=1000, help="batch size")
+    args = parser.parse_args()
+    print(json.dumps(run(args.items, args.batch), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Extractor throughput and memory over the fixture corpus (benchmarks/corpus.py).
+
+Offline extractors run on in-memory HTML: the bare metadata parse, the
+default price plan, and a plan led by each generic strategy (which changes
+how early the parser may stop). End-to-end extractors fetch from a local
+fixture server: scraper_pipeline.scrape_product_data and
+scraper.DynamicScraper.scrape_with_bs.
+
+    python -m benchmarks.bench_extract --seconds 1
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from benchmarks.backend import use_backend
+from benchmarks.corpus import FixtureServer, load_corpus
+
+
+def _offline_extractors() -> dict:
+    from utils.extractors import GENERIC, ExtractionPlan, default_plan, run_extractors
+    from utils.html_extract import extract_page_metadata
+
+    def with_plan(plan):
+        def extract(html):
+            return run_extractors(plan, extract_page_metadata(html, **plan.parse_options))
+        return extract
+
+    extractors = {
+        "parse_only": extract_page_metadata,
+        "parse_full_document": lambda html: extract_page_metadata(html, stop_early=False),
+        "default_plan": with_plan(default_plan()),
+    }
+    for lead in GENERIC:
+        order = [lead] + [e for e in GENERIC if e is not lead]
+        extractors[f"{lead.name}_first"] = with_plan(ExtractionPlan("bench", order))
+    return extractors
+
+
+def _measure_sync(fn, html: str, seconds: float) -> dict:
+    fn(html)  # warm-up
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        fn(html)
+        count += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+    elapsed = now - start
+
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "pages_per_sec": round(count / elapsed, 1),
+        "mb_per_sec": round(count * len(html) / elapsed / 1e6, 2),
+        "ms_per_page": round(elapsed / count * 1000, 3),
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+async def _measure_async(fn, url: str, seconds: float) -> dict:
+    await fn(url)  # warm-up (connection, plan cache)
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        await fn(url)
+        count += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+    elapsed = now - start
+
+    tracemalloc.start()
+    await fn(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "pages_per_sec": round(count / elapsed, 1),
+        "ms_per_page": round(elapsed / count * 1000, 3),
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+async def _run_end_to_end(corpus: dict, seconds: float) -> dict:
+    from utils.http_client import close_http_client, start_http_client
+    from utils.scraper import DynamicScraper
+    from utils.scraper_pipeline import scrape_product_data
+
+    async def dynamic(url):
+        return await DynamicScraper(url).scrape_with_bs()
+
+    extractors = {"scrape_product_data": scrape_product_data, "dynamic_scraper": dynamic}
+    results = {}
+    await start_http_client()
+    try:
+        with FixtureServer(corpus) as server:
+            for name, fn in extractors.items():
+                results[name] = {
+                    key: await _measure_async(fn, server.url(key), seconds) for key in corpus
+                }
+    finally:
+        await close_http_client()
+    return results
+
+
+def run(seconds: float = 1.0, sizes=("small", "medium", "large"), mongo_uri: str = None, end_to_end: bool = True) -> dict:
+    backend = use_backend(mongo_uri)
+    corpus = load_corpus(sizes)
+    offline = {
+        name: {key: _measure_sync(fn, html, seconds) for key, html in corpus.items()}
+        for name, fn in _offline_extractors().items()
+    }
+    result = {
+        "benchmark": "extract",
+        "backend": backend,
+        "seconds_per_case": seconds,
+        "page_bytes": {key: len(html.encode("utf-8")) for key, html in corpus.items()},
+        "offline": offline,
+    }
+    if end_to_end:
+        result["end_to_end"] = asyncio.run(_run_end_to_end(corpus, seconds))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per extractor and page")
+    parser.add_argument("--sizes", default="small,medium,large")
+    parser.add_argument("--mongo-uri", default=None, help="local mongod instead of the in-memory stand-in")
+    parser.add_argument("--offline-only", action="store_true", help="skip the local-server scrapes")
+    args = parser.parse_args()
+    result = run(args.seconds, tuple(args.sizes.split(",")), args.mongo_uri, not args.offline_only)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Login throughput under concurrency: bcrypt verified inline on the event loop
+(the old behaviour) vs offloaded to utils.passwords' thread pool.
+
+Alongside throughput it tracks the worst event-loop stall seen by a 10 ms
+heartbeat, which is what every other request in the worker experiences.
+
+    python -m benchmarks.bench_login --concurrency 32 --logins 64
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import bcrypt
+from fastapi import HTTPException
+
+from utils import passwords
+
+
+async def _heartbeat(stop: asyncio.Event, stalls: list):
+    interval = 0.01
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+
+async def _run(verify, hashed: str, logins: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        async with sem:
+            try:
+                assert await verify("correct horse", hashed)
+            except HTTPException:
+                rejected += 1  # 503 from the queue-depth limit
+
+    stop = asyncio.Event()
+    stalls = []
+    beat = asyncio.create_task(_heartbeat(stop, stalls))
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return {
+        "logins_per_sec": round((logins - rejected) / elapsed, 2),
+        "rejected_503": rejected,
+        "elapsed_s": round(elapsed, 3),
+        "max_loop_stall_ms": round(max(stalls, default=0) * 1000, 1),
+    }
+
+
+async def _inline_verify(plain: str, hashed: str) -> bool:
+    return bcrypt.checkpw(plain.encode(), hashed.encode())
+
+
+async def run(logins: int, concurrency: int, rounds: int) -> dict:
+    hashed = await passwords.hash_password("correct horse", rounds=rounds)
+    return {
+        "benchmark": "login",
+        "rounds": rounds,
+        "logins": logins,
+        "concurrency": concurrency,
+        "workers": passwords.HASH_WORKERS,
+        "inline": await _run(_inline_verify, hashed, logins, concurrency),
+        "offloaded": await _run(passwords.verify_password, hashed, logins, concurrency),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=passwords.BCRYPT_ROUNDS)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.logins, args.concurrency, args.rounds)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Outfit suggestion latency (utils.outfit_engine) over synthetic wardrobes of
+owned items: building a user's feature arrays (once per wardrobe version)
+and the beam search itself, with and without an anchor item. The target is
+under 100 ms per suggestion request at several thousand items.
+
+No database needed; items are generated in memory.
+
+    python -m benchmarks.bench_outfits --sizes 1000,3000,5000 --k 10
+"""
+
+import argparse
+import json
+import random
+import time
+
+from bson import ObjectId
+
+# category -> subcategories, roughly in wardrobe proportions
+_WARDROBE = {
+    "Tops": (0.35, ["T-shirts", "Shirts", "Knitwear"]),
+    "Bottoms": (0.2, ["Trousers", "Jeans", "Skirts", "Shorts"]),
+    "Dresses": (0.1, ["Dresses", "Jumpsuits"]),
+    "Outerwear": (0.1, ["Coats", "Jackets"]),
+    "Shoes": (0.12, ["Trainers", "Boots", "Heels", "Flats", "Sandals"]),
+    "Bags": (0.05, ["Bags"]),
+    "Accessories": (0.08, ["Jewellery", "Hats", "Scarves"]),
+}
+
+
+def _synthetic_wardrobe(size: int, seed: int) -> list:
+    rng = random.Random(seed)
+    categories = list(_WARDROBE)
+    weights = [_WARDROBE[c][0] for c in categories]
+    items = []
+    for i in range(size):
+        category = rng.choices(categories, weights)[0]
+        items.append({
+            "_id": ObjectId(),
+            "title": f"Item {i}",
+            "category": category,
+            "subcategory": rng.choice(_WARDROBE[category][1]),
+            "image_color": "#%02x%02x%02x" % tuple(rng.randrange(256) for _ in range(3)),
+            "price_amount": round(rng.lognormvariate(3.8, 0.8), 2) if rng.random() < 0.9 else None,
+            "price_currency": "GBP",
+        })
+    return items
+
+
+def _percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    pick = lambda pct: samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
+    return {
+        "p50_ms": round(pick(50) * 1000, 3),
+        "p95_ms": round(pick(95) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+def run(sizes=(1000, 3000, 5000), k: int = 10, repeats: int = 20) -> dict:
+    from utils.outfit_engine import WardrobeFeatures
+
+    results = {}
+    for size in sizes:
+        items = _synthetic_wardrobe(size, seed=size)
+        start = time.perf_counter()
+        features = WardrobeFeatures(items, version=1)
+        build_s = time.perf_counter() - start
+
+        anchors = [features.ids[int(rows[0])] for rows in features.slots.values()]
+        timings = {"suggest": [], "suggest_anchored": []}
+        found = 0
+        for i in range(repeats):
+            start = time.perf_counter()
+            outfits = features.suggest(k)
+            timings["suggest"].append(time.perf_counter() - start)
+            found += len(outfits)
+
+            start = time.perf_counter()
+            features.suggest(k, anchor=anchors[i % len(anchors)])
+            timings["suggest_anchored"].append(time.perf_counter() - start)
+
+        results[str(size)] = {
+            "build_ms": round(build_s * 1000, 3),
+            "slots": {slot: len(rows) for slot, rows in features.slots.items()},
+            "avg_outfits": round(found / repeats, 1),
+            "top_score": round(outfits[0][0], 4) if outfits else None,
+            **{name: _percentiles(samples) for name, samples in timings.items()},
+        }
+    return {"benchmark": "outfits", "k": k, "repeats": repeats, "wardrobes": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,3000,5000", help="comma-separated wardrobe sizes")
+    parser.add_argument("--k", type=int, default=10, help="suggestions per request")
+    parser.add_argument("--repeats", type=int, default=20, help="requests per wardrobe")
+    args = parser.parse_args()
+    sizes = tuple(int(s) for s in args.sizes.split(",") if s.strip())
+    print(json.dumps(run(sizes, args.k, args.repeats), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Batch price parsing throughput for utils.prices over a mix of real-world
+formats (UK/US, European decimal commas, grouped thousands, JSON-LD numbers).
+
+    python -m benchmarks.bench_prices --count 200000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from utils.prices import parse_price, price_fields
+
+SAMPLES = [
+    ("£49", ""), ("£1,049.00", ""), ("49,99 €", ""), ("1.234,56 €", ""),
+    ("$12.50", ""), ("USD 1,299.99", ""), ("CHF 1'299.-", ""), ("¥12,800", ""),
+    ("12 500 kr", ""), ("19.99", "GBP"), ("89", "EUR"), ("Now £39.99", ""),
+]
+
+
+def run(count: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    batch = [rng.choice(SAMPLES) for _ in range(count)]
+
+    start = time.perf_counter()
+    for raw, hint in batch:
+        parse_price(raw, hint)
+    parse_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for raw, hint in batch:
+        price_fields(raw, hint)
+    fields_elapsed = time.perf_counter() - start
+
+    return {
+        "benchmark": "prices",
+        "count": count,
+        "parse_per_sec": round(count / parse_elapsed),
+        "parse_us": round(parse_elapsed / count * 1e6, 3),
+        "price_fields_per_sec": round(count / fields_elapsed),
+        "price_fields_us": round(fields_elapsed / count * 1e6, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=200000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count), indent=2))
+
+
+if __name__ == "__main__":
+    main()
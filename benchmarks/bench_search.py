@@ -0,0 +1,141 @@
+"""
+Wardrobe search latency (utils.search_index) over synthetic wardrobes of
+increasing size, for whole-word, prefix (search-as-you-type) and
+multi-term queries, with and without an ownership filter. Also measures
+token generation, which runs on every item save.
+
+Use --mongo-uri for real numbers: the in-memory stand-in has no indexes, so
+its latency grows with wardrobe size where mongod's should not.
+
+    python -m benchmarks.bench_search --sizes 1000,10000
+    python -m benchmarks.bench_search --mongo-uri mongodb://localhost:27017
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.backend import drop_backend, use_backend
+
+_ADJECTIVES = "linen cotton wool cashmere silk denim leather relaxed tailored cropped oversized pleated ribbed striped".split()
+_COLOURS = "black ivory navy camel sage burgundy olive cream charcoal rust".split()
+_PRODUCTS = {
+    "tops": ["shirt", "blouse", "tee", "vest", "jumper", "cardigan"],
+    "bottoms": ["trousers", "jeans", "skirt", "shorts", "culottes"],
+    "dresses": ["midi dress", "maxi dress", "slip dress", "shirt dress"],
+    "outerwear": ["coat", "trench", "blazer", "parka", "gilet"],
+    "shoes": ["loafers", "trainers", "boots", "sandals", "mules"],
+}
+_SITES = ["asos.com", "cos.com", "arket.com", "zara.com", "uniqlo.com", "everlane.com", "toteme-studio.com"]
+
+QUERIES = {
+    "word": ["dress", "linen", "boots", "navy"],
+    "prefix": ["dr", "lin", "tro", "cas"],
+    "multi_term": ["navy linen", "black leather boots", "midi dr", "relaxed jea"],
+}
+
+
+def _synthetic_item(rng: random.Random, users_id: str, i: int, now: datetime) -> dict:
+    category = rng.choice(list(_PRODUCTS))
+    product = rng.choice(_PRODUCTS[category])
+    return {
+        "users_id": users_id,
+        "source": f"https://shop.example/p/{users_id}/{i}",
+        "ownership": "wishlist" if rng.random() < 0.6 else "own",
+        "status": "ready",
+        "title": f"{rng.choice(_ADJECTIVES).title()} {rng.choice(_COLOURS)} {product}",
+        "site_name": rng.choice(_SITES),
+        "category": category,
+        "subcategory": product.split()[-1],
+        "created_at": now - timedelta(minutes=i),
+    }
+
+
+def _percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    pick = lambda pct: samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
+    return {
+        "p50_ms": round(pick(50) * 1000, 3),
+        "p95_ms": round(pick(95) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+async def _seed(users_id: str, size: int, seed: int) -> list:
+    import database
+    from utils.search_index import search_tokens
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    docs = [_synthetic_item(rng, users_id, i, now) for i in range(size)]
+    for doc in docs:
+        doc["search_tokens"] = search_tokens(doc)
+    for start in range(0, len(docs), 1000):
+        await database.items_collection.insert_many(docs[start:start + 1000])
+    return docs
+
+
+async def _run(sizes, repeats: int) -> dict:
+    from database import create_indexes
+    from utils.search_index import search_items, search_tokens
+
+    await create_indexes()
+    results = {}
+    for size in sizes:
+        users_id = f"bench-search-{size}"
+        docs = await _seed(users_id, size, seed=size)
+
+        start = time.perf_counter()
+        for doc in docs:
+            search_tokens(doc)
+        tokenize_s = time.perf_counter() - start
+
+        by_kind = {}
+        for kind, queries in QUERIES.items():
+            for ownership in (None, "wishlist"):
+                samples = []
+                hits = 0
+                for _ in range(repeats):
+                    for q in queries:
+                        start = time.perf_counter()
+                        found = await search_items(users_id, q, ownership=ownership, limit=20)
+                        samples.append(time.perf_counter() - start)
+                        hits += len(found)
+                label = kind if ownership is None else f"{kind}_wishlist"
+                by_kind[label] = {**_percentiles(samples), "avg_results": round(hits / len(samples), 1)}
+        results[str(size)] = {
+            "tokenize_per_sec": round(size / tokenize_s) if tokenize_s else None,
+            "tokens_per_item": round(sum(len(d["search_tokens"]) for d in docs) / size, 1),
+            "queries": by_kind,
+        }
+    return results
+
+
+def run(sizes=(1000, 5000), repeats: int = 5, mongo_uri: str = None) -> dict:
+    backend = use_backend(mongo_uri)
+
+    async def go():
+        try:
+            return await _run(sizes, repeats)
+        finally:
+            if mongo_uri:
+                await drop_backend()
+
+    return {"benchmark": "search", "backend": backend, "repeats": repeats, "wardrobes": asyncio.run(go())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000", help="comma-separated wardrobe sizes")
+    parser.add_argument("--repeats", type=int, default=5, help="passes over each query set")
+    parser.add_argument("--mongo-uri", default=None, help="local mongod instead of the in-memory stand-in")
+    args = parser.parse_args()
+    sizes = tuple(int(s) for s in args.sizes.split(",") if s.strip())
+    print(json.dumps(run(sizes, args.repeats, args.mongo_uri), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Every numeric leaf is compared by its path. Direction comes from the metric
+name: throughput (*_per_sec) should go up; latency, time and memory (*_ms,
+*_us, *_s, *_kb, *_bytes) should go down. Anything else (counts, settings)
+is ignored.
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.10
+"""
+
+import argparse
+import json
+import sys
+
+HIGHER_IS_BETTER = ("_per_sec",)
+LOWER_IS_BETTER = ("_ms", "_us", "_s", "_kb", "_bytes")
+
+
+def _direction(key: str):
+    if key.endswith(HIGHER_IS_BETTER):
+        return 1
+    if key.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def _flatten(value, path=()):
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from _flatten(child, path + (str(key),))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield path, value
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> dict:
+    """Relative change for every comparable metric; regressions are worse than threshold."""
+    base = dict(_flatten(baseline))
+    changes = []
+    for path, new in _flatten(current):
+        old = base.get(path)
+        direction = _direction(path[-1])
+        if old is None or not direction or old == 0:
+            continue
+        change = (new - old) / abs(old)
+        # Positive "improvement" means better in the metric's own direction
+        improvement = change * direction
+        changes.append({
+            "metric": "/".join(path),
+            "baseline": old,
+            "current": new,
+            "change": round(change, 4),
+            "regression": improvement < -threshold,
+            "improvement": improvement > threshold,
+        })
+    return {
+        "threshold": threshold,
+        "compared": len(changes),
+        "regressions": [c for c in changes if c["regression"]],
+        "improvements": [c for c in changes if c["improvement"]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    report = compare(baseline, current, args.threshold)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
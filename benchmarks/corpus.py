@@ -0,0 +1,155 @@
+"""
+HTML fixture corpus for the scraper benchmarks, plus a local HTTP server to
+serve it so end-to-end scrapes never touch the network.
+
+The templates in benchmarks/fixtures/ are shaped like the retailer pages we
+scrape (meta-tag price, JSON-LD @graph offer, CSS-only price, client-rendered
+shell). Real product pages are mostly inline state and product grids, so each
+template is also inflated to real-world sizes by filling its FILL_HEAD /
+FILL_BODY markers with deterministic generated markup.
+"""
+
+import os
+import random
+import threading
+from hashlib import sha1
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+# Approximate page sizes: a light page, a typical PDP and a heavy SPA-backed PDP
+SIZES = {"small": 0, "medium": 300 * 1024, "large": 2 * 1024 * 1024}
+
+_WORDS = (
+    "linen cotton wool knit midi maxi relaxed tailored cropped oversized organic "
+    "recycled sage camel black ivory navy stripe pleated wrap belted ribbed"
+).split()
+
+
+def _templates() -> dict:
+    templates = {}
+    for name in sorted(os.listdir(FIXTURE_DIR)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+                templates[name[:-5]] = f.read()
+    return templates
+
+
+def _state_blob(rng: random.Random, size: int) -> str:
+    # Inline framework state (__NEXT_DATA__, window.__INITIAL_STATE__, ...)
+    parts = []
+    total = 0
+    while total < size:
+        chunk = (
+            '{"id":%d,"title":"%s","price":{"value":%d.%02d,"currency":"GBP"},"variants":[%s]},'
+            % (
+                rng.randrange(10 ** 6),
+                " ".join(rng.choice(_WORDS) for _ in range(4)),
+                rng.randrange(5, 500), rng.randrange(100),
+                ",".join('{"sku":"%06d","size":"%s"}' % (rng.randrange(10 ** 6), s) for s in ("XS", "S", "M", "L")),
+            )
+        )
+        parts.append(chunk)
+        total += len(chunk)
+    return '<script id="__STATE__" type="application/json">{"products":[' + "".join(parts).rstrip(",") + "]}</script>"
+
+
+def _product_grid(rng: random.Random, size: int) -> str:
+    # "You may also like" grids: lots of nested divs, images and unrelated prices
+    cards = []
+    total = 0
+    while total < size:
+        card = (
+            '<div class="card"><a href="/products/%d"><img src="https://cdn.example/%d.jpg" alt="%s" loading="lazy">'
+            '<div class="card__info"><p class="card__title">%s</p><span class="card__price">£%d.00</span></div></a></div>\n'
+            % (
+                rng.randrange(10 ** 6), rng.randrange(10 ** 6),
+                " ".join(rng.choice(_WORDS) for _ in range(3)),
+                " ".join(rng.choice(_WORDS) for _ in range(5)),
+                rng.randrange(5, 300),
+            )
+        )
+        cards.append(card)
+        total += len(card)
+    return '<section class="recommendations">' + "".join(cards) + "</section>"
+
+
+def build_page(template: str, size: str, seed: int = 0) -> str:
+    target = SIZES[size]
+    rng = random.Random(seed)
+    # Roughly 60% inline state in <head>, 40% product grids in <body>
+    head = _state_blob(rng, int(target * 0.6)) if target else ""
+    body = _product_grid(rng, int(target * 0.4)) if target else ""
+    return template.replace("<!--FILL_HEAD-->", head).replace("<!--FILL_BODY-->", body)
+
+
+def load_corpus(sizes=("small", "medium", "large")) -> dict:
+    """{"meta_price/large": html, ...} for every template at every size."""
+    corpus = {}
+    for name, template in _templates().items():
+        for size in sizes:
+            corpus[f"{name}/{size}"] = build_page(template, size)
+    return corpus
+
+
+class FixtureServer:
+    """
+    Serve {path: html} on 127.0.0.1 from a background thread, with ETags so
+    conditional requests get 304s like a real retailer.
+
+        with FixtureServer(corpus) as server:
+            server.url("meta_price/large")
+    """
+
+    def __init__(self, pages: dict):
+        self.pages = {
+            f"/{key}": (html.encode("utf-8"), '"%s"' % sha1(html.encode("utf-8")).hexdigest()[:16])
+            for key, html in pages.items()
+        }
+        self._server = None
+        self._thread = None
+
+    def url(self, key: str, query: str = "") -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/{key}" + (f"?{query}" if query else "")
+
+    def __enter__(self):
+        pages = self.pages
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, keep-alive
+            # requests stall on delayed ACKs and every fetch takes ~40 ms
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                entry = pages.get(self.path.split("?", 1)[0])
+                if entry is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body, etag = entry
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
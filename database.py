@@ -1,13 +1,19 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 import os
 from dotenv import load_dotenv
+from utils.log import get_logger
+from utils.metrics import MongoCommandMetrics
+
+log = get_logger("database")
 
 load_dotenv()
 
 # MongoDB connection
 DATABASE_URL = os.getenv("MONGO_URI")  # Make sure MONGO_URI is set in your .env
 
-client = AsyncIOMotorClient(DATABASE_URL)
+# Command listener feeds per-collection latency into /metrics
+client = AsyncIOMotorClient(DATABASE_URL, event_listeners=[MongoCommandMetrics()])
 db = client.wardrobe_db  # Change this if your DB has a different name
 
 # Collections
@@ -16,6 +22,14 @@ items_collection = db["wardrobe_items"]
 categories_collection = db["categories"]
 subcategories_collection = db["subcategories"]
 outfits_collection = db["outfits"]
+scrape_cache_collection = db["scrape_cache"]
+scrape_jobs_collection = db["scrape_jobs"]
+user_stats_collection = db["user_stats"]
+scheduler_locks_collection = db["scheduler_locks"]
+image_cache_collection = db["image_cache"]
+extractor_stats_collection = db["extractor_stats"]
+wardrobe_versions_collection = db["wardrobe_versions"]
+taxonomy_meta_collection = db["taxonomy_meta"]
 
 # Compound index for preventing duplicate item saves
 # This will only run if the index doesn't already exist
@@ -24,3 +38,65 @@ async def create_indexes():
         [("users_id", 1), ("source", 1)],
         unique=True
     )
+
+    # Shared scrape cache entries expire on their own
+    await scrape_cache_collection.create_index("expires_at", expireAfterSeconds=0)
+
+    # Background scrape jobs: workers poll by status/next_run_at, finished jobs age out
+    await scrape_jobs_collection.create_index([("status", 1), ("next_run_at", 1)])
+    await scrape_jobs_collection.create_index("finished_at", expireAfterSeconds=24 * 60 * 60)
+
+    # Wardrobe listing: equality on user/ownership, newest first, _id as tiebreaker
+    await items_collection.create_index(
+        [("users_id", 1), ("ownership", 1), ("created_at", -1), ("_id", -1)]
+    )
+
+    # Per-user outfit listing, newest first
+    await outfits_collection.create_index(
+        [("users_id", 1), ("created_at", -1), ("_id", -1)]
+    )
+
+    # Case-insensitive user lookups (see utils/user_lookup.py). Building these
+    # fails if existing users collide case-insensitively; registration's
+    # pre-check still refuses duplicates, so fall back to a plain index for it
+    # until the colliding accounts are merged.
+    for key in ("email_key", "username_key"):
+        try:
+            await users_collection.create_index(
+                key,
+                unique=True,
+                partialFilterExpression={key: {"$type": "string"}}
+            )
+        except OperationFailure as e:
+            log.error("could not create unique index, using a plain one", collection="users", key=key, error=str(e))
+            await users_collection.create_index(key)
+
+    # Price sort/filter within a wardrobe ("sort by price", "under £50")
+    await items_collection.create_index(
+        [("users_id", 1), ("ownership", 1), ("price_amount", 1), ("_id", 1)]
+    )
+
+    # Wishlist price refresh picks the stalest items first
+    await items_collection.create_index([("ownership", 1), ("price_checked_at", 1)])
+
+    # Image proxy: restore evicted files by digest, and only proxy saved item images
+    await image_cache_collection.create_index("digest")
+    await items_collection.create_index("image_url")
+    await items_collection.create_index("images")
+
+    # Duplicate checks compare canonical URL keys (utils/canonical_url.py).
+    # Older wardrobes may hold duplicates under different raw URLs; the unique
+    # index builds once `python -m utils.dedupe --apply` has merged them.
+    try:
+        await items_collection.create_index(
+            [("users_id", 1), ("source_key", 1)],
+            unique=True,
+            partialFilterExpression={"source_key": {"$type": "string"}}
+        )
+    except OperationFailure as e:
+        log.warning("could not create unique index", collection="wardrobe_items", key="source_key", error=str(e))
+    await items_collection.create_index([("users_id", 1), ("canonical_key", 1)], sparse=True)
+
+    # Wardrobe search: every query term must be one of the item's word prefixes;
+    # created_at lets search read the newest matches first without a sort stage
+    await items_collection.create_index([("users_id", 1), ("search_tokens", 1), ("created_at", -1)])
@@ -1,9 +1,19 @@
 # main.py - FastAPI Backend
-from fastapi import FastAPI
-from routes import items, users, categories, outfits
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from routes import items, users, categories, outfits, images, admin, wardrobe
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from database import create_indexes  # ✅ import this
+from utils.http_client import start_http_client, close_http_client
+from utils.playwright_scraper import start_browser_pool, close_browser_pool
+from utils.scrape_queue import start_scrape_queue, stop_scrape_queue
+from utils.metrics import MetricsMiddleware, render_metrics
+from utils.responses import CompressionMiddleware, FastJSONResponse
+from utils.image_cache import start_image_cache, stop_image_cache
+from utils.price_refresh import start_price_refresh, stop_price_refresh
+from utils.user_lookup import migrate_user_lookup_keys
+from utils.taxonomy import start_taxonomy
 import os
 from dotenv import load_dotenv
 import uvicorn
@@ -11,7 +21,7 @@ import uvicorn
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Run server if script is executed directly
 if __name__ == "__main__":
@@ -26,20 +36,55 @@ app.add_middleware(
     allow_origins=["*"],  # Restrict this in production
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"]
 )
 
+# ✅ gzip/brotli for large JSON; streamed responses pass through
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so its timings include the other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Include Routes
 app.include_router(items.router)
 app.include_router(users.router)
 app.include_router(categories.router)
 app.include_router(outfits.router)
+app.include_router(images.router)
+app.include_router(admin.router)
+app.include_router(wardrobe.router)
 
 # ✅ On startup, create DB indexes
 @app.on_event("startup")
 async def startup_event():
+    await migrate_user_lookup_keys()
     await create_indexes()
+    await start_taxonomy()
+    await start_http_client()
+    await start_browser_pool()
+    await start_image_cache()
+    await start_scrape_queue()
+    await start_price_refresh()
+
+# ✅ On shutdown, close pooled scraper connections
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_price_refresh()
+    await stop_scrape_queue()
+    await stop_image_cache()
+    await close_http_client()
+    await close_browser_pool()
 
 @app.get("/")
 def home():
     return {"message": "Wardrobe API is running"}
+
+# ✅ Prometheus scrape target; set METRICS_TOKEN to require "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -22,11 +22,14 @@ class WardrobeItemSchema(BaseModel):
 
 class CategorySchema(BaseModel):
     name: str
+    keywords: List[str] = []  # Extra words the item classifier matches on
 
 class SubcategorySchema(BaseModel):
     name: str
     category_id: str  # Store category ID as string
+    keywords: List[str] = []
 
 class OutfitSchema(BaseModel):
     name: str
+    users_id: str
     items: List[str]  # List of item IDs
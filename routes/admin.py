@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from database import extractor_stats_collection
+from utils.auth import require_admin
+from utils.extractors import describe, forget
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+# ✅ Per-domain extractor stats, busiest domains first
+@router.get("/admin/extractors")
+async def list_extractor_stats(limit: int = Query(100, ge=1, le=1000)):
+    cursor = extractor_stats_collection.aggregate([
+        {"$addFields": {"_tries": {"$add": [
+            {"$ifNull": ["$static.tries", 0]}, {"$ifNull": ["$rendered.tries", 0]},
+        ]}}},
+        {"$sort": {"_tries": -1, "_id": 1}},
+        {"$limit": limit},
+        {"$project": {"_tries": 0}},
+    ])
+    return {"domains": [describe(doc) async for doc in cursor]}
+
+@router.get("/admin/extractors/{domain}")
+async def get_extractor_stats(domain: str):
+    doc = await extractor_stats_collection.find_one({"_id": domain.lower()})
+    if not doc:
+        raise HTTPException(status_code=404, detail="No stats for this domain")
+    return describe(doc)
+
+# ✅ Forget what we learned about a domain (e.g. after a site redesign)
+@router.delete("/admin/extractors/{domain}")
+async def reset_extractor_stats(domain: str):
+    result = await extractor_stats_collection.delete_one({"_id": domain.lower()})
+    forget(domain.lower())
+    return {"deleted": result.deleted_count}
@@ -1,15 +1,30 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from database import categories_collection, subcategories_collection
 from models import CategorySchema, SubcategorySchema
+from utils.taxonomy import get_taxonomy, taxonomy_changed
 
 router = APIRouter()
 
+# ✅ The tree changes rarely; clients may reuse it for a minute, then revalidate
+TREE_CACHE_CONTROL = "public, max-age=60"
+
 @router.post("/categories/")
 async def create_category(category: CategorySchema):
     result = await categories_collection.insert_one(category.dict())
+    await taxonomy_changed()
     return {"message": "Category created", "id": str(result.inserted_id)}
 
 @router.post("/subcategories/")
 async def create_subcategory(subcategory: SubcategorySchema):
     result = await subcategories_collection.insert_one(subcategory.dict())
+    await taxonomy_changed()
     return {"message": "Subcategory created", "id": str(result.inserted_id)}
+
+# ✅ Categories with their subcategories nested, served from the in-memory snapshot
+@router.get("/categories/tree")
+async def get_category_tree(request: Request):
+    snapshot = await get_taxonomy()
+    headers = {"ETag": snapshot.etag, "Cache-Control": TREE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == snapshot.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(snapshot.body, media_type="application/json", headers=headers)
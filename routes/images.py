@@ -0,0 +1,64 @@
+import re
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
+
+from utils.image_cache import (
+    FORMATS, THUMB_SIZES, ImageUnavailable, get_thumbnail, resolve_image, touch,
+)
+
+router = APIRouter()
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+# Digest URLs never change content; proxied URLs can be re-pointed by the retailer
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+PROXY_CACHE = "public, max-age=86400"
+
+
+def _pick_format(request: Request, fmt: str = None) -> str:
+    if fmt:
+        if fmt not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"fmt must be one of {sorted(FORMATS)}")
+        return fmt
+    return "webp" if "image/webp" in request.headers.get("accept", "") else "jpg"
+
+
+async def _serve(request: Request, digest: str, size: str, fmt: str, cache_control: str):
+    if size not in THUMB_SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {sorted(THUMB_SIZES)}")
+    etag = f'"{digest[:20]}-{size}-{fmt}"'
+    headers = {"Cache-Control": cache_control, "ETag": etag, "Vary": "Accept"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        path = await get_thumbnail(digest, size, fmt)
+    except ImageUnavailable:
+        raise HTTPException(status_code=404, detail="Image not available")
+    touch(path)
+    return FileResponse(path, media_type=FORMATS[fmt][1], headers=headers)
+
+
+# ✅ Thumbnail of a saved item's image, by its original retailer URL
+@router.get("/images/proxy")
+async def proxy_image(
+    request: Request,
+    url: str = Query(...),
+    size: str = Query("md"),
+    fmt: str = Query(None),
+):
+    if not url.lower().startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="Invalid image URL")
+    try:
+        digest = await resolve_image(url)
+    except ImageUnavailable:
+        raise HTTPException(status_code=404, detail="Image not available")
+    return await _serve(request, digest, size, _pick_format(request, fmt), PROXY_CACHE)
+
+
+# ✅ Thumbnail by content digest (items carry image_digest once pre-warmed)
+@router.get("/images/{digest}/{size}")
+async def image_by_digest(request: Request, digest: str, size: str, fmt: str = Query(None)):
+    if not DIGEST_RE.match(digest):
+        raise HTTPException(status_code=404, detail="Image not available")
+    return await _serve(request, digest, size, _pick_format(request, fmt), IMMUTABLE_CACHE)
@@ -1,9 +1,32 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
-from database import items_collection
+from typing import List
+from database import items_collection, outfits_collection
 from datetime import datetime
 from bson import ObjectId
-from utils.scraper_pipeline import scrape_product_data  # Final scraper
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from utils.scrape_cache import get_cached_product, get_cached_products, cache_stats
+from utils.canonical_url import canonicalize_url, url_key
+from utils.dedupe import find_duplicate
+from utils.scrape_queue import scrape_queue, domain_of
+from utils.pagination import keyset_filter, keyset_sort, next_cursor
+from utils.auth import get_current_user_id, ensure_same_user, require_admin
+from utils.prices import price_fields, to_minor_units
+from utils.image_cache import schedule_prewarm
+from utils.search_index import search_items, search_tokens
+from utils.classifier import classify_items
+from utils.wardrobe_stats import STAT_FIELDS, record_item_change, record_items_added
+from pymongo import ReturnDocument
+from utils.responses import FastJSONResponse, dumps
+from utils.listing_cache import cached_listing, cache_stats as listing_cache_stats
+from utils.wardrobe_version import (
+    LIST_CACHE_CONTROL, bump_wardrobe_version, get_wardrobe_version, is_not_modified, listing_key, not_modified,
+    wardrobe_etag,
+)
+from utils.log import get_logger
+
+log = get_logger("items")
 
 router = APIRouter()
 
@@ -14,6 +37,17 @@ class ItemRequest(BaseModel):
     ownership: str  # "own" or "wishlist"
     category: str = None
     subcategory: str = None
+    refresh: bool = False  # bypass the shared scrape cache
+
+class BatchItemRequest(BaseModel):
+    urls: List[str]
+    users_id: str
+    ownership: str
+    category: str = None
+    subcategory: str = None
+
+class ItemStatusRequest(BaseModel):
+    item_ids: List[str]
 
 class MetadataRequest(BaseModel):
     item_id: str
@@ -22,80 +56,434 @@ class MetadataRequest(BaseModel):
     subcategory: str
 
 # Save item route
+# The item is stored straight away with status "pending" and scraped in the
+# background; clients poll /items/status to pick up the filled-in metadata.
+# URLs are canonicalized first (tracking params, affiliate wrappers, mobile
+# hosts), so the duplicate check and scrape cache see one URL per product.
+# Items that turn out to be near-duplicates of one already saved get
+# duplicate_of set to its id. Without a category from the user, one is
+# guessed from the title and URL path (category_source "auto").
 @router.post("/save-item/")
-async def save_item(item: ItemRequest):
+async def save_item(item: ItemRequest, current_user_id: str = Depends(get_current_user_id)):
     if not item.users_id:
         raise HTTPException(status_code=400, detail="User ID is required")
+    ensure_same_user(item.users_id, current_user_id)
 
-    url = item.url.strip()
+    url = canonicalize_url(item.url)
+    key = url_key(url)
     existing = await items_collection.find_one({
         "users_id": item.users_id,
-        "source": url
-    })
+        "$or": [{"source_key": key}, {"canonical_key": key}, {"source": url}]
+    }, {"_id": 1})
     if existing:
         raise HTTPException(status_code=409, detail="Item already saved.")
 
+    # Popular products are often already scraped; skip the queue for those
+    cached = None if item.refresh else await get_cached_product(url)
+
+    item_data = {
+        "users_id": item.users_id,
+        "source": url,
+        "source_key": key,
+        "ownership": item.ownership,
+        "category": item.category,
+        "subcategory": item.subcategory,
+        "created_at": datetime.utcnow(),
+        **pending_item_fields(url),
+    }
+    if cached:
+        item_data.update(cached)
+        item_data["status"] = "ready"
+        item_data["scraped_at"] = datetime.utcnow()
+        item_data.update(await duplicate_fields(item_data))
+    if item.category:
+        item_data["category_source"] = "user"
+    else:
+        item_data.update((await classify_items([item_data]))[0])
+    item_data["search_tokens"] = search_tokens(item_data)
+
+    try:
+        saved_item = await items_collection.insert_one(item_data)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Item already saved.")
+    await record_item_change(after=item_data)
+
+    if cached:
+        schedule_prewarm(saved_item.inserted_id, item_data.get("image_url"))
+
     try:
-        scraped = await scrape_product_data(url)
-        item_data = {
-            "users_id": item.users_id,
+        if not cached:
+            await scrape_queue.enqueue(saved_item.inserted_id, url, refresh=item.refresh)
+    except Exception:
+        log.exception("enqueue failed", item_id=str(saved_item.inserted_id))
+        await items_collection.update_one(
+            {"_id": saved_item.inserted_id}, {"$set": {"status": "failed"}}
+        )
+        item_data["status"] = "failed"
+    await bump_wardrobe_version(item.users_id)
+
+    item_data["id"] = str(saved_item.inserted_id)
+    item_data.pop("_id", None)
+    item_data.pop("search_tokens", None)
+    return item_data
+
+async def duplicate_fields(item: dict) -> dict:
+    """canonical_key and duplicate_of for an item whose scraped data is known."""
+    fields = {}
+    if item.get("canonical_url"):
+        fields["canonical_key"] = url_key(item["canonical_url"])
+    duplicate = await find_duplicate({**item, **fields})
+    fields["duplicate_of"] = str(duplicate["_id"]) if duplicate else None
+    return fields
+
+def pending_item_fields(url: str) -> dict:
+    return {
+        "status": "pending",
+        "title": None,
+        "image_url": "",
+        "site_icon_url": "",
+        "site_name": domain_of(url),
+        "images": [],
+        **price_fields(None),
+    }
+
+MAX_BATCH_URLS = 500
+
+# Save many items at once (e.g. importing a wishlist from another app).
+# Same flow as save_item, but one $in duplicate check, one insert_many and
+# one insert_many of scrape jobs for the whole list.
+@router.post("/save-items/batch")
+async def save_items_batch(batch: BatchItemRequest, current_user_id: str = Depends(get_current_user_id)):
+    if not batch.users_id:
+        raise HTTPException(status_code=400, detail="User ID is required")
+    ensure_same_user(batch.users_id, current_user_id)
+    if len(batch.urls) > MAX_BATCH_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_URLS} URLs per batch")
+
+    results = []
+    unique = {}  # url key -> canonical url
+    for raw in batch.urls:
+        if not raw.strip().lower().startswith(("http://", "https://")):
+            results.append({"url": raw, "status": "invalid"})
+            continue
+        url = canonicalize_url(raw)
+        key = url_key(url)
+        if key in unique:
+            results.append({"url": raw, "status": "duplicate"})
+            continue
+        unique[key] = url
+
+    keys = list(unique)
+    existing = set()
+    async for doc in items_collection.find(
+        {"users_id": batch.users_id, "$or": [
+            {"source_key": {"$in": keys}}, {"canonical_key": {"$in": keys}}, {"source": {"$in": list(unique.values())}},
+        ]},
+        {"source": 1, "source_key": 1, "canonical_key": 1, "_id": 0},
+    ):
+        existing.update({doc.get("source_key"), doc.get("canonical_key"), url_key(doc["source"])})
+    for key in keys:
+        if key in existing:
+            results.append({"url": unique[key], "status": "duplicate"})
+
+    new_urls = [url for key, url in unique.items() if key not in existing]
+    if not new_urls:
+        return {"results": results}
+
+    cached = await get_cached_products(new_urls)
+    now = datetime.utcnow()
+    docs = []
+    for url in new_urls:
+        doc = {
+            "users_id": batch.users_id,
             "source": url,
-            "ownership": item.ownership,
-            "category": item.category,
-            "subcategory": item.subcategory,
-            "created_at": datetime.utcnow(),
-            **scraped
+            "source_key": url_key(url),
+            "ownership": batch.ownership,
+            "category": batch.category,
+            "subcategory": batch.subcategory,
+            "created_at": now,
+            **pending_item_fields(url),
         }
-        saved_item = await items_collection.insert_one(item_data)
-        item_data["id"] = str(saved_item.inserted_id)
-        item_data.pop("_id", None)
-        return item_data
+        if url in cached:
+            doc.update(cached[url])
+            doc["status"] = "ready"
+            doc["scraped_at"] = now
+            doc.update(await duplicate_fields(doc))
+        docs.append(doc)
+    if batch.category:
+        for doc in docs:
+            doc["category_source"] = "user"
+    else:
+        for doc, fields in zip(docs, await classify_items(docs)):
+            doc.update(fields)
+    for doc in docs:
+        doc["search_tokens"] = search_tokens(doc)
+
+    # Unordered so one duplicate (e.g. a concurrent save) doesn't stop the rest;
+    # the (users_id, source) unique index rejects it and we report it.
+    failed = {}
+    try:
+        await items_collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed[error["index"]] = "duplicate" if error.get("code") == 11000 else "error"
 
-    except Exception as e:
-        print(f"[Save Error] {e}")
-        raise HTTPException(status_code=500, detail=f"Error scraping item: {e}")
+    jobs = []
+    inserted = []
+    for index, doc in enumerate(docs):
+        if index in failed:
+            results.append({"url": doc["source"], "status": failed[index]})
+            continue
+        inserted.append(doc)
+        if doc["status"] == "pending":
+            jobs.append((doc["_id"], doc["source"]))
+        else:
+            schedule_prewarm(doc["_id"], doc.get("image_url"))
+        results.append({"url": doc["source"], "status": doc["status"], "id": str(doc["_id"])})
+
+    await record_items_added(batch.users_id, inserted)
+
+    try:
+        await scrape_queue.enqueue_many(jobs)
+    except Exception:
+        log.exception("batch enqueue failed", jobs=len(jobs))
+        await items_collection.update_many(
+            {"_id": {"$in": [item_id for item_id, _ in jobs]}}, {"$set": {"status": "failed"}}
+        )
+        for result in results:
+            if result["status"] == "pending":
+                result["status"] = "failed"
+    await bump_wardrobe_version(batch.users_id)
+
+    return {"results": results}
+
+# Batched status poll for pending items
+@router.post("/items/status")
+async def get_items_status(req: ItemStatusRequest, current_user_id: str = Depends(get_current_user_id)):
+    try:
+        ids = [ObjectId(item_id) for item_id in req.item_ids[:200]]
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid item id")
+
+    items = await items_collection.find(
+        {"_id": {"$in": ids}, "users_id": current_user_id}, STATUS_EXCLUDE
+    ).to_list(length=len(ids))
+    for item in items:
+        item["id"] = str(item["_id"])
+        del item["_id"]
+    return items
+
+# Scrape cache hit/miss counters (process-wide, so admins only)
+@router.get("/scrape-cache/stats")
+async def get_scrape_cache_stats(current_user_id: str = Depends(require_admin)):
+    return cache_stats()
+
+# Wardrobe listing cache hit ratio and memory use (this worker only; admins only)
+@router.get("/listing-cache/stats")
+async def get_listing_cache_stats(current_user_id: str = Depends(require_admin)):
+    return listing_cache_stats()
 
 # Assign metadata to an existing item
 @router.post("/items/assign-metadata")
-async def assign_metadata(meta: MetadataRequest):
+async def assign_metadata(meta: MetadataRequest, current_user_id: str = Depends(get_current_user_id)):
     try:
-        result = await items_collection.update_one(
-            {"_id": ObjectId(meta.item_id)},
-            {
-                "$set": {
-                    "ownership": meta.ownership,
-                    "category": meta.category,
-                    "subcategory": meta.subcategory
-                }
-            }
+        changes = {
+            "ownership": meta.ownership,
+            "category": meta.category,
+            "subcategory": meta.subcategory,
+            "category_source": "user",
+        }
+        before = await items_collection.find_one_and_update(
+            {"_id": ObjectId(meta.item_id), "users_id": current_user_id},
+            {"$set": changes},
+            projection={**STAT_FIELDS, "title": 1},
+            return_document=ReturnDocument.BEFORE
         )
-        if result.modified_count == 1:
+        if before:
+            after = {**before, **changes}
+            await record_item_change(before, after)
+            await items_collection.update_one(
+                {"_id": before["_id"]}, {"$set": {"search_tokens": search_tokens(after)}}
+            )
+            await bump_wardrobe_version(current_user_id)
             return {"message": "Metadata saved"}
         else:
             raise HTTPException(status_code=404, detail="Item not found")
-    except Exception as e:
-        print(f"[Metadata Error] {e}")
+    except HTTPException:
+        raise
+    except Exception:
+        log.exception("assign metadata failed")
         raise HTTPException(status_code=500, detail="Failed to assign metadata")
 
 # Get items for a user
+# Keyset-paginated over (created_at, _id), or (price_amount, _id) with
+# ?sort=price_asc|price_desc: pass the X-Next-Cursor header from one page as
+# ?cursor= to get the next. ?fields=grid (or a comma-separated list of
+# ITEM_FIELDS) trims the payload for thumbnail views; other names are a 400.
+# ?min_price/?max_price (in major units, e.g. 50 for £50) with ?currency
+# filter on the stored numeric price.
+# Responses carry a weak ETag from the wardrobe version; If-None-Match with
+# it gets a 304 without running the listing query, and pages already built
+# at the current version are served from the in-process listing cache.
+
+GRID_FIELDS = ["title", "price", "price_amount", "price_currency", "image_url", "image_digest", "image_color", "site_name", "site_icon_url", "ownership", "status"]
+SORTS = {
+    "recent": ("created_at", True),
+    "price_asc": ("price_amount", False),
+    "price_desc": ("price_amount", True),
+}
+
+# Fields a client may ask for with ?fields= ("id" is always returned)
+ITEM_FIELDS = GRID_FIELDS + [
+    "source", "canonical_url", "images", "category", "subcategory", "category_source",
+    "price_history", "created_at", "scraped_at",
+]
+# Internal fields never sent to clients: search tokens, URL keys, dedupe link, price refresh state
+ITEM_EXCLUDE = {
+    "search_tokens": 0, "source_key": 0, "canonical_key": 0, "duplicate_of": 0,
+    "http_etag": 0, "http_last_modified": 0, "price_checked_at": 0,
+}
+# The status poll keeps duplicate_of: it's how a queued save learns it matched an earlier item
+STATUS_EXCLUDE = {name: 0 for name in ITEM_EXCLUDE if name != "duplicate_of"}
+
+def item_projection(fields: str):
+    if not fields:
+        return ITEM_EXCLUDE
+    names = GRID_FIELDS if fields == "grid" else [f.strip() for f in fields.split(",") if f.strip() and f.strip() != "id"]
+    unknown = [name for name in names if name not in ITEM_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown[:5])}")
+    projection = {name: 1 for name in names}
+    # needed for the next cursor
+    projection["created_at"] = 1
+    projection["price_amount"] = 1
+    return projection
+
+@router.get("/items/{users_id}/ownership/{ownership}", response_class=FastJSONResponse)
+async def get_items_by_ownership(
+    users_id: str,
+    ownership: str,
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str = None,
+    fields: str = None,
+    sort: str = "recent",
+    min_price: float = Query(None, ge=0),
+    max_price: float = Query(None, ge=0),
+    currency: str = None,
+    current_user_id: str = Depends(get_current_user_id),
+):
+    ensure_same_user(users_id, current_user_id)
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORTS)}")
+    sort_field, descending = SORTS[sort]
+    # Read the version before the items: a write racing this request leaves
+    # the ETag stale (next request refetches), never the body
+    version = await get_wardrobe_version(users_id)
+    etag = wardrobe_etag(version, request)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
 
-@router.get("/items/{users_id}/ownership/{ownership}")
-async def get_items_by_ownership(users_id: str, ownership: str):
-    cursor = items_collection.find({
+    async def load():
+        return await list_items_page(
+            users_id, ownership, limit, cursor, fields, sort_field, descending, min_price, max_price, currency,
+        )
+
+    body, headers = await cached_listing(users_id, listing_key(request), version, load)
+    return Response(
+        body, media_type="application/json",
+        headers={**headers, "ETag": etag, "Cache-Control": LIST_CACHE_CONTROL},
+    )
+
+async def list_items_page(users_id, ownership, limit, cursor, fields, sort_field, descending, min_price, max_price, currency):
+    """One rendered listing page: (JSON body, extra headers)."""
+    query = {
         "users_id": users_id,
         "ownership": ownership.lower()
-    }).sort("created_at", -1)
-    
-    items = await cursor.to_list(length=100)
+    }
+    if min_price is not None or max_price is not None or sort_field == "price_amount":
+        # Range on the indexed minor-unit amount; also drops unpriced items
+        price_range = {"$gte": to_minor_units(min_price, currency) if min_price is not None else 0}
+        if max_price is not None:
+            price_range["$lte"] = to_minor_units(max_price, currency)
+        query["price_amount"] = price_range
+    if currency:
+        query["price_currency"] = currency.upper()
+    if cursor:
+        query.update(keyset_filter(sort_field, cursor, descending))
+
+    items = await items_collection.find(query, item_projection(fields)) \
+        .sort(keyset_sort(sort_field, descending)) \
+        .limit(limit) \
+        .to_list(length=limit)
+
+    headers = {}
+    cursor_out = next_cursor(items, sort_field, limit)
+    if cursor_out:
+        headers["X-Next-Cursor"] = cursor_out
+    # ObjectId/datetime values are encoded by orjson directly
     for item in items:
-        item["id"] = str(item["_id"])
-        del item["_id"]
-    return items
+        item["id"] = item.pop("_id")
+    return dumps(items), headers
+
+# Search a user's wardrobe
+# Every word of ?q= must match the start of a word in the item's title,
+# retailer, category or subcategory ("lin dre" finds "Linen midi dress"),
+# so it works for search-as-you-type. Best matches first, ranked among the
+# newest 200 matching items (SEARCH_MAX_CANDIDATES); ?ownership= narrows to
+# owned or wishlist items. Versioned like the listings: same ETag/304
+# handling and listing cache.
+SEARCH_RESULT_FIELDS = GRID_FIELDS + ["category", "subcategory"]
+
+@router.get("/items/{users_id}/search", response_class=FastJSONResponse)
+async def search_wardrobe(
+    users_id: str,
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    ownership: str = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    ensure_same_user(users_id, current_user_id)
+    version = await get_wardrobe_version(users_id)
+    etag = wardrobe_etag(version, request)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    async def load():
+        items = await search_items(
+            users_id, q, ownership=ownership, limit=limit,
+            projection={name: 1 for name in SEARCH_RESULT_FIELDS},
+        )
+        for item in items:
+            item["id"] = item.pop("_id")
+        return dumps(items), {}
+
+    body, headers = await cached_listing(users_id, listing_key(request), version, load)
+    return Response(
+        body, media_type="application/json",
+        headers={**headers, "ETag": etag, "Cache-Control": LIST_CACHE_CONTROL},
+    )
 
 # Delete item
+# Also drops the item from the owner's outfits so they don't reference it.
 @router.delete("/items/{item_id}")
-async def delete_item(item_id: str):
-    result = await items_collection.delete_one({"_id": ObjectId(item_id)})
-    if result.deleted_count == 1:
-        return {"message": "Item deleted"}
-    raise HTTPException(status_code=404, detail="Item not found")
+async def delete_item(item_id: str, current_user_id: str = Depends(get_current_user_id)):
+    try:
+        oid = ObjectId(item_id)
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    deleted = await items_collection.find_one_and_delete(
+        {"_id": oid, "users_id": current_user_id}, projection=STAT_FIELDS
+    )
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Item not found")
+    await record_item_change(before=deleted)
+
+    await outfits_collection.update_many(
+        {"users_id": current_user_id, "items": item_id},
+        {"$pull": {"items": item_id}}
+    )
+    await bump_wardrobe_version(current_user_id)
+    return {"message": "Item deleted"}
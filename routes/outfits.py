@@ -1,15 +1,166 @@
-from fastapi import APIRouter, HTTPException
-from database import outfits_collection
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from database import outfits_collection, items_collection
 from models import OutfitSchema
+from utils.pagination import keyset_filter, keyset_sort, next_cursor
+from utils.auth import get_current_user_id, ensure_same_user
+from utils.responses import FastJSONResponse, dumps
+from utils.listing_cache import cached_listing
+from utils.outfit_engine import wardrobe_features
+from utils.wardrobe_version import (
+    LIST_CACHE_CONTROL, bump_wardrobe_version, get_wardrobe_version, is_not_modified, listing_key, not_modified,
+    wardrobe_etag,
+)
 
 router = APIRouter()
 
+# Item fields embedded in outfits; enough to render a card
+OUTFIT_ITEM_FIELDS = {
+    "title": 1, "price": 1, "image_url": 1, "site_name": 1,
+    "category": 1, "subcategory": 1, "ownership": 1,
+}
+
+def hydrate_pipeline(match: dict, limit: int = None, cursor: str = None) -> list:
+    """Outfits matching `match` with their wardrobe items embedded, in one round trip."""
+    if cursor:
+        match = {**match, **keyset_filter("created_at", cursor)}
+    pipeline = [{"$match": match}, {"$sort": dict(keyset_sort("created_at"))}]
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline += [
+        # Outfits store item ids as strings; convert so the lookup hits _id
+        {"$addFields": {"item_oids": {"$map": {
+            "input": {"$ifNull": ["$items", []]},
+            "as": "i",
+            "in": {"$convert": {"input": "$$i", "to": "objectId", "onError": None, "onNull": None}},
+        }}}},
+        # Joined on _id (so the lookup uses the _id index), and only the
+        # outfit owner's items, whatever ids the outfit lists
+        {"$lookup": {
+            "from": items_collection.name,
+            "localField": "item_oids",
+            "foreignField": "_id",
+            "let": {"owner": "$users_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$users_id", "$$owner"]}}},
+                {"$project": OUTFIT_ITEM_FIELDS},
+            ],
+            "as": "item_docs",
+        }},
+        {"$project": {"item_oids": 0}},
+    ]
+    return pipeline
+
+def serialize_outfit(outfit: dict) -> dict:
+    # Keep the outfit's own item order; dropped items just disappear
+    docs = {str(doc.pop("_id")): doc for doc in outfit.pop("item_docs", [])}
+    items = []
+    for item_id in outfit.get("items", []):
+        doc = docs.get(item_id)
+        if doc:
+            # A copy per occurrence: older outfits may list an item twice
+            items.append({**doc, "id": item_id})
+    outfit["item_ids"] = outfit.get("items", [])
+    outfit["items"] = items
+    outfit["id"] = str(outfit.pop("_id"))
+    return outfit
+
+async def ensure_owned_items(item_ids: list, users_id: str):
+    """400 unless every id is an item in users_id's wardrobe."""
+    try:
+        oids = {ObjectId(item_id) for item_id in item_ids}
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid item id")
+    owned = await items_collection.count_documents({"_id": {"$in": list(oids)}, "users_id": users_id})
+    if owned != len(oids):
+        raise HTTPException(status_code=400, detail="Outfits can only contain your own items")
+
 @router.post("/outfits/")
-async def create_outfit(outfit: OutfitSchema):
-    result = await outfits_collection.insert_one(outfit.dict())
+async def create_outfit(outfit: OutfitSchema, current_user_id: str = Depends(get_current_user_id)):
+    ensure_same_user(outfit.users_id, current_user_id)
+    await ensure_owned_items(outfit.items, current_user_id)
+    data = outfit.dict()
+    # An item appears in an outfit once, in the order first given
+    data["items"] = list(dict.fromkeys(outfit.items))
+    data["created_at"] = datetime.utcnow()
+    result = await outfits_collection.insert_one(data)
+    await bump_wardrobe_version(outfit.users_id)
     return {"message": "Outfit created", "id": str(result.inserted_id)}
 
-@router.get("/outfits/")
-async def get_outfits():
-    outfits = await outfits_collection.find().to_list(length=100)
-    return outfits
+# Revalidate with If-None-Match: unchanged wardrobes get a 304 without running the lookup;
+# otherwise pages built at the current wardrobe version come from the listing cache
+@router.get("/outfits/{users_id}", response_class=FastJSONResponse)
+async def get_outfits(
+    users_id: str,
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str = None,
+    current_user_id: str = Depends(get_current_user_id),
+):
+    ensure_same_user(users_id, current_user_id)
+    version = await get_wardrobe_version(users_id)
+    etag = wardrobe_etag(version, request)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    async def load():
+        outfits = await outfits_collection.aggregate(
+            hydrate_pipeline({"users_id": users_id}, limit=limit, cursor=cursor)
+        ).to_list(length=limit)
+        headers = {}
+        cursor_out = next_cursor(outfits, "created_at", limit)
+        if cursor_out:
+            headers["X-Next-Cursor"] = cursor_out
+        return dumps([serialize_outfit(outfit) for outfit in outfits]), headers
+
+    body, headers = await cached_listing(users_id, listing_key(request), version, load)
+    return Response(
+        body, media_type="application/json",
+        headers={**headers, "ETag": etag, "Cache-Control": LIST_CACHE_CONTROL},
+    )
+
+MAX_SUGGESTIONS = 50
+
+# ✅ Outfits generated from the user's owned items (see utils/outfit_engine.py);
+# pass item_id to build them around one piece. Cached like the listings above.
+# Declared before /outfits/{users_id}/{outfit_id} so "suggest" isn't taken for an id.
+@router.get("/outfits/{users_id}/suggest", response_class=FastJSONResponse)
+async def suggest_outfits(
+    users_id: str,
+    request: Request,
+    k: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    item_id: str = None,
+    current_user_id: str = Depends(get_current_user_id),
+):
+    ensure_same_user(users_id, current_user_id)
+    version = await get_wardrobe_version(users_id)
+    etag = wardrobe_etag(version, request)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    async def load():
+        features = await wardrobe_features(users_id, version)
+        if item_id and features.slot_of.get(features.row_of.get(item_id)) is None:
+            raise HTTPException(status_code=404, detail="Owned clothing item not found")
+        return dumps(features.render(features.suggest(k, anchor=item_id))), {}
+
+    body, headers = await cached_listing(users_id, listing_key(request), version, load)
+    return Response(
+        body, media_type="application/json",
+        headers={**headers, "ETag": etag, "Cache-Control": LIST_CACHE_CONTROL},
+    )
+
+@router.get("/outfits/{users_id}/{outfit_id}")
+async def get_outfit(users_id: str, outfit_id: str, current_user_id: str = Depends(get_current_user_id)):
+    ensure_same_user(users_id, current_user_id)
+    try:
+        match = {"_id": ObjectId(outfit_id), "users_id": users_id}
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Outfit not found")
+
+    outfits = await outfits_collection.aggregate(hydrate_pipeline(match, limit=1)).to_list(length=1)
+    if not outfits:
+        raise HTTPException(status_code=404, detail="Outfit not found")
+    return serialize_outfit(outfits[0])
@@ -1,16 +1,17 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from database import users_collection
 from bson import ObjectId
-import bcrypt
+from pymongo.errors import DuplicateKeyError
+from utils.user_lookup import lookup_key, lookup_fields
+from utils.passwords import hash_password, verify_password, needs_rehash
+from utils.auth import issue_token, get_current_user_id, ensure_same_user
+from utils.wardrobe_stats import read_user_stats, recompute_user_stats
+from utils.social_auth import SocialTokenError, enabled_providers, verify_id_token
+from utils.log import get_logger
 
-router = APIRouter()
-
-# Hash & Verify Helpers
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+log = get_logger("users")
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+router = APIRouter()
 
 # ✅ REGISTER USER
 @router.post("/register/")
@@ -24,14 +25,17 @@ async def register_user(data: dict):
     if not email or not username or not password:
         raise HTTPException(status_code=400, detail="Email, username, and password are required.")
 
-    # Check for duplicates
-    if await users_collection.find_one({"email": {"$regex": f"^{email}$", "$options": "i"}}):
-        raise HTTPException(status_code=409, detail="Email already in use.")
+    # Indexed pre-check: skips hashing for taken names, and still refuses
+    # duplicates if a unique index couldn't be built (see database.py)
+    taken = await users_collection.find_one(
+        {"$or": [{"email_key": lookup_key(email)}, {"username_key": lookup_key(username)}]},
+        {"email_key": 1},
+    )
+    if taken:
+        field = "Email" if taken.get("email_key") == lookup_key(email) else "Username"
+        raise HTTPException(status_code=409, detail=f"{field} already in use.")
 
-    if await users_collection.find_one({"username": {"$regex": f"^{username}$", "$options": "i"}}):
-        raise HTTPException(status_code=409, detail="Username already in use.")
-
-    hashed_pw = hash_password(password)
+    hashed_pw = await hash_password(password)
 
     new_user = {
         "email": email,
@@ -39,9 +43,15 @@ async def register_user(data: dict):
         "password": hashed_pw,
         "first_name": first_name,
         "last_name": last_name,
+        **lookup_fields(email, username),
     }
 
-    result = await users_collection.insert_one(new_user)
+    # Two concurrent registrations both pass the pre-check; the unique indexes catch the second
+    try:
+        result = await users_collection.insert_one(new_user)
+    except DuplicateKeyError as e:
+        field = "Email" if "email_key" in str((e.details or {}).get("keyPattern", {})) else "Username"
+        raise HTTPException(status_code=409, detail=f"{field} already in use.")
     user_id = str(result.inserted_id)
 
     return {
@@ -62,23 +72,30 @@ async def token_login(data: dict):
     if not email_or_username or not password:
         raise HTTPException(status_code=400, detail="Missing credentials")
 
-    query = {
-        "$or": [
-            {"email": {"$regex": f"^{email_or_username}$", "$options": "i"}},
-            {"username": {"$regex": f"^{email_or_username}$", "$options": "i"}}
-        ]
-    }
+    key = lookup_key(email_or_username)
+    query = {"$or": [{"email_key": key}, {"username_key": key}]}
 
     user = await users_collection.find_one(query)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not verify_password(password, user["password"]):
+    if not await verify_password(password, user.get("password")):
         raise HTTPException(status_code=401, detail="Incorrect password")
 
+    # Upgrade hashes made with a different BCRYPT_ROUNDS while we have the plaintext
+    if needs_rehash(user["password"]):
+        try:
+            await users_collection.update_one(
+                {"_id": user["_id"], "password": user["password"]},
+                {"$set": {"password": await hash_password(password)}}
+            )
+        except HTTPException:
+            pass  # hashing pool is saturated; try again on a later login
+
     return {
         "message": "Login successful",
+        **issue_token(str(user["_id"])),
         "user_id": str(user["_id"]),
         "email": user.get("email"),
         "username": user.get("username"),
@@ -87,41 +104,81 @@ async def token_login(data: dict):
     }
 
 # ✅ SOCIAL LOGIN
+# The client posts the provider's ID token ({"provider": "google", "id_token": ...});
+# the account is identified by the email inside it, and only once the token
+# checks out (see utils/social_auth.py). A posted email is never trusted.
 @router.post("/social-login")
 async def social_login(data: dict):
-    email = data.get("email")
+    provider = data.get("provider")
+    id_token = data.get("id_token")
+    if not provider or not id_token:
+        raise HTTPException(status_code=400, detail="provider and id_token are required for social login")
+    if provider not in enabled_providers():
+        raise HTTPException(status_code=400, detail=f"Unsupported provider; use one of {enabled_providers()}")
+    try:
+        claims = await verify_id_token(provider, id_token)
+    except SocialTokenError as e:
+        log.warning("social login rejected", provider=provider, error=str(e))
+        raise HTTPException(status_code=401, detail="Invalid social login token")
+
+    email = claims["email"].lower()
     username = data.get("username")
-    first_name = data.get("first_name", "User")
-    last_name = data.get("last_name", "")
-
-    if not email:
-        raise HTTPException(status_code=400, detail="Email is required for social login")
+    # Apple only sends the name to the client, on first sign-in; Google puts it in the token
+    first_name = claims.get("given_name") or data.get("first_name") or "User"
+    last_name = claims.get("family_name") or data.get("last_name") or ""
 
-    email = email.lower()
     username = (username or email).lower()
 
-    existing_user = await users_collection.find_one({"email": email})
+    existing_user = await users_collection.find_one({"email_key": lookup_key(email)})
 
     if existing_user:
         user_id = str(existing_user["_id"])
+        username = existing_user.get("username", username)
     else:
-        # Ensure username is unique
-        if await users_collection.find_one({"username": username}):
-            username += "_" + str(ObjectId())[-4:]
-
-        new_user = {
-            "email": email,
-            "username": username,
-            "first_name": first_name,
-            "last_name": last_name,
-            "password": "",  # No password for social login
-        }
-        result = await users_collection.insert_one(new_user)
-        user_id = str(result.inserted_id)
+        user_id = None
+        base_username = username
+        for _ in range(5):
+            new_user = {
+                "email": email,
+                "username": username,
+                "first_name": first_name,
+                "last_name": last_name,
+                "password": "",  # No password for social login
+                **lookup_fields(email, username),
+            }
+            try:
+                result = await users_collection.insert_one(new_user)
+                user_id = str(result.inserted_id)
+                break
+            except DuplicateKeyError as e:
+                if "email_key" in str((e.details or {}).get("keyPattern", {})):
+                    # Same account signed up concurrently
+                    existing_user = await users_collection.find_one({"email_key": lookup_key(email)})
+                    user_id = str(existing_user["_id"])
+                    break
+                # Ensure username is unique
+                username = base_username + "_" + str(ObjectId())[-4:]
+        if user_id is None:
+            raise HTTPException(status_code=409, detail="Could not allocate a username")
 
     return {
+        **issue_token(user_id),
         "user_id": user_id,
         "username": username,
         "first_name": first_name,
         "last_name": last_name
     }
+
+# ✅ WARDROBE STATS
+# Counts and price totals by ownership, category, subcategory and retailer,
+# read from the per-user summary document (see utils/wardrobe_stats.py).
+@router.get("/users/{users_id}/stats")
+async def get_user_stats(users_id: str, current_user_id: str = Depends(get_current_user_id)):
+    ensure_same_user(users_id, current_user_id)
+    return await read_user_stats(users_id)
+
+# Rebuild the summary from the user's items if it has drifted
+@router.post("/users/{users_id}/stats/recompute")
+async def recompute_stats(users_id: str, current_user_id: str = Depends(get_current_user_id)):
+    ensure_same_user(users_id, current_user_id)
+    return await recompute_user_stats(users_id)
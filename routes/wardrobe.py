@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from utils.auth import get_current_user_id, ensure_same_user
+from utils.wardrobe_io import ImportFormatError, export_wardrobe, import_wardrobe
+
+router = APIRouter()
+
+# ✅ Whole wardrobe (items, then outfits) as NDJSON, streamed from the cursor;
+# gzip=true for a .ndjson.gz download
+@router.get("/wardrobe/{users_id}/export")
+async def export_user_wardrobe(users_id: str, gzip: bool = False, current_user_id: str = Depends(get_current_user_id)):
+    ensure_same_user(users_id, current_user_id)
+    filename = f"wardrobe-{users_id}.ndjson" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_wardrobe(users_id, compress=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
+
+# ✅ Import an export (plain or gzipped NDJSON request body) into a wardrobe.
+# Items keep their metadata and aren't re-scraped; ones already saved are skipped.
+@router.post("/wardrobe/{users_id}/import")
+async def import_user_wardrobe(users_id: str, request: Request, current_user_id: str = Depends(get_current_user_id)):
+    ensure_same_user(users_id, current_user_id)
+    try:
+        return await import_wardrobe(users_id, request.stream())
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail={"error": str(e), **e.counts})
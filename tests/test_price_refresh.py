@@ -0,0 +1,130 @@
+"""
+Wishlist price refresh (utils.price_refresh) against a local stub shop:
+unchanged pages answer 304, a new price is recorded with its history, and
+failed fetches or crashing checks don't lose the rest of the tick.
+
+Uses the in-memory Mongo stand-in (pip install mongomock-motor).
+
+    python -m unittest tests.test_price_refresh
+"""
+
+import socket
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from benchmarks.backend import use_backend
+
+use_backend()
+
+import database  # noqa: E402
+from benchmarks.corpus import FixtureServer  # noqa: E402
+from utils import price_refresh  # noqa: E402
+from utils.http_client import close_http_client, start_http_client  # noqa: E402
+from utils.wardrobe_version import get_wardrobe_version  # noqa: E402
+
+SAVED_AT = datetime(2024, 1, 1)
+
+
+def product_page(amount: str) -> str:
+    return (
+        "<html><head><title>Linen shirt</title>"
+        f'<meta property="product:price:amount" content="{amount}">'
+        '<meta property="product:price:currency" content="GBP">'
+        "</head><body></body></html>"
+    )
+
+
+def closed_port_url() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/gone"
+
+
+class PriceRefreshTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        for collection in (database.items_collection, database.wardrobe_versions_collection, database.user_stats_collection):
+            await collection.delete_many({})
+        self.server = FixtureServer({"same": product_page("79.00"), "changed": product_page("59.00")}).__enter__()
+        await start_http_client()
+        self.delay = mock.patch.object(price_refresh, "DOMAIN_DELAY_SECONDS", 0)
+        self.delay.start()
+
+    async def asyncTearDown(self):
+        self.delay.stop()
+        await close_http_client()
+        self.server.__exit__(None, None, None)
+
+    async def add_item(self, users_id: str, url: str, etag: str = None) -> dict:
+        item = {
+            "users_id": users_id, "ownership": "wishlist", "status": "ready", "source": url,
+            "title": "Linen shirt", "price": "£79", "price_amount": 7900, "price_currency": "GBP",
+            "created_at": SAVED_AT, "price_checked_at": None, "http_etag": etag,
+        }
+        await database.items_collection.insert_one(item)
+        return item
+
+    async def stored(self, item: dict) -> dict:
+        return await database.items_collection.find_one({"_id": item["_id"]})
+
+    async def test_not_modified_changed_and_failed(self):
+        same = await self.add_item("u1", self.server.url("same"), etag=self.server.pages["/same"][1])
+        changed = await self.add_item("u2", self.server.url("changed"), etag='"old"')
+        gone = await self.add_item("u3", closed_port_url())
+
+        counts = await price_refresh.refresh_once()
+
+        self.assertEqual(counts["urls"], 3)
+        self.assertEqual(counts["changed"], 1)
+        # The 304 and the failed fetch
+        self.assertEqual(counts["not_modified"], 2)
+
+        doc = await self.stored(same)
+        self.assertEqual(doc["price_amount"], 7900)
+        self.assertIsNotNone(doc["price_checked_at"])
+        self.assertFalse(doc.get("price_history"))
+
+        doc = await self.stored(changed)
+        self.assertEqual(doc["price_amount"], 5900)
+        self.assertEqual([entry["amount"] for entry in doc["price_history"]], [7900, 5900])
+        self.assertEqual(doc["price_history"][0]["at"], SAVED_AT)
+        self.assertEqual(doc["http_etag"], self.server.pages["/changed"][1])
+
+        doc = await self.stored(gone)
+        self.assertEqual(doc["price_amount"], 7900)
+        self.assertIsNotNone(doc["price_checked_at"])
+
+        # Only the wardrobe whose price moved is invalidated
+        self.assertEqual(await get_wardrobe_version("u1"), 0)
+        self.assertEqual(await get_wardrobe_version("u2"), 1)
+        self.assertEqual(await get_wardrobe_version("u3"), 0)
+
+    async def test_crashing_check_keeps_the_rest_of_the_batch(self):
+        same = await self.add_item("u1", self.server.url("same"), etag=self.server.pages["/same"][1])
+        changed = await self.add_item("u2", self.server.url("changed"), etag='"old"')
+
+        # Only the 200 response gets parsed; the 304 never reaches this
+        with mock.patch.object(price_refresh, "extract_page_metadata", side_effect=ValueError("bad page")):
+            counts = await price_refresh.refresh_once()
+
+        self.assertEqual(counts["failed"], 1)
+        self.assertEqual(counts["checked"], 1)
+        self.assertIsNotNone((await self.stored(same))["price_checked_at"])
+        # The crashed one stays stale so the next tick retries it
+        doc = await self.stored(changed)
+        self.assertIsNone(doc["price_checked_at"])
+        self.assertEqual(doc["price_amount"], 7900)
+
+    def test_validators_only_when_the_group_agrees(self):
+        agree = [{"http_etag": '"a"', "http_last_modified": "Mon"}, {"http_etag": '"a"', "http_last_modified": "Mon"}]
+        self.assertEqual(price_refresh._validators(agree), {"If-None-Match": '"a"', "If-Modified-Since": "Mon"})
+        differ = [{"http_etag": '"a"'}, {"http_etag": '"b"'}]
+        self.assertEqual(price_refresh._validators(differ), {})
+        # An item never checked has no validators, so the group fetches unconditionally
+        unchecked = [{"http_etag": '"a"'}, {}]
+        self.assertEqual(price_refresh._validators(unchecked), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
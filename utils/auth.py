@@ -0,0 +1,52 @@
+# utils/auth.py
+# FastAPI dependency for bearer-token auth. Tokens are verified statelessly
+# (see utils/token_utils.py), so protected routes never look the user up in Mongo.
+
+import os
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError
+
+from utils.token_utils import create_access_token, decode_access_token
+
+_bearer = HTTPBearer(auto_error=False)
+ADMIN_USER_IDS = {u.strip() for u in os.getenv("ADMIN_USER_IDS", "").split(",") if u.strip()}
+
+
+def issue_token(user_id: str) -> dict:
+    return {"access_token": create_access_token({"sub": user_id}), "token_type": "bearer"}
+
+
+async def get_current_user_id(
+    credentials: HTTPAuthorizationCredentials = Depends(_bearer),
+) -> str:
+    if credentials is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        claims = decode_access_token(credentials.credentials)
+    except JWTError:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user_id = claims.get("sub")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return user_id
+
+
+def ensure_same_user(users_id: str, current_user_id: str):
+    if users_id != current_user_id:
+        raise HTTPException(status_code=403, detail="Not allowed for this user")
+
+
+async def require_admin(current_user_id: str = Depends(get_current_user_id)) -> str:
+    if current_user_id not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Admin only")
+    return current_user_id
@@ -0,0 +1,102 @@
+# utils/canonical_url.py
+# Product URL canonicalization, so the same product saved through a
+# newsletter link, an affiliate redirect or the mobile site is recognised as
+# one item and scraped once.
+#
+# canonicalize_url() gives the URL we store and fetch: affiliate/redirect
+# wrappers unwrapped, tracking parameters and fragments dropped, scheme/host
+# lowercased, default ports removed, remaining parameters sorted.
+# url_key() is the comparison key built from it: scheme and www./m./mobile.
+# host prefixes and trailing slashes don't distinguish products, so they are
+# dropped too. It is what duplicate checks and the scrape cache compare.
+
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMS = {
+    "gclid", "gclsrc", "dclid", "gbraid", "wbraid", "fbclid", "msclkid", "yclid", "twclid", "ttclid",
+    "igshid", "igsh", "mc_cid", "mc_eid", "_ga", "_gl", "_ke", "srsltid", "spm", "scid", "cmpid",
+    "ref", "ref_", "ref_src", "referrer", "trk", "trkid", "sr_share",
+    # Affiliate networks append these on the landing URL
+    "affid", "aff_id", "affiliate", "clickid", "irclickid", "irgwc", "ranmid", "raneaid", "ransiteid",
+    "sscid", "cjevent", "awc", "epik", "obOrigUrl",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_", "_hs", "oly_", "vero_")
+
+# Link wrappers that carry the real product URL in a query parameter
+REDIRECT_HOSTS = {
+    "click.linksynergy.com", "go.skimresources.com", "go.redirectingat.com", "redirect.viglink.com",
+    "www.awin1.com", "awin1.com", "www.shareasale.com", "shareasale.com", "t.cfjump.com",
+    "l.facebook.com", "lm.facebook.com", "l.instagram.com", "out.reddit.com", "href.li",
+    "www.google.com", "google.com", "l.messenger.com", "pinterest.com", "www.pinterest.com",
+}
+REDIRECT_PARAMS = ("url", "u", "murl", "ued", "dest", "destination", "redirect", "redirect_url", "target", "q", "to")
+MAX_UNWRAP = 3
+
+HOST_PREFIXES = ("www.", "m.", "mobile.")
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def _is_tracking(name: str) -> bool:
+    lowered = name.lower()
+    return lowered in TRACKING_PARAMS or name in TRACKING_PARAMS or lowered.startswith(TRACKING_PREFIXES)
+
+
+def _unwrap(url: str) -> str:
+    for _ in range(MAX_UNWRAP):
+        parts = urlsplit(url)
+        if parts.hostname not in REDIRECT_HOSTS:
+            return url
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        target = None
+        for name in REDIRECT_PARAMS:
+            value = params.get(name, "")
+            if value.lower().startswith(("http%3a", "https%3a")):
+                value = unquote(value)  # double-encoded
+            if value.lower().startswith(("http://", "https://")):
+                target = value
+                break
+        if not target:
+            return url
+        url = target
+    return url
+
+
+def canonicalize_url(url: str) -> str:
+    """Fetchable canonical form of a product URL (see module comment)."""
+    url = _unwrap(url.strip())
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    try:
+        port = parts.port
+    except ValueError:  # junk after the colon; leave the URL for the fetch to reject
+        return url
+    netloc = f"{host}:{port}" if port and str(port) != DEFAULT_PORTS.get(scheme) else host
+    path = parts.path or "/"
+    while "//" in path:
+        path = path.replace("//", "/")
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(name)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def host_key(host: str) -> str:
+    host = (host or "").lower()
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            return host[len(prefix):]
+    return host
+
+
+def url_key(url: str) -> str:
+    """Comparison key: same key, same product page."""
+    parts = urlsplit(canonicalize_url(url))
+    path = parts.path.rstrip("/") or "/"
+    key = host_key(parts.netloc) + path
+    return f"{key}?{parts.query}" if parts.query else key
+
+
+def same_site(a: str, b: str) -> bool:
+    return host_key(urlsplit(a).hostname) == host_key(urlsplit(b).hostname)
@@ -0,0 +1,199 @@
+# utils/classifier.py
+# Fills in category/subcategory for items saved without one: TF-IDF over the
+# taxonomy (each subcategory's name, keywords and parent category name form
+# one "document"), cosine similarity against the item's scraped title and
+# product URL path. Everything is a numpy matrix product, so classifying a
+# batch of items costs one (items x vocab) @ (vocab x classes) multiply.
+#
+# Titles name the product last ("Linen midi shirt dress"), so later words
+# weigh more; URL path words ("/women/dresses/...") count half. Items that
+# score below MIN_SCORE are left uncategorized rather than guessed.
+#
+#     python -m utils.classifier          # categorize items saved without a category
+
+import asyncio
+import os
+import re
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import numpy as np
+from pymongo import UpdateOne
+
+from database import items_collection
+from utils.log import get_logger
+from utils.search_index import search_tokens, words
+from utils.taxonomy import get_taxonomy
+from utils.wardrobe_stats import STAT_FIELDS, apply_stats_delta, stats_delta
+from utils.wardrobe_version import bump_wardrobe_versions
+
+log = get_logger("classifier")
+
+MIN_SCORE = float(os.getenv("CLASSIFIER_MIN_SCORE", 0.2))
+URL_WEIGHT = 0.5
+BATCH_SIZE = 1000
+# Path segments that say nothing about the product
+_URL_STOPWORDS = {"www", "com", "html", "htm", "php", "en", "gb", "uk", "us", "product", "products", "p", "item", "shop", "women", "womens", "men", "mens"}
+
+
+def stem(word: str) -> str:
+    # Plural folding is all product titles need: dresses/dress, boots/boot, jeans/jean
+    if len(word) > 4 and word.endswith("sses"):
+        return word[:-2]
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
+
+
+_COMPOUND = re.compile(r"\b(\w+)-(\w+)\b")
+
+
+def _terms(text) -> list:
+    terms = [stem(w) for w in words(text) if len(w) > 1 and not w.isdigit()]
+    if text and "-" in text:
+        # "T-shirt" is one word to shoppers; its halves alone would match "shirt"
+        terms += [stem(a + b).lower() for a, b in _COMPOUND.findall(text)]
+    return terms
+
+
+def item_features(item: dict) -> list:
+    """[(term, weight)] from the title (later words heavier) and the source URL path."""
+    features = []
+    title_terms = _terms(item.get("title"))
+    for position, term in enumerate(title_terms):
+        features.append((term, 1.0 + position / max(len(title_terms), 1)))
+    source = item.get("source") or ""
+    path = urlsplit(source).path if source.startswith(("http://", "https://")) else ""
+    for term in _terms(path.replace("-", " ").replace("/", " ")):
+        if term not in _URL_STOPWORDS:
+            features.append((term, URL_WEIGHT))
+    return features
+
+
+class Classifier:
+    def __init__(self, labels: list, vocab: dict, weights: np.ndarray, idf: np.ndarray):
+        self.labels = labels  # [(category, subcategory)], one per column
+        self.vocab = vocab  # term -> row
+        self.weights = weights  # (vocab, classes), L2-normalized TF-IDF columns
+        self.idf = idf
+
+    @classmethod
+    def from_tree(cls, tree: list) -> "Classifier":
+        documents, labels = [], []
+        for category in tree:
+            subcategories = category.get("subcategories") or [{"name": None, "keywords": []}]
+            for sub in subcategories:
+                terms = _terms(category["name"]) + _terms(" ".join(category.get("keywords") or []))
+                if sub["name"]:
+                    # The subcategory's own words count double
+                    sub_terms = _terms(sub["name"]) + _terms(" ".join(sub.get("keywords") or []))
+                    terms += sub_terms * 2
+                documents.append(terms)
+                labels.append((category["name"], sub["name"]))
+
+        vocab = {}
+        for terms in documents:
+            for term in terms:
+                vocab.setdefault(term, len(vocab))
+        counts = np.zeros((len(vocab), len(documents)), dtype=np.float32)
+        for column, terms in enumerate(documents):
+            for term in terms:
+                counts[vocab[term], column] += 1
+        document_frequency = (counts > 0).sum(axis=1)
+        idf = np.log((1 + len(documents)) / (1 + document_frequency)).astype(np.float32) + 1
+        weights = counts * idf[:, None]
+        norms = np.linalg.norm(weights, axis=0)
+        weights /= np.where(norms == 0, 1, norms)
+        return cls(labels, vocab, weights, idf)
+
+    def _matrix(self, items: list) -> np.ndarray:
+        matrix = np.zeros((len(items), len(self.vocab)), dtype=np.float32)
+        for row, item in enumerate(items):
+            for term, weight in item_features(item):
+                column = self.vocab.get(term)
+                if column is not None:
+                    matrix[row, column] += weight
+        matrix *= self.idf[None, :]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def classify(self, items: list) -> list:
+        """[(category, subcategory, score) or None] for each item, in one matrix product."""
+        if not items or not self.labels:
+            return [None] * len(items)
+        scores = self._matrix(items) @ self.weights
+        best = scores.argmax(axis=1)
+        results = []
+        for row, column in enumerate(best):
+            score = float(scores[row, column])
+            if score < MIN_SCORE:
+                results.append(None)
+            else:
+                category, subcategory = self.labels[column]
+                results.append((category, subcategory, round(score, 3)))
+        return results
+
+
+async def classify_items(items: list) -> list:
+    """Category fields to $set for each item ({} when unsure), using the current taxonomy."""
+    snapshot = await get_taxonomy()
+    return [
+        {"category": found[0], "subcategory": found[1], "category_source": "auto"} if found else {}
+        for found in snapshot.classifier.classify(items)
+    ]
+
+
+async def backfill_categories(batch_size: int = BATCH_SIZE) -> dict:
+    """Classify items that have no category and weren't categorized by their owner."""
+    cursor = items_collection.find(
+        {"category": None, "category_source": {"$ne": "user"}, "status": {"$ne": "pending"}},
+        {**STAT_FIELDS, "title": 1, "source": 1},
+        batch_size=batch_size,
+    )
+    counts = {"seen": 0, "classified": 0}
+    batch = []
+
+    async def flush():
+        ops, deltas = [], {}
+        for item, fields in zip(batch, await classify_items(batch)):
+            if not fields:
+                continue
+            after = {**item, **fields}
+            ops.append(UpdateOne(
+                {"_id": item["_id"], "category": None},
+                {"$set": {**fields, "search_tokens": search_tokens(after)}},
+            ))
+            user_delta = deltas.setdefault(item["users_id"], {})
+            for path, value in stats_delta(item, after).items():
+                user_delta[path] = user_delta.get(path, 0) + value
+        if ops:
+            await items_collection.bulk_write(ops, ordered=False)
+            for users_id, inc in deltas.items():
+                await apply_stats_delta(users_id, inc)
+            await bump_wardrobe_versions(deltas)
+        counts["classified"] += len(ops)
+
+    async for item in cursor:
+        counts["seen"] += 1
+        batch.append(item)
+        if len(batch) >= batch_size:
+            await flush()
+            batch = []
+    if batch:
+        await flush()
+    return counts
+
+
+if __name__ == "__main__":
+    from utils.taxonomy import seed_taxonomy
+
+    async def _main():
+        started = datetime.utcnow()
+        await seed_taxonomy()
+        counts = await backfill_categories()
+        log.info("category backfill done", seconds=(datetime.utcnow() - started).total_seconds(), **counts)
+        print(counts)
+
+    asyncio.run(_main())
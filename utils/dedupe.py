@@ -0,0 +1,273 @@
+# utils/dedupe.py
+# Near-duplicate items within a wardrobe: the same product saved twice under
+# URLs that canonicalize differently (a colour param, a regional path), or
+# whose page declares the other's URL as rel=canonical.
+#
+# Two items are duplicates if they share a URL key (source_key or
+# canonical_key), or show the same image with similar titles, or come from the
+# same retailer with near-identical titles. Titles are compared as sets of
+# character trigrams (Jaccard), which shrugs off word order, punctuation and
+# "| COS"-style suffixes.
+#
+# Titles only count for scraped items with a real title: failed scrapes all
+# share the "Unknown Product" placeholder and must never match on it.
+#
+# Newly scraped items are checked against the user's existing ones and
+# flagged with duplicate_of; the batch job below clusters whole wardrobes and,
+# with --apply, keeps one item per cluster and repoints outfits at it. Since
+# merging deletes items, it only merges on URL-key or image matches; title-only
+# matches are reported for review.
+#
+#     python -m utils.dedupe [--apply] [users_id ...]
+
+import asyncio
+import math
+import re
+import sys
+from collections import Counter
+from urllib.parse import urlsplit
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database import items_collection, outfits_collection
+from utils.canonical_url import host_key, url_key
+from utils.search_index import words
+from utils.wardrobe_stats import STAT_FIELDS, record_item_change
+from utils.wardrobe_version import bump_wardrobe_version
+
+# Same image: titles only need to be broadly similar (retailers retitle products)
+IMAGE_TITLE_THRESHOLD = 0.5
+# Title alone, same retailer: colour/size variants differ by a word, so be strict
+TITLE_THRESHOLD = 0.9
+# What the scrapers store when a page has no usable title
+PLACEHOLDER_TITLES = {"unknown product"}
+MATCH_KINDS = ("url", "image", "title")
+# Matches strong enough for the batch job to delete an item over
+MERGE_KINDS = ("url", "image")
+# Blocks bigger than this are only compared pairwise along a chain
+MAX_BLOCK = 200
+BATCH_SIZE = 500
+
+DEDUPE_FIELDS = {
+    "title": 1, "image_url": 1, "image_digest": 1, "site_name": 1, "source": 1,
+    "source_key": 1, "canonical_key": 1, "ownership": 1, "created_at": 1, "users_id": 1, "status": 1,
+}
+
+
+def title_shingles(title) -> set:
+    text = " ".join(words(title))
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def image_key(item: dict):
+    if item.get("image_digest"):
+        return "digest:" + item["image_digest"]
+    url = item.get("image_url")
+    if not url:
+        return None
+    # CDNs put sizing/format in the query string; the path identifies the image
+    parts = urlsplit(url)
+    return host_key(parts.hostname) + parts.path if parts.hostname else None
+
+
+def url_keys(item: dict) -> set:
+    keys = {item.get("source_key"), item.get("canonical_key")}
+    if not item.get("source_key") and item.get("source"):
+        keys.add(url_key(item["source"]))
+    keys.discard(None)
+    return keys
+
+
+def has_real_title(item: dict) -> bool:
+    """Scraped successfully, with a title worth comparing."""
+    title = " ".join(words(item.get("title")))
+    return item.get("status") == "ready" and bool(title) and title not in PLACEHOLDER_TITLES
+
+
+def match_kind(a: dict, b: dict, shingles_a: set = None, shingles_b: set = None):
+    """Why a and b are near-duplicates ("url", "image" or "title"), or None."""
+    if url_keys(a) & url_keys(b):
+        return "url"
+    if not (has_real_title(a) and has_real_title(b)):
+        return None
+    same_image = image_key(a) is not None and image_key(a) == image_key(b)
+    same_site = a.get("site_name") and a.get("site_name") == b.get("site_name")
+    if not (same_image or same_site):
+        return None
+    similarity = jaccard(
+        shingles_a if shingles_a is not None else title_shingles(a.get("title")),
+        shingles_b if shingles_b is not None else title_shingles(b.get("title")),
+    )
+    if same_image and similarity >= IMAGE_TITLE_THRESHOLD:
+        return "image"
+    if same_site and similarity >= TITLE_THRESHOLD:
+        return "title"
+    return None
+
+
+def is_near_duplicate(a: dict, b: dict, shingles_a: set = None, shingles_b: set = None) -> bool:
+    return match_kind(a, b, shingles_a, shingles_b) is not None
+
+
+async def find_duplicate(item: dict):
+    """An existing item of the same user that `item` near-duplicates, or None."""
+    keys = list(url_keys(item))
+    clauses = [{"source_key": {"$in": keys}}, {"canonical_key": {"$in": keys}}] if keys else []
+    if item.get("image_url"):
+        # Anchored prefix (still an index range): same image at any CDN size
+        base = item["image_url"].split("?", 1)[0].split("#", 1)[0]
+        clauses.append({"image_url": {"$regex": "^" + re.escape(base)}})
+    if not clauses:
+        return None
+    candidates = await items_collection.find(
+        {"users_id": item["users_id"], "_id": {"$ne": item.get("_id")}, "$or": clauses},
+        DEDUPE_FIELDS,
+    ).sort("created_at", 1).limit(20).to_list(length=20)
+    return next((c for c in candidates if is_near_duplicate(item, c)), None)
+
+
+def cluster_items(items: list, kinds: tuple = MATCH_KINDS) -> list:
+    """Groups (lists of items, oldest first) of two or more items linked by matches of `kinds`."""
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        parent[find(i)] = find(j)
+
+    shingles = [title_shingles(item.get("title")) if has_real_title(item) else set() for item in items]
+    blocks = {}
+    for index, item in enumerate(items):
+        for key in url_keys(item):
+            blocks.setdefault(("url", key), []).append(index)
+        if image_key(item) and shingles[index]:
+            blocks.setdefault(("image", image_key(item)), []).append(index)
+    # Same-retailer title matches, by prefix filtering: order each title's
+    # trigrams rarest first; two sets with Jaccard >= t must share one of
+    # their first len - ceil(t * len) + 1 trigrams, so only those are indexed
+    frequency = Counter(shingle for title in shingles for shingle in title)
+    for index, item in enumerate(items):
+        ordered = sorted(shingles[index], key=lambda shingle: (frequency[shingle], shingle))
+        prefix = len(ordered) - math.ceil(TITLE_THRESHOLD * len(ordered)) + 1
+        for shingle in ordered[:prefix]:
+            blocks.setdefault(("title", item.get("site_name"), shingle), []).append(index)
+
+    candidates = set()
+    for members in blocks.values():
+        if len(members) > MAX_BLOCK:
+            # Degenerate block (e.g. a placeholder image on every item): chain it
+            candidates.update(zip(members, members[1:]))
+            continue
+        for i, a in enumerate(members):
+            candidates.update((a, b) for b in members[i + 1:])
+
+    for a, b in candidates:
+        if find(a) != find(b) and match_kind(items[a], items[b], shingles[a], shingles[b]) in kinds:
+            union(a, b)
+
+    groups = {}
+    for index in range(len(items)):
+        groups.setdefault(find(index), []).append(items[index])
+    return [sorted(group, key=_keep_first) for group in groups.values() if len(group) > 1]
+
+
+def _keep_first(item: dict):
+    # The item a cluster collapses into: owned over wishlist, then the oldest
+    saved_at = item.get("created_at") or item["_id"].generation_time.replace(tzinfo=None)
+    return item.get("ownership") != "own", saved_at
+
+
+async def _write_keys(ops: list, counts: dict):
+    try:
+        result = await items_collection.bulk_write(ops, ordered=False)
+        counts["keyed"] += result.modified_count
+    except BulkWriteError as e:
+        # Unmerged duplicates collide on the unique index; they stay keyless until merged
+        counts["keyed"] += e.details.get("nModified", 0)
+        counts["conflicts"] += len(e.details.get("writeErrors", []))
+
+
+async def backfill_source_keys(batch_size: int = BATCH_SIZE) -> dict:
+    """Give items saved before canonicalization their source_key."""
+    ops = []
+    counts = {"keyed": 0, "conflicts": 0}
+    async for item in items_collection.find({"source_key": {"$exists": False}}, {"source": 1}, batch_size=batch_size):
+        if not item.get("source"):
+            continue
+        ops.append(UpdateOne({"_id": item["_id"]}, {"$set": {"source_key": url_key(item["source"])}}))
+        if len(ops) >= batch_size:
+            await _write_keys(ops, counts)
+            ops = []
+    if ops:
+        await _write_keys(ops, counts)
+    return counts
+
+
+async def _merge(users_id: str, keep: dict, duplicates: list):
+    keep_id = str(keep["_id"])
+    dup_ids = {str(item["_id"]) for item in duplicates}
+    async for outfit in outfits_collection.find({"users_id": users_id, "items": {"$in": list(dup_ids)}}, {"items": 1}):
+        merged = []
+        for item_id in outfit.get("items", []):
+            item_id = keep_id if item_id in dup_ids else item_id
+            if item_id not in merged:
+                merged.append(item_id)
+        await outfits_collection.update_one({"_id": outfit["_id"]}, {"$set": {"items": merged}})
+    for item in duplicates:
+        deleted = await items_collection.find_one_and_delete(
+            {"_id": item["_id"], "users_id": users_id}, projection=STAT_FIELDS
+        )
+        if deleted:
+            await record_item_change(before=deleted)
+
+
+async def dedupe_user(users_id: str, apply: bool = False) -> dict:
+    items = await items_collection.find({"users_id": users_id}, DEDUPE_FIELDS).to_list(length=None)
+    clusters = cluster_items(items, kinds=MERGE_KINDS)
+    if apply and clusters:
+        for keep, *duplicates in clusters:
+            await _merge(users_id, keep, duplicates)
+        await bump_wardrobe_version(users_id)
+    title_only = sum(len(cluster) - 1 for cluster in cluster_items(items)) - sum(len(c) - 1 for c in clusters)
+    return {
+        "items": len(items),
+        "clusters": len(clusters),
+        "duplicates": sum(len(cluster) - 1 for cluster in clusters),
+        # Same retailer, near-identical title, but no shared URL or image: never merged
+        "title_only": title_only,
+        "examples": [[item.get("title") for item in cluster] for cluster in clusters[:5]],
+    }
+
+
+async def _main(args):
+    apply = "--apply" in args
+    users = [a for a in args if not a.startswith("--")] or await items_collection.distinct("users_id")
+    total = 0
+    for users_id in users:
+        report = await dedupe_user(users_id, apply=apply)
+        if report["duplicates"]:
+            total += report["duplicates"]
+            print(f"[Dedupe] {users_id}: {report['duplicates']} duplicates in {report['clusters']} clusters {report['examples']}")
+        if report["title_only"]:
+            print(f"[Dedupe] {users_id}: {report['title_only']} more look alike by title only (not merged)")
+    action = "removed" if apply else "found (dry run; pass --apply to merge)"
+    print(f"[Dedupe] {total} duplicates {action} across {len(users)} users")
+    # After merging, so merged-away duplicates can't collide on the unique index
+    print(f"[Dedupe] source_key backfill: {await backfill_source_keys()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
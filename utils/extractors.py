@@ -0,0 +1,239 @@
+# utils/extractors.py
+# Price extractors, tried per domain in the order that has worked best there.
+# Generic strategies (meta tags, CSS price classes, JSON-LD offers) apply to
+# every site; hand-written ones are registered for specific domains:
+#
+#     @extractor("zara_money", domains=["zara.com"], css=[("span", "money-amount__main")])
+#     def _zara(page):
+#         raw = page.css_price([("span", "money-amount__main")])
+#         return price_fields(raw, "EUR") if raw else None
+#
+# An extractor takes a PageMetadata and returns price_fields(...) or None.
+# Every scrape records, per domain, which extractor produced the price and
+# whether the static fetch was enough or the page needed the browser. Those
+# counts live in Mongo (extractor_stats) so all workers learn from each other.
+
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from database import extractor_stats_collection
+from utils.log import get_logger
+from utils.prices import price_fields
+
+log = get_logger("extractors")
+
+STATS_TTL_SECONDS = int(os.getenv("EXTRACTOR_STATS_TTL", 300))
+# A domain skips the static fetch once this many static attempts have mostly
+# failed while the browser worked; 1 in STATIC_PROBE_EVERY scrapes still
+# tries static so a site that drops client-side rendering is noticed.
+MIN_SAMPLES = int(os.getenv("EXTRACTOR_MIN_SAMPLES", 5))
+RENDER_ONLY_BELOW = float(os.getenv("EXTRACTOR_RENDER_ONLY_BELOW", 0.1))
+STATIC_PROBE_EVERY = int(os.getenv("EXTRACTOR_STATIC_PROBE_EVERY", 20))
+
+
+@dataclass
+class Extractor:
+    name: str
+    fn: callable
+    css: tuple = ()
+
+
+@dataclass
+class ExtractionPlan:
+    domain: str
+    extractors: list
+    skip_static: bool = False
+    css_selectors: tuple = field(default_factory=tuple)
+
+    @property
+    def parse_options(self) -> dict:
+        """extract_page_metadata() kwargs that keep early stopping safe for this order."""
+        first = self.extractors[0].name if self.extractors else "meta"
+        return {
+            "need_json_ld": first == "json_ld",
+            "css_selectors": self.css_selectors,
+            # Stopping at the end of <head> would skip body prices a CSS/site extractor wants
+            "stop_early": first in ("meta", "json_ld"),
+        }
+
+
+GENERIC = []  # in default order
+SITE = {}  # domain -> [Extractor], always ahead of the generic ones by default
+_stats = {}  # domain -> (expires_monotonic, doc)
+
+
+def extractor(name: str, domains=(), css=()):
+    """Register fn as a price extractor; domain-specific when domains is given."""
+    if "." in name or name.startswith("$"):
+        raise ValueError(f"Extractor name {name!r} can't be used as a Mongo field")
+
+    def register(fn):
+        entry = Extractor(name, fn, tuple(css))
+        if domains:
+            for domain in domains:
+                SITE.setdefault(domain.lower(), []).append(entry)
+        else:
+            GENERIC.append(entry)
+        return fn
+    return register
+
+
+@extractor("meta")
+def _meta(page):
+    raw = page.meta_price()
+    return price_fields(raw, page.currency) if raw else None
+
+
+@extractor("css")
+def _css(page):
+    raw = page.css_price()
+    return price_fields(raw, page.currency) if raw else None
+
+
+@extractor("json_ld")
+def _json_ld(page):
+    offer = page.json_ld_offer()
+    return price_fields(*offer) if offer else None
+
+
+def _rate(counts: dict) -> float:
+    # Laplace-smoothed success rate so one lucky hit doesn't outrank a long record
+    counts = counts or {}
+    return (counts.get("hits", 0) + 1) / (counts.get("tries", 0) + 2)
+
+
+def _site_extractors(domain: str) -> list:
+    # "shop.example.com" also gets extractors registered for "example.com"
+    parts = domain.split(".")
+    found = []
+    for i in range(len(parts) - 1):
+        found.extend(SITE.get(".".join(parts[i:]), []))
+    return found
+
+
+async def _load_stats(domain: str) -> dict:
+    cached = _stats.get(domain)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    try:
+        doc = await extractor_stats_collection.find_one({"_id": domain}) or {}
+    except Exception as e:
+        log.warning("could not load stats", domain=domain, error=str(e))
+        doc = cached[1] if cached else {}
+    _stats[domain] = (time.monotonic() + STATS_TTL_SECONDS, doc)
+    return doc
+
+
+def is_render_only(doc: dict) -> bool:
+    static = doc.get("static") or {}
+    rendered = doc.get("rendered") or {}
+    if static.get("tries", 0) < MIN_SAMPLES or not rendered.get("hits"):
+        return False
+    return static.get("hits", 0) / static["tries"] < RENDER_ONLY_BELOW
+
+
+def _skip_static(doc: dict) -> bool:
+    return is_render_only(doc) and random.randrange(STATIC_PROBE_EVERY) != 0
+
+
+def build_plan(domain: str, doc: dict = None) -> ExtractionPlan:
+    doc = doc or {}
+    candidates = _site_extractors(domain) + GENERIC
+    strategies = doc.get("strategies") or {}
+    # sorted() is stable, so ties (e.g. nothing tried yet) keep registration order
+    ordered = sorted(candidates, key=lambda e: -_rate(strategies.get(e.name)))
+    css = tuple(selector for e in candidates for selector in e.css)
+    return ExtractionPlan(domain, ordered, _skip_static(doc), css)
+
+
+async def get_plan(domain: str) -> ExtractionPlan:
+    return build_plan(domain, await _load_stats(domain))
+
+
+def default_plan() -> ExtractionPlan:
+    return ExtractionPlan("", list(GENERIC))
+
+
+def run_extractors(plan: ExtractionPlan, page):
+    """(price fields, winning extractor name or None, names tried in order)."""
+    tried = []
+    for entry in plan.extractors:
+        tried.append(entry.name)
+        try:
+            fields = entry.fn(page)
+        except Exception as e:
+            log.warning("extractor failed", extractor=entry.name, domain=plan.domain, error=str(e))
+            fields = None
+        if fields and fields.get("price") is not None:
+            return fields, entry.name, tried
+    return price_fields(None), None, tried
+
+
+def _bump(doc: dict, path: str, amount: int = 1):
+    *parents, leaf = path.split(".")
+    for key in parents:
+        doc = doc.setdefault(key, {})
+    doc[leaf] = doc.get(leaf, 0) + amount
+
+
+async def record_scrape(domain: str, fetches: dict, tried: list, winner: str = None):
+    """
+    fetches: {"static": ok, "rendered": ok} for the fetch modes attempted.
+    tried/winner come from run_extractors on the page that was kept.
+    """
+    inc = {}
+    for mode, ok in fetches.items():
+        inc[f"{mode}.tries"] = 1
+        inc[f"{mode}.hits"] = int(bool(ok))
+    for name in tried:
+        inc[f"strategies.{name}.tries"] = 1
+        inc[f"strategies.{name}.hits"] = int(name == winner)
+    if not inc:
+        return
+
+    # Apply locally too so this worker learns before its cached copy expires
+    cached = _stats.get(domain)
+    if cached:
+        for path, amount in inc.items():
+            _bump(cached[1], path, amount)
+    try:
+        await extractor_stats_collection.update_one(
+            {"_id": domain},
+            {"$inc": inc, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+    except Exception as e:
+        log.warning("could not record stats", domain=domain, error=str(e))
+
+
+def forget(domain: str):
+    _stats.pop(domain, None)
+
+
+def describe(doc: dict) -> dict:
+    """Admin view of one domain's stats and the plan they currently produce."""
+    domain = doc["_id"]
+    plan = build_plan(domain, doc)
+
+    def summary(counts):
+        counts = counts or {}
+        tries = counts.get("tries", 0)
+        return {
+            "tries": tries,
+            "hits": counts.get("hits", 0),
+            "success_rate": round(counts.get("hits", 0) / tries, 3) if tries else None,
+        }
+
+    return {
+        "domain": domain,
+        "order": [e.name for e in plan.extractors],
+        "render_only": is_render_only(doc),
+        "static": summary(doc.get("static")),
+        "rendered": summary(doc.get("rendered")),
+        "strategies": {name: summary(c) for name, c in (doc.get("strategies") or {}).items()},
+        "site_extractors": [e.name for e in _site_extractors(domain)],
+        "updated_at": doc.get("updated_at"),
+    }
@@ -0,0 +1,240 @@
+# utils/html_extract.py
+# Single-pass product metadata extraction. Instead of building a full
+# BeautifulSoup tree and searching it over and over, one streaming pass with
+# the stdlib HTMLParser records everything the scrapers look at.
+
+import json
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+
+from utils.prices import parse_offer
+
+FEED_CHUNK = 64 * 1024
+
+META_PROPERTIES = (
+    "product:price:amount",
+    "og:price:amount",
+    "product:price:currency",
+    "og:title",
+    "og:site_name",
+)
+
+# Same order the scrapers used to try their soup.find() selectors in
+META_PRICE_KEYS = ("product:price:amount", "og:price:amount")
+CSS_PRICE_SELECTORS = (
+    ("span", "price"),
+    ("div", "price"),
+    ("span", "current-price"),
+    ("span", "product-price"),
+)
+
+
+@dataclass
+class PageMetadata:
+    title: str = None  # None when the page has no <title>
+    meta: dict = field(default_factory=dict)  # first content per META_PROPERTIES key
+    og_images: list = field(default_factory=list)  # og:image contents in document order
+    icon_href: str = None
+    icon_found: bool = False
+    canonical_href: str = None  # <link rel="canonical">
+    json_ld: list = field(default_factory=list)  # raw JSON-LD script bodies
+    css_prices: dict = field(default_factory=dict)  # (tag, class) -> text of first match, incl. extra selectors
+    stopped_early: bool = False
+
+    @property
+    def currency(self) -> str:
+        return self.meta.get("product:price:currency") or ""
+
+    def price_candidate(self):
+        """First usable raw price from the meta tags, then the CSS selectors."""
+        return self.meta_price() or self.css_price()
+
+    def meta_price(self):
+        for key in META_PRICE_KEYS:
+            raw = self.meta.get(key)
+            if raw and "menu" not in raw.lower():
+                return raw
+        return None
+
+    def css_price(self, selectors=CSS_PRICE_SELECTORS):
+        for selector in selectors:
+            raw = self.css_prices.get(selector)
+            if raw and "menu" not in raw.lower():
+                return raw
+        return None
+
+    def json_ld_offer(self):
+        """(price, currency) from the first JSON-LD block with an offers price."""
+        for block in self.json_ld:
+            offer = _offer_from_json_ld(block)
+            if offer:
+                return offer
+        return None
+
+
+def _offer_from_json_ld(raw: str):
+    try:
+        data = json.loads(raw)
+    except Exception:
+        return None
+    entries = data if isinstance(data, list) else [data]
+    for entry in entries:
+        if isinstance(entry, dict) and isinstance(entry.get("@graph"), list):
+            entries.extend(entry["@graph"])
+        if isinstance(entry, dict):
+            offer = parse_offer(entry.get("offers"))
+            if offer:
+                return offer
+    return None
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _MetadataParser(HTMLParser):
+    def __init__(self, need_json_ld: bool, css_selectors=(), stop_early: bool = True):
+        super().__init__(convert_charrefs=True)
+        self.page = PageMetadata()
+        self.need_json_ld = need_json_ld
+        self.css_selectors = CSS_PRICE_SELECTORS + tuple(css_selectors)
+        self._css_tags = {tag for tag, _ in self.css_selectors}
+        self.stop_early = stop_early
+        self.head_done = False
+        self._json_ld_price = False
+        self._title_parts = None
+        self._script_parts = None
+        # Open price elements being captured: [tag, selector_keys, depth, parts]
+        self._captures = []
+
+    def _can_stop(self) -> bool:
+        if not self.stop_early or not self.head_done or self.page.title is None:
+            return False
+        if self.need_json_ld:
+            return self._json_ld_price
+        # A usable meta price outranks every CSS candidate further down
+        return any(
+            self.page.meta.get(key) and "menu" not in self.page.meta[key].lower()
+            for key in META_PRICE_KEYS
+        )
+
+    def handle_starttag(self, tag, attrs):
+        for capture in self._captures:
+            if capture[0] == tag:
+                capture[2] += 1
+
+        if tag == "title" and self.page.title is None and self._title_parts is None:
+            self._title_parts = []
+        elif tag == "meta":
+            self._handle_meta(dict(attrs))
+        elif tag == "link":
+            self._handle_link(dict(attrs))
+        elif tag == "script":
+            if dict(attrs).get("type") == "application/ld+json":
+                self._script_parts = []
+        elif tag in self._css_tags:
+            self._maybe_capture_price(tag, dict(attrs))
+        elif tag == "body" and not self.head_done:
+            self.head_done = True
+            if self._can_stop():
+                raise _StopParsing
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "meta":
+            self._handle_meta(dict(attrs))
+        elif tag == "link":
+            self._handle_link(dict(attrs))
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._title_parts is not None:
+            self.page.title = "".join(self._title_parts)
+            self._title_parts = None
+        elif tag == "script" and self._script_parts is not None:
+            raw = "".join(self._script_parts)
+            self._script_parts = None
+            self.page.json_ld.append(raw)
+            if not self._json_ld_price and _offer_from_json_ld(raw):
+                self._json_ld_price = True
+        elif tag == "head":
+            self.head_done = True
+
+        for capture in list(self._captures):
+            if capture[0] != tag:
+                continue
+            capture[2] -= 1
+            if capture[2] == 0:
+                self._captures.remove(capture)
+                text = "".join(capture[3])
+                for key in capture[1]:
+                    self.page.css_prices.setdefault(key, text)
+
+        if self.head_done and self._can_stop():
+            raise _StopParsing
+
+    def handle_data(self, data):
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+        if self._script_parts is not None:
+            self._script_parts.append(data)
+        for capture in self._captures:
+            capture[3].append(data)
+
+    def _handle_meta(self, attrs):
+        prop = attrs.get("property")
+        if prop == "og:image":
+            self.page.og_images.append(attrs.get("content"))
+        elif prop in META_PROPERTIES and prop not in self.page.meta:
+            self.page.meta[prop] = attrs.get("content")
+
+    def _handle_link(self, attrs):
+        rel = (attrs.get("rel") or "").lower()
+        if rel == "canonical" and self.page.canonical_href is None:
+            self.page.canonical_href = attrs.get("href")
+            return
+        if self.page.icon_found:
+            return
+        if rel and "icon" in rel:
+            self.page.icon_found = True
+            self.page.icon_href = attrs.get("href")
+
+    def _maybe_capture_price(self, tag, attrs):
+        classes = (attrs.get("class") or "").split()
+        if not classes:
+            return
+        keys = [
+            (sel_tag, sel_class) for sel_tag, sel_class in self.css_selectors
+            if sel_tag == tag and sel_class in classes
+            and (sel_tag, sel_class) not in self.page.css_prices
+            and not any((sel_tag, sel_class) in c[1] for c in self._captures)
+        ]
+        if keys:
+            self._captures.append([tag, keys, 1, []])
+
+
+def extract_page_metadata(
+    html: str, need_json_ld: bool = False, css_selectors=(), stop_early: bool = True
+) -> PageMetadata:
+    """
+    Walk html once and collect title, meta/og tags, icons, JSON-LD blocks and
+    price candidates. Parsing stops once <head> is done and the page already
+    has a meta price (or, with need_json_ld, a JSON-LD offer price), since
+    nothing later in the body could change the result. css_selectors adds
+    (tag, class) pairs to capture (site-specific extractors); stop_early=False
+    reads the whole document for extractors that prefer body content.
+    """
+    parser = _MetadataParser(need_json_ld, css_selectors, stop_early)
+    try:
+        for start in range(0, len(html), FEED_CHUNK):
+            parser.feed(html[start:start + FEED_CHUNK])
+        parser.close()
+    except _StopParsing:
+        parser.page.stopped_early = True
+
+    page = parser.page
+    # Unclosed tags at EOF still count, as they did in the soup tree
+    if page.title is None and parser._title_parts is not None:
+        page.title = "".join(parser._title_parts)
+    for capture in parser._captures:
+        for key in capture[1]:
+            page.css_prices.setdefault(key, "".join(capture[3]))
+    return page
@@ -0,0 +1,134 @@
+# utils/http_client.py
+# Shared async HTTP client used by the scrapers. It is created once on app
+# startup and closed on shutdown so connections are kept alive between scrapes.
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+import httpx
+
+from utils.metrics import http_trace, observe_stage
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+DEFAULT_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-GB,en;q=0.9",
+}
+
+MAX_CONNECTIONS = int(os.getenv("SCRAPER_MAX_CONNECTIONS", 100))
+MAX_KEEPALIVE = int(os.getenv("SCRAPER_MAX_KEEPALIVE", 20))
+MAX_PER_HOST = int(os.getenv("SCRAPER_MAX_PER_HOST", 4))
+MAX_RESPONSE_BYTES = int(os.getenv("SCRAPER_MAX_RESPONSE_BYTES", 5 * 1024 * 1024))
+FETCH_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", 10))
+
+
+class ResponseTooLarge(Exception):
+    pass
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status_code: int
+    text: str
+    headers: dict = field(default_factory=dict)
+    content: bytes = b""
+
+
+_client: httpx.AsyncClient = None
+_host_limits: dict = {}
+
+
+def _accept_encoding() -> str:
+    # httpx decodes brotli transparently when the brotli package is installed
+    try:
+        import brotli  # noqa: F401
+        return "gzip, deflate, br"
+    except ImportError:
+        return "gzip, deflate"
+
+
+async def start_http_client():
+    global _client
+    if _client is not None:
+        return
+    _client = httpx.AsyncClient(
+        headers={**DEFAULT_HEADERS, "Accept-Encoding": _accept_encoding()},
+        timeout=httpx.Timeout(FETCH_TIMEOUT, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE,
+            keepalive_expiry=30.0,
+        ),
+        follow_redirects=True,
+        max_redirects=5,
+    )
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_limits.clear()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    if _client is None:
+        raise RuntimeError("HTTP client not started; call start_http_client() on startup")
+    return _client
+
+
+def host_limit(url: str) -> asyncio.Semaphore:
+    host = urlparse(url).netloc.lower()
+    sem = _host_limits.get(host)
+    if sem is None:
+        sem = _host_limits[host] = asyncio.Semaphore(MAX_PER_HOST)
+    return sem
+
+
+async def fetch(url: str, headers: dict = None, max_bytes: int = MAX_RESPONSE_BYTES) -> FetchResult:
+    """
+    GET a page through the shared client, streaming the body so anything over
+    max_bytes is rejected without being buffered in full.
+    """
+    client = get_http_client()
+    domain = urlparse(url).netloc.lower().replace("www.", "")
+    async with host_limit(url):
+        async with client.stream(
+            "GET", url, headers=headers, extensions={"trace": http_trace(domain)}
+        ) as response:
+            started = time.perf_counter()
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise ResponseTooLarge(f"{url} declared {declared} bytes")
+
+            chunks = []
+            received = 0
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                if received > max_bytes:
+                    raise ResponseTooLarge(f"{url} exceeded {max_bytes} bytes")
+                chunks.append(chunk)
+
+            body = b"".join(chunks)
+            observe_stage("download", domain, time.perf_counter() - started)
+            try:
+                text = body.decode(response.charset_encoding or "utf-8", errors="replace")
+            except LookupError:
+                text = body.decode("utf-8", errors="replace")
+            return FetchResult(
+                url=str(response.url),
+                status_code=response.status_code,
+                text=text,
+                headers=dict(response.headers),
+                content=body,
+            )
+
+
+async def fetch_html(url: str) -> str:
+    return (await fetch(url)).text
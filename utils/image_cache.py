@@ -0,0 +1,308 @@
+# utils/image_cache.py
+# Retailer images fetched once and kept on local disk under the SHA-256 of
+# their bytes, so the same picture saved by many users (or under several CDN
+# URLs) is stored and thumbnailed once. Layout:
+#
+#     IMAGE_CACHE_DIR/ab/abcdef.../source      original bytes
+#     IMAGE_CACHE_DIR/ab/abcdef.../md.webp     thumbnails, made on demand
+#
+# Which URL maps to which digest lives in Mongo so every worker shares it.
+# Files are evicted oldest-first (by mtime, bumped on every serve) once the
+# directory grows past IMAGE_CACHE_MAX_BYTES; anything evicted is rebuilt
+# from the original URL next time it's asked for.
+
+import asyncio
+import hashlib
+import io
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from PIL import Image, UnidentifiedImageError
+
+from database import image_cache_collection, items_collection
+from utils.http_client import fetch
+from utils.log import get_logger
+from utils.single_flight import SingleFlight
+from utils.wardrobe_version import bump_wardrobe_version
+
+log = get_logger("image_cache")
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(os.getcwd(), "image_cache"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", 15 * 1024 * 1024))
+EVICT_INTERVAL_SECONDS = int(os.getenv("IMAGE_CACHE_EVICT_INTERVAL", 600))
+PREWARM_CONCURRENCY = int(os.getenv("IMAGE_PREWARM_CONCURRENCY", 4))
+
+THUMB_SIZES = {"sm": 240, "md": 480, "lg": 960}
+FORMATS = {"webp": ("WEBP", "image/webp"), "jpg": ("JPEG", "image/jpeg")}
+IMAGE_ACCEPT = "image/avif,image/webp,image/apng,image/*,*/*;q=0.8"
+TOUCH_AFTER_SECONDS = 600
+LOCAL_MAP_SIZE = 10000
+
+_url_digests = OrderedDict()  # url -> digest
+_flights = SingleFlight()  # ("source", url) / ("thumb", digest, size, fmt)
+_prewarm_sem: asyncio.Semaphore = None
+_prewarm_tasks = set()
+_evict_task: asyncio.Task = None
+_disk_bytes = 0
+
+
+class ImageUnavailable(Exception):
+    pass
+
+
+def _digest_dir(digest: str) -> str:
+    return os.path.join(IMAGE_CACHE_DIR, digest[:2], digest)
+
+
+def source_path(digest: str) -> str:
+    return os.path.join(_digest_dir(digest), "source")
+
+
+def thumbnail_path(digest: str, size: str, fmt: str) -> str:
+    return os.path.join(_digest_dir(digest), f"{size}.{fmt}")
+
+
+def _write_atomic(path: str, data: bytes):
+    global _disk_bytes
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    _disk_bytes += len(data)
+
+
+def touch(path: str):
+    # Keeps recently served files at the back of the eviction order. Skipped
+    # when the file was touched recently so hot images don't cost a syscall each.
+    try:
+        if os.stat(path).st_mtime < time.time() - TOUCH_AFTER_SECONDS:
+            os.utime(path)
+    except OSError:
+        pass
+
+
+def _inspect(data: bytes) -> dict:
+    """Validate downloaded bytes as an image; also record size and average colour."""
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            width, height = img.size
+            img.draft("RGB", (64, 64))
+            r, g, b = img.convert("RGB").resize((1, 1), Image.BOX).getpixel((0, 0))
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImageUnavailable(f"not an image: {e}")
+    return {"width": width, "height": height, "color": f"#{r:02x}{g:02x}{b:02x}"}
+
+
+async def _download(url: str) -> tuple:
+    try:
+        result = await fetch(url, headers={"Accept": IMAGE_ACCEPT}, max_bytes=IMAGE_MAX_BYTES)
+    except Exception as e:
+        raise ImageUnavailable(f"{url}: {e}")
+    if result.status_code != 200 or not result.content:
+        raise ImageUnavailable(f"{url}: HTTP {result.status_code}")
+    info = await asyncio.to_thread(_inspect, result.content)
+    return result.content, info
+
+
+def _remember(url: str, digest: str):
+    _url_digests[url] = digest
+    _url_digests.move_to_end(url)
+    while len(_url_digests) > LOCAL_MAP_SIZE:
+        _url_digests.popitem(last=False)
+
+
+async def _fetch_source(url: str) -> dict:
+    data, info = await _download(url)
+    digest = hashlib.sha256(data).hexdigest()
+    path = source_path(digest)
+    if not os.path.exists(path):
+        await asyncio.to_thread(_write_atomic, path, data)
+    doc = {"digest": digest, "bytes": len(data), **info}
+    await image_cache_collection.update_one(
+        {"_id": url},
+        {"$set": {**doc, "fetched_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    _remember(url, digest)
+    return doc
+
+
+async def _is_known_url(url: str) -> bool:
+    # Only proxy images that belong to a saved item, not arbitrary URLs
+    return await items_collection.find_one(
+        {"$or": [{"image_url": url}, {"images": url}]}, {"_id": 1}
+    ) is not None
+
+
+async def resolve_image(url: str, allow_unknown: bool = False) -> str:
+    """Digest of the image at url, downloading it on first use."""
+    digest = _url_digests.get(url)
+    if digest and os.path.exists(source_path(digest)):
+        _url_digests.move_to_end(url)
+        return digest
+
+    doc = await image_cache_collection.find_one({"_id": url}, {"digest": 1})
+    if doc and os.path.exists(source_path(doc["digest"])):
+        _remember(url, doc["digest"])
+        return doc["digest"]
+
+    if not doc and not allow_unknown and not await _is_known_url(url):
+        raise ImageUnavailable(f"{url} is not a saved item image")
+    return (await _flights.do(("source", url), lambda: _fetch_source(url)))["digest"]
+
+
+async def _restore_source(digest: str):
+    # The source was evicted; fetch it again from any URL that produced it
+    async for doc in image_cache_collection.find({"digest": digest}, {"_id": 1}).limit(3):
+        try:
+            url = doc["_id"]
+            fetched = await _flights.do(("source", url), lambda: _fetch_source(url))
+        except ImageUnavailable:
+            continue
+        if fetched["digest"] == digest:
+            return
+    raise ImageUnavailable(f"no source for {digest}")
+
+
+def _render_thumbnail(digest: str, size: str, fmt: str) -> str:
+    box = THUMB_SIZES[size]
+    pil_format, _ = FORMATS[fmt]
+    with Image.open(source_path(digest)) as img:
+        # draft() lets the JPEG decoder downscale while decoding
+        img.draft("RGB", (box, box))
+        img.thumbnail((box, box), Image.LANCZOS)
+        if fmt == "jpg":
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA"):
+            has_alpha = "A" in img.mode or "transparency" in img.info
+            img = img.convert("RGBA" if has_alpha else "RGB")
+        out = io.BytesIO()
+        if pil_format == "JPEG":
+            img.save(out, pil_format, quality=82, optimize=True, progressive=True)
+        else:
+            img.save(out, pil_format, quality=80, method=4)
+    path = thumbnail_path(digest, size, fmt)
+    _write_atomic(path, out.getvalue())
+    return path
+
+
+async def get_thumbnail(digest: str, size: str, fmt: str) -> str:
+    """Path of the thumbnail, rendering it (and re-fetching the source) if needed."""
+    path = thumbnail_path(digest, size, fmt)
+    if os.path.exists(path):
+        return path
+
+    async def build():
+        if not os.path.exists(source_path(digest)):
+            await _restore_source(digest)
+        return await asyncio.to_thread(_render_thumbnail, digest, size, fmt)
+
+    return await _flights.do(("thumb", digest, size, fmt), build)
+
+
+async def prewarm_item_image(item_id, url: str):
+    """Fetch an item's main image and make its grid thumbnails ahead of the first view."""
+    if not url:
+        return
+    async with _prewarm_sem:
+        try:
+            digest = await resolve_image(url, allow_unknown=True)
+            for fmt in FORMATS:
+                await get_thumbnail(digest, "sm", fmt)
+            doc = await image_cache_collection.find_one({"_id": url}, {"color": 1})
+            item = await items_collection.find_one_and_update(
+                {"_id": ObjectId(item_id), "image_url": url},
+                {"$set": {"image_digest": digest, "image_color": (doc or {}).get("color")}},
+                projection={"users_id": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            if item:
+                await bump_wardrobe_version(item.get("users_id"))
+        except ImageUnavailable as e:
+            log.info("pre-warm skipped", url=url, reason=str(e))
+        except Exception:
+            log.exception("pre-warm failed", url=url)
+
+
+def schedule_prewarm(item_id, url: str):
+    """Fire-and-forget prewarm_item_image; a no-op when the cache isn't running."""
+    if _prewarm_sem is None or not url:
+        return
+    task = asyncio.create_task(prewarm_item_image(item_id, url))
+    _prewarm_tasks.add(task)
+    task.add_done_callback(_prewarm_tasks.discard)
+
+
+def evict(max_bytes: int = None) -> dict:
+    """Delete least recently served files until the cache is under 90% of max_bytes."""
+    global _disk_bytes
+    max_bytes = IMAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    files = []
+    total = 0
+    for root, _, names in os.walk(IMAGE_CACHE_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+    removed = 0
+    if total > max_bytes:
+        target = max_bytes * 0.9
+        files.sort()
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+    _disk_bytes = total
+    return {"bytes": total, "files": len(files) - removed, "removed": removed}
+
+
+async def _evict_loop():
+    # Full scan on startup, then only when writes since have pushed past the budget
+    scanned = False
+    while True:
+        try:
+            if not scanned or _disk_bytes > IMAGE_CACHE_MAX_BYTES:
+                result = await asyncio.to_thread(evict)
+                scanned = True
+                if result["removed"]:
+                    log.info("evicted", **result)
+        except Exception:
+            log.exception("eviction failed")
+        await asyncio.sleep(EVICT_INTERVAL_SECONDS)
+
+
+async def start_image_cache():
+    global _prewarm_sem, _evict_task
+    os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+    _prewarm_sem = asyncio.Semaphore(PREWARM_CONCURRENCY)
+    if _evict_task is None:
+        _evict_task = asyncio.create_task(_evict_loop())
+
+
+async def stop_image_cache():
+    global _prewarm_sem, _evict_task
+    tasks = list(_prewarm_tasks)
+    if _evict_task is not None:
+        tasks.append(_evict_task)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _evict_task = None
+    _prewarm_sem = None
@@ -0,0 +1,117 @@
+# utils/listing_cache.py
+# In-process LRU of rendered wardrobe listings (item and outfit pages), keyed
+# by user + path + query string and tagged with the wardrobe version they
+# were built from. A lookup is only a hit if the tag matches the user's
+# current version in Mongo (utils/wardrobe_version.py), which every worker
+# reads per request, so a write through any worker invalidates every
+# worker's copy without any cross-process messaging.
+#
+# Entries hold the serialized JSON body, so a hit skips both the query and
+# the serialization. Eviction is least-recently-used within a byte budget.
+
+import os
+from collections import OrderedDict
+
+from utils.metrics import Counter, Gauge
+from utils.single_flight import SingleFlight
+
+CACHE_BUDGET_BYTES = int(float(os.getenv("LISTING_CACHE_MB", 32)) * 1024 * 1024)
+# One huge page shouldn't flush everyone else's
+MAX_ENTRY_BYTES = CACHE_BUDGET_BYTES // 16
+ENTRY_OVERHEAD_BYTES = 256  # key, tuple, headers dict
+
+_entries = OrderedDict()  # (users_id, key) -> (version, body, headers, size)
+_user_keys = {}  # users_id -> set of cache keys, to drop a user's stale pages together
+_flights = SingleFlight()  # (users_id, key, version) -> page being built
+_bytes = 0
+stats = {"hits": 0, "misses": 0, "stale": 0, "coalesced": 0, "evictions": 0}
+
+_lookups = Counter("listing_cache_lookups_total", "Wardrobe listing cache lookups by result", ("result",))
+Gauge("listing_cache_bytes", "Bytes held by the wardrobe listing cache", function=lambda: _bytes)
+
+
+def _count(result: str):
+    stats[result] += 1
+    _lookups.inc(result=result)
+
+
+def _drop(cache_key):
+    global _bytes
+    entry = _entries.pop(cache_key, None)
+    if entry is None:
+        return
+    _bytes -= entry[3]
+    keys = _user_keys.get(cache_key[0])
+    if keys is not None:
+        keys.discard(cache_key)
+        if not keys:
+            del _user_keys[cache_key[0]]
+
+
+def forget_user(users_id: str):
+    for cache_key in list(_user_keys.get(users_id, ())):
+        _drop(cache_key)
+
+
+def _get(users_id: str, key: str, version: int):
+    cache_key = (users_id, key)
+    entry = _entries.get(cache_key)
+    if entry is None:
+        return None
+    if entry[0] != version:
+        # The wardrobe changed since this page was built; so did its other pages
+        forget_user(users_id)
+        _count("stale")
+        return None
+    _entries.move_to_end(cache_key)
+    _count("hits")
+    return entry[1], entry[2]
+
+
+def _put(users_id: str, key: str, version: int, body: bytes, headers: dict):
+    global _bytes
+    size = len(body) + ENTRY_OVERHEAD_BYTES
+    if size > MAX_ENTRY_BYTES:
+        return
+    cache_key = (users_id, key)
+    _drop(cache_key)
+    _entries[cache_key] = (version, body, headers, size)
+    _user_keys.setdefault(users_id, set()).add(cache_key)
+    _bytes += size
+    while _bytes > CACHE_BUDGET_BYTES and _entries:
+        _drop(next(iter(_entries)))
+        stats["evictions"] += 1
+
+
+async def cached_listing(users_id: str, key: str, version: int, load):
+    """
+    (body, headers) for one listing page, from cache when built at `version`.
+    `load()` builds it on a miss and returns the same pair; concurrent misses
+    for one page and version share a single load.
+    """
+    found = _get(users_id, key, version)
+    if found is not None:
+        return found
+
+    flight_key = (users_id, key, version)
+    _count("coalesced" if flight_key in _flights else "misses")
+
+    async def build():
+        body, headers = await load()
+        _put(users_id, key, version, body, headers)
+        return body, headers
+
+    return await _flights.do(flight_key, build)
+
+
+def cache_stats() -> dict:
+    served = stats["hits"] + stats["coalesced"]
+    lookups = served + stats["misses"]
+    return {
+        **stats,
+        "entries": len(_entries),
+        "users": len(_user_keys),
+        "bytes": _bytes,
+        "budget_bytes": CACHE_BUDGET_BYTES,
+        "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+    }
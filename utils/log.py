@@ -0,0 +1,69 @@
+# utils/log.py
+# Structured logging: one JSON object per line on stdout, so log search can
+# filter on fields (url, domain, job_id, ...) instead of grepping prefixes.
+#
+#     log = get_logger("scraper")
+#     log.warning("fetch failed", url=url, error=str(e))
+
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+ROOT = "wardrobe"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _configure():
+    root = logging.getLogger(ROOT)
+    if root.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+
+
+class StructuredLogger:
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(f"{ROOT}.{name}")
+
+    def _log(self, level: int, msg: str, exc_info=False, **fields):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, msg, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, msg: str, **fields):
+        self._log(logging.DEBUG, msg, **fields)
+
+    def info(self, msg: str, **fields):
+        self._log(logging.INFO, msg, **fields)
+
+    def warning(self, msg: str, **fields):
+        self._log(logging.WARNING, msg, **fields)
+
+    def error(self, msg: str, **fields):
+        self._log(logging.ERROR, msg, **fields)
+
+    def exception(self, msg: str, **fields):
+        self._log(logging.ERROR, msg, exc_info=True, **fields)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    _configure()
+    return StructuredLogger(name)
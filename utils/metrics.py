@@ -0,0 +1,264 @@
+# utils/metrics.py
+# In-process Prometheus-style metrics, rendered in the text exposition format
+# on GET /metrics. Each uvicorn worker keeps its own numbers; scrape every
+# worker (or run one) and let Prometheus aggregate.
+#
+# Covers HTTP requests (MetricsMiddleware), scraper stages per retailer domain
+# (stage_timer / observe_stage, plus connect/TLS/TTFB from httpx traces) and
+# Mongo command latency per collection (MongoCommandMetrics).
+
+import threading
+import time
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.label_names)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), function=None):
+        super().__init__(name, help_text, labels)
+        self._function = function  # read at render time for unlabelled gauges
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> list:
+        if self._function is not None:
+            try:
+                self.set(self._function())
+            except Exception:
+                pass
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = [(key, (list(e[0]), e[1], e[2])) for key, e in self._values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = _labels(self.label_names, key, [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.label_names, key, ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+)
+http_latency = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")
+)
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being handled", ("method",))
+
+# Scraper
+scrape_stage_latency = Histogram(
+    "scrape_stage_duration_seconds",
+    "Time spent per scraper stage (connect, tls, ttfb, download, parse, extract, render, save)",
+    ("stage", "domain"),
+)
+scrape_results = Counter("scrape_results_total", "Finished scrapes by outcome", ("domain", "outcome"))
+
+# Mongo
+mongo_latency = Histogram(
+    "mongo_command_duration_seconds", "Mongo command latency", ("collection", "command"), MONGO_BUCKETS
+)
+mongo_failures = Counter("mongo_command_failures_total", "Failed Mongo commands", ("collection", "command"))
+
+
+def observe_stage(stage: str, domain: str, seconds: float):
+    scrape_stage_latency.observe(seconds, stage=stage, domain=domain or "unknown")
+
+
+@contextmanager
+def stage_timer(stage: str, domain: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, domain, time.perf_counter() - start)
+
+
+_TRACE_STAGES = {"connection.connect_tcp": "connect", "connection.start_tls": "tls"}
+
+
+def http_trace(domain: str):
+    """
+    httpx/httpcore trace callback timing connection setup and time to first
+    byte for one request (DNS resolution is included in "connect").
+    """
+    marks = {}
+
+    async def trace(event: str, info: dict):
+        now = time.perf_counter()
+        name, _, phase = event.rpartition(".")
+        if name.endswith("send_request_headers") and phase == "started":
+            marks["sent"] = now
+        elif name.endswith("receive_response_headers") and phase == "complete" and "sent" in marks:
+            observe_stage("ttfb", domain, now - marks.pop("sent"))
+        elif name in _TRACE_STAGES:
+            if phase == "started":
+                marks[name] = now
+            elif phase == "complete" and name in marks:
+                observe_stage(_TRACE_STAGES[name], domain, now - marks.pop(name))
+
+    return trace
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses aren't buffered."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_in_flight.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec(method=method)
+            # The route template (not the raw path) keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_latency.observe(elapsed, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=status["code"])
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Per-collection command latency; pass to AsyncIOMotorClient(event_listeners=[...])."""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        # getMore names its collection separately; the command value is the cursor id
+        key = "collection" if event.command_name == "getMore" else event.command_name
+        target = event.command.get(key)
+        collection = target if isinstance(target, str) else ""
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection
+
+    def _pop(self, event) -> str:
+        with self._lock:
+            return self._collections.pop((event.connection_id, event.request_id), "")
+
+    def succeeded(self, event):
+        collection = self._pop(event)
+        mongo_latency.observe(event.duration_micros / 1e6, collection=collection, command=event.command_name)
+
+    def failed(self, event):
+        collection = self._pop(event)
+        mongo_latency.observe(event.duration_micros / 1e6, collection=collection, command=event.command_name)
+        mongo_failures.inc(collection=collection, command=event.command_name)
@@ -0,0 +1,305 @@
+# utils/outfit_engine.py
+# Outfit suggestions from a user's owned items. Each item fills a slot (top,
+# bottom, one-piece, shoes, outerwear, bag) by its category; an outfit is one
+# of TEMPLATES plus any optional slots that improve it. Items are scored
+# pairwise on three features held as numpy arrays:
+#
+#   colour    hue relationship of the image's dominant colours (analogous and
+#             complementary go together, ~90 degrees apart clashes, neutrals
+#             go with everything)
+#   price     items from the same price band sit together; a £900 coat over a
+#             £5 tee scores lower (bands are half an octave wide)
+#   category  hand-tuned subcategory affinities (shirt + trousers, tee + jeans)
+#
+# An outfit's score is the mean of its pair scores. Trying every combination
+# is out of the question at a few thousand items, so slots are filled one at
+# a time by beam search: the best BEAM_WIDTH partial outfits are extended
+# with every item of the next slot as one (beams x items) array operation.
+#
+# A user's feature arrays are built once per wardrobe version and kept in a
+# small in-process LRU; any write that bumps the version rebuilds them.
+
+import math
+import os
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from database import items_collection
+from utils.metrics import Counter as MetricCounter
+from utils.single_flight import SingleFlight
+from utils.wardrobe_version import get_wardrobe_version
+
+BEAM_WIDTH = int(os.getenv("OUTFIT_BEAM_WIDTH", 64))
+# The first slot seeds the beam with all of its items, up to this many
+MAX_SEED = 1024
+# Share of suggestions any one item may appear in, so the top-k aren't one
+# great pair of shoes with every top
+MAX_ITEM_SHARE = 0.5
+FEATURE_CACHE_USERS = int(os.getenv("OUTFIT_FEATURE_CACHE_USERS", 256))
+
+COLOUR_WEIGHT = 1.0
+PRICE_WEIGHT = 0.5
+CATEGORY_WEIGHT = 0.5
+TOTAL_WEIGHT = COLOUR_WEIGHT + PRICE_WEIGHT + CATEGORY_WEIGHT
+
+# Features are quantized so a pair score is three small-table lookups:
+# hue in 10 degree bins plus one bin for neutrals, price in half-octave
+# bands (£1-1.41, £1.41-2, ..., over £1m) plus one for unknown
+HUE_BIN_DEGREES = 10
+HUE_BINS = 360 // HUE_BIN_DEGREES
+NEUTRAL_BIN = HUE_BINS
+PRICE_BANDS = 40
+NO_PRICE_BAND = PRICE_BANDS
+# Two octaves apart (a 4x price gap) scores 1/e of matching bands
+PRICE_OCTAVE_SCALE = 2.0
+
+SLOT_BY_CATEGORY = {
+    "tops": "top", "top": "top", "knitwear": "top", "shirts": "top",
+    "bottoms": "bottom", "trousers": "bottom", "jeans": "bottom", "skirts": "bottom", "shorts": "bottom",
+    "dresses": "onepiece", "dress": "onepiece", "jumpsuits": "onepiece",
+    "outerwear": "outerwear", "coats": "outerwear", "jackets": "outerwear",
+    "shoes": "shoes", "footwear": "shoes",
+    "bags": "bag", "bag": "bag",
+}
+TEMPLATES = (("top", "bottom", "shoes"), ("onepiece", "shoes"))
+OPTIONAL_SLOTS = ("outerwear", "bag")
+SLOT_ORDER = ("outerwear", "top", "onepiece", "bottom", "shoes", "bag")
+
+# Subcategory pairs that work (positive) or don't (negative); unlisted pairs are 0
+SUBCATEGORY_AFFINITY = {
+    ("shirts", "trousers"): 1.0, ("shirts", "skirts"): 0.5, ("shirts", "jeans"): 0.5,
+    ("t-shirts", "jeans"): 1.0, ("t-shirts", "shorts"): 1.0, ("t-shirts", "trainers"): 0.5,
+    ("knitwear", "skirts"): 1.0, ("knitwear", "jeans"): 0.5, ("knitwear", "boots"): 0.5,
+    ("jeans", "trainers"): 0.5, ("jeans", "boots"): 0.5, ("trousers", "flats"): 0.5,
+    ("dresses", "heels"): 1.0, ("dresses", "sandals"): 0.5, ("dresses", "jackets"): 0.5,
+    ("jumpsuits", "sandals"): 0.5, ("shorts", "sandals"): 1.0, ("shorts", "boots"): -0.5,
+    ("jackets", "trousers"): 0.5, ("coats", "boots"): 1.0, ("coats", "sandals"): -1.0,
+    ("coats", "shorts"): -1.0, ("heels", "shorts"): -0.5, ("t-shirts", "heels"): -0.5,
+}
+
+FEATURE_FIELDS = {
+    "title": 1, "price": 1, "price_amount": 1, "price_currency": 1, "image_url": 1, "image_digest": 1,
+    "image_color": 1, "site_name": 1, "category": 1, "subcategory": 1,
+}
+
+def _colour_table() -> np.ndarray:
+    centres = (np.arange(HUE_BINS) + 0.5) * HUE_BIN_DEGREES
+    gap = np.abs(centres[:, None] - centres[None, :])
+    gap = np.minimum(gap, 360 - gap)
+    table = np.full((HUE_BINS + 1, HUE_BINS + 1), 0.7)  # a neutral goes with anything
+    table[NEUTRAL_BIN, NEUTRAL_BIN] = 0.6  # all-neutral is safe but flat
+    table[:HUE_BINS, :HUE_BINS] = np.select(
+        [gap <= 30, gap >= 150, (gap >= 105) & (gap <= 135), gap < 60],
+        [1.0, 0.8, 0.6, 0.4],  # analogous, complementary, triadic, near-analogous
+        0.0,  # 60-105 and 135-150 degrees apart: clashes
+    )
+    return (table * COLOUR_WEIGHT / TOTAL_WEIGHT).astype(np.float32)
+
+
+def _price_table() -> np.ndarray:
+    bands = np.arange(PRICE_BANDS)
+    table = np.full((PRICE_BANDS + 1, PRICE_BANDS + 1), 0.5)
+    table[:PRICE_BANDS, :PRICE_BANDS] = np.exp(-np.abs(bands[:, None] - bands[None, :]) / 2 / PRICE_OCTAVE_SCALE)
+    return (table * PRICE_WEIGHT / TOTAL_WEIGHT).astype(np.float32)
+
+
+COLOUR_TABLE = _colour_table()
+PRICE_TABLE = _price_table()
+
+_features = OrderedDict()  # users_id -> WardrobeFeatures
+_flights = SingleFlight()  # (users_id, version) -> features being built
+stats = {"hits": 0, "builds": 0}
+_lookups = MetricCounter("outfit_features_lookups_total", "Outfit engine feature cache lookups by result", ("result",))
+
+
+def _hsv(colours: list) -> tuple:
+    """Hue in degrees, saturation and value arrays for "#rrggbb" strings; NaN hue when unknown."""
+    rgb = np.full((len(colours), 3), np.nan, dtype=np.float32)
+    for row, colour in enumerate(colours):
+        if isinstance(colour, str) and len(colour) == 7 and colour.startswith("#"):
+            try:
+                rgb[row] = [int(colour[i:i + 2], 16) / 255 for i in (1, 3, 5)]
+            except ValueError:
+                pass
+    high = rgb.max(axis=1)
+    low = rgb.min(axis=1)
+    chroma = high - low
+    safe = np.where(chroma == 0, 1, chroma)
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    hue = np.select(
+        [high == r, high == g],
+        [((g - b) / safe) % 6, (b - r) / safe + 2],
+        (r - g) / safe + 4,
+    ) * 60
+    saturation = np.where(high == 0, 0, chroma / np.where(high == 0, 1, high))
+    return hue, saturation, high
+
+
+class WardrobeFeatures:
+    """Feature arrays for one user's owned items, one row per item."""
+
+    def __init__(self, items: list, version: int):
+        self.version = version
+        self.items = items
+        self.ids = [str(item["_id"]) for item in items]
+        self.row_of = {item_id: row for row, item_id in enumerate(self.ids)}
+        self.slot_of = {}
+        for row, item in enumerate(items):
+            slot = SLOT_BY_CATEGORY.get((item.get("category") or "").lower())
+            if slot:
+                self.slot_of[row] = slot
+        self.slots = {}
+        for row, slot in self.slot_of.items():
+            self.slots.setdefault(slot, []).append(row)
+        self.slots = {slot: np.array(rows, dtype=np.int64) for slot, rows in self.slots.items()}
+
+        hue, saturation, value = _hsv([item.get("image_color") for item in items])
+        # Photos on white/black backgrounds average out pale; low saturation,
+        # very dark or unknown colours are treated as neutral
+        neutral = np.isnan(hue) | (saturation < 0.18) | (value < 0.2)
+        self.colour_bin = np.where(neutral, NEUTRAL_BIN, np.nan_to_num(hue) // HUE_BIN_DEGREES % HUE_BINS).astype(np.int16)
+
+        # Price bands only compare within the wardrobe's main currency
+        currencies = Counter(item.get("price_currency") for item in items if item.get("price_amount"))
+        currency = currencies.most_common(1)[0][0] if currencies else None
+        self.price_bin = np.array([
+            min(PRICE_BANDS - 1, max(0, int(2 * math.log2(item["price_amount"]))))
+            if item.get("price_currency") == currency and (item.get("price_amount") or 0) >= 1 else NO_PRICE_BAND
+            for item in items
+        ], dtype=np.int16)
+
+        subcategories = sorted({(item.get("subcategory") or "").lower() for item in items})
+        index = {name: i for i, name in enumerate(subcategories)}
+        self.subcategory = np.array([index[(item.get("subcategory") or "").lower()] for item in items], dtype=np.int32)
+        self.affinity = np.zeros((len(subcategories), len(subcategories)), dtype=np.float32)
+        for (a, b), weight in SUBCATEGORY_AFFINITY.items():
+            if a in index and b in index:
+                self.affinity[index[a], index[b]] = self.affinity[index[b], index[a]] = weight * CATEGORY_WEIGHT / TOTAL_WEIGHT
+
+    def pair_scores(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """Compatibility (0-1, higher is better) of items a (B,) with items b (N,), as a (B, N) array."""
+        a, b = a[:, None], b[None, :]
+        return (
+            COLOUR_TABLE[self.colour_bin[a], self.colour_bin[b]]
+            + PRICE_TABLE[self.price_bin[a], self.price_bin[b]]
+            + self.affinity[self.subcategory[a], self.subcategory[b]]
+        )
+
+    def _added(self, members: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Summed pair score of each candidate with each beam's members (-1 = empty)."""
+        added = np.zeros((len(members), len(candidates)), dtype=np.float32)
+        for column in members.T:
+            present = column >= 0
+            added += self.pair_scores(np.where(present, column, 0), candidates) * present[:, None]
+        return added
+
+    def _extend(self, beams: np.ndarray, totals: np.ndarray, candidates: np.ndarray, width: int) -> tuple:
+        """Every beam x every candidate; keep the best `width` by summed pair score."""
+        scores = (totals[:, None] + self._added(beams, candidates)).ravel()
+        keep = min(width, scores.size)
+        best = np.argpartition(-scores, keep - 1)[:keep]
+        beam_rows, candidate_rows = np.divmod(best, len(candidates))
+        return np.column_stack([beams[beam_rows], candidates[candidate_rows]]), scores[best]
+
+    def _optional(self, beams: np.ndarray, totals: np.ndarray, candidates: np.ndarray) -> tuple:
+        """Give each beam its best item from an optional slot where that raises its mean pair score."""
+        sizes = (beams >= 0).sum(axis=1)
+        added = self._added(beams, candidates)
+        best = added.argmax(axis=1)
+        gain = added[np.arange(len(beams)), best]
+        improves = (totals + gain) / (sizes * (sizes + 1) / 2) > totals / (sizes * (sizes - 1) / 2)
+        column = np.where(improves, candidates[best], -1)
+        return np.column_stack([beams, column]), totals + np.where(improves, gain, 0)
+
+    def suggest(self, k: int = 10, anchor: str = None) -> list:
+        """Top-k outfits as [(mean pair score, [rows])], best first, optionally all including `anchor`."""
+        anchor_row = self.row_of.get(anchor) if anchor else None
+        anchor_slot = self.slot_of.get(anchor_row)
+        width = max(BEAM_WIDTH, 4 * k)
+        outfits = []
+        for template in TEMPLATES:
+            slots = list(template)
+            if anchor_slot in OPTIONAL_SLOTS:
+                slots.append(anchor_slot)
+            elif anchor_slot is not None and anchor_slot not in slots:
+                continue
+            pools = {slot: self.slots.get(slot, np.array([], dtype=np.int64)) for slot in slots}
+            if anchor_slot is not None:
+                pools[anchor_slot] = np.array([anchor_row])
+            if any(len(pool) == 0 for pool in pools.values()):
+                continue
+            # Smallest pools first keeps the early (widest) expansions cheap
+            slots.sort(key=lambda slot: len(pools[slot]))
+            beams = pools[slots[0]][:MAX_SEED, None]
+            totals = np.zeros(len(beams), dtype=np.float32)
+            for slot in slots[1:]:
+                beams, totals = self._extend(beams, totals, pools[slot], width)
+            for slot in OPTIONAL_SLOTS:
+                if slot not in slots and slot in self.slots:
+                    beams, totals = self._optional(beams, totals, self.slots[slot])
+
+            sizes = (beams >= 0).sum(axis=1)
+            means = totals / (sizes * (sizes - 1) / 2)
+            outfits += [(float(mean), [int(r) for r in rows if r >= 0]) for mean, rows in zip(means, beams)]
+
+        outfits.sort(key=lambda outfit: -outfit[0])
+        uses = Counter()
+        limit = max(1, math.ceil(k * MAX_ITEM_SHARE))
+        chosen = []
+        for score, rows in outfits:
+            if any(uses[row] >= limit and row != anchor_row for row in rows):
+                continue
+            uses.update(rows)
+            chosen.append((score, rows))
+            if len(chosen) == k:
+                break
+        return chosen
+
+    def render(self, outfits: list) -> list:
+        """Outfits as JSON-ready dicts with their item cards, head to toe."""
+        rendered = []
+        for score, rows in outfits:
+            items = []
+            for row in sorted(rows, key=lambda row: SLOT_ORDER.index(self.slot_of[row])):
+                item = dict(self.items[row])
+                item["id"] = str(item.pop("_id"))
+                item["slot"] = self.slot_of[row]
+                items.append(item)
+            rendered.append({"score": round(score, 4), "item_ids": [item["id"] for item in items], "items": items})
+        return rendered
+
+
+async def _load(users_id: str, version: int) -> WardrobeFeatures:
+    items = await items_collection.find(
+        {"users_id": users_id, "ownership": "own", "status": {"$nin": ["pending", "failed"]}},
+        FEATURE_FIELDS,
+    ).to_list(length=None)
+    return WardrobeFeatures(items, version)
+
+
+async def wardrobe_features(users_id: str, version: int = None) -> WardrobeFeatures:
+    """A user's feature arrays at their current wardrobe version (cached per worker)."""
+    if version is None:
+        version = await get_wardrobe_version(users_id)
+    cached = _features.get(users_id)
+    if cached is not None and cached.version == version:
+        _features.move_to_end(users_id)
+        stats["hits"] += 1
+        _lookups.inc(result="hit")
+        return cached
+
+    flight_key = (users_id, version)
+    if flight_key not in _flights:
+        stats["builds"] += 1
+        _lookups.inc(result="build")
+
+    async def build():
+        features = await _load(users_id, version)
+        _features[users_id] = features
+        _features.move_to_end(users_id)
+        while len(_features) > FEATURE_CACHE_USERS:
+            _features.popitem(last=False)
+        return features
+
+    return await _flights.do(flight_key, build)
@@ -0,0 +1,50 @@
+# utils/pagination.py
+# Opaque keyset cursors: base64 of the last row's sort value and _id, so the
+# next page starts with an index seek instead of skipping rows.
+
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+
+def encode_cursor(value, _id: ObjectId) -> str:
+    if isinstance(value, datetime):
+        value = {"d": value.isoformat()}
+    payload = json.dumps([value, str(_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, _id = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["d"])
+        return value, ObjectId(_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(field: str, cursor: str, descending: bool = True) -> dict:
+    """Filter for rows after cursor in (field, _id) order."""
+    value, _id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {"$or": [
+        {field: {op: value}},
+        {field: value, "_id": {op: _id}},
+    ]}
+
+
+def keyset_sort(field: str, descending: bool = True) -> list:
+    direction = -1 if descending else 1
+    return [(field, direction), ("_id", direction)]
+
+
+def next_cursor(rows: list, field: str, limit: int):
+    if len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(last.get(field), last["_id"])
@@ -0,0 +1,68 @@
+# utils/passwords.py
+# bcrypt is deliberately slow (~200 ms at cost 12), so it runs on a small
+# dedicated thread pool instead of the event loop. bcrypt releases the GIL
+# while hashing, so threads give real parallelism here.
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from fastapi import HTTPException
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+# Hashes waiting or running before new requests get a 503 instead of queueing
+HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", HASH_WORKERS * 16))
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_in_flight = 0
+
+
+def _hash_sync(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _verify_sync(plain: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+    except ValueError:
+        # Malformed or empty hash (e.g. social-login accounts have no password)
+        return False
+
+
+async def _offload(fn, *args):
+    global _in_flight
+    if _in_flight >= HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please try again",
+            headers={"Retry-After": "1"},
+        )
+    _in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _in_flight -= 1
+
+
+async def hash_password(password: str, rounds: int = None) -> str:
+    return await _offload(_hash_sync, password, rounds or BCRYPT_ROUNDS)
+
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    if not hashed:
+        return False
+    return await _offload(_verify_sync, plain, hashed)
+
+
+def hash_cost(hashed: str) -> int:
+    # "$2b$12$<salt+hash>"
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(hashed: str) -> bool:
+    return bool(hashed) and hash_cost(hashed) != BCRYPT_ROUNDS
@@ -1,38 +1,174 @@
+import asyncio
+import os
+
 from playwright.async_api import async_playwright
+from utils.log import get_logger
 
-CHROME_PATH = "/opt/render/project/src/.venv/lib/python3.11/site-packages/playwright/driver/package/.local-browsers/chromium-1105/chrome-linux/chrome"
+log = get_logger("playwright")
 
-async def fetch_rendered_html(url: str) -> str:
-    try:
-        print(f"[Playwright] Launching browser for: {url}")
-        print(f"[Playwright] Using executable: {CHROME_PATH}")
-
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                executable_path=CHROME_PATH,
-                args=[
-                    "--no-sandbox",
-                    "--disable-http2",
-                    "--disable-features=NetworkService",
-                    "--disable-extensions",
-                ]
-            )
-            page = await browser.new_page()
-
-            # Block non-essential resources (images, stylesheets, fonts)
-            await page.route(
-                "**/*",
-                lambda route: route.abort()
-                if route.request.resource_type in ["image", "stylesheet", "font"]
-                else route.continue_()
-            )
-
-            await page.goto(url, timeout=60000, wait_until="domcontentloaded")
-            content = await page.content()
-            await browser.close()
+# Leave unset to use the Chromium bundled with playwright (PLAYWRIGHT_BROWSERS_PATH=0 on Render)
+CHROME_PATH = os.getenv("CHROME_PATH") or None
+RENDERED_SCRAPING = os.getenv("RENDERED_SCRAPING", "1") != "0"
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", 2))
+PAGES_PER_CONTEXT = int(os.getenv("BROWSER_PAGES_PER_CONTEXT", 50))
+CONTEXT_MAX_HEAP_MB = int(os.getenv("BROWSER_CONTEXT_MAX_HEAP_MB", 256))
+NAVIGATION_TIMEOUT_MS = int(os.getenv("BROWSER_NAVIGATION_TIMEOUT_MS", 30000))
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+BLOCKED_RESOURCES = {"image", "stylesheet", "font", "media"}
+LAUNCH_ARGS = [
+    "--no-sandbox",
+    "--disable-http2",
+    "--disable-extensions",
+    "--disable-dev-shm-usage",
+]
+
+
+async def _block_resources(route):
+    # Block non-essential resources (images, stylesheets, fonts)
+    if route.request.resource_type in BLOCKED_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+class _ContextSlot:
+    def __init__(self, context):
+        self.context = context
+        self.pages = 0
+        self.heap_bytes = 0
+
+    def worn_out(self) -> bool:
+        return (
+            self.pages >= PAGES_PER_CONTEXT
+            or self.heap_bytes > CONTEXT_MAX_HEAP_MB * 1024 * 1024
+        )
+
+
+class BrowserPool:
+    """
+    One long-lived Chromium with a fixed pool of browser contexts. Each render
+    borrows a context, so the slot queue also caps concurrent renders.
+    Contexts are replaced after PAGES_PER_CONTEXT pages or once their JS heap
+    grows past CONTEXT_MAX_HEAP_MB.
+    """
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        self._playwright = None
+        self._browser = None
+        self._slots: asyncio.Queue = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._browser is not None
+
+    async def start(self):
+        self._playwright = await async_playwright().start()
+        await self._launch()
+
+    async def _launch(self):
+        self._browser = await self._playwright.chromium.launch(
+            headless=True,
+            executable_path=CHROME_PATH,
+            args=LAUNCH_ARGS,
+        )
+        self._slots = asyncio.Queue()
+        for _ in range(self.size):
+            self._slots.put_nowait(_ContextSlot(await self._new_context()))
+
+    async def _new_context(self):
+        context = await self._browser.new_context(user_agent=USER_AGENT)
+        await context.route("**/*", _block_resources)
+        return context
+
+    async def _recycle(self, slot: _ContextSlot) -> _ContextSlot:
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+        return _ContextSlot(await self._new_context())
+
+    async def _ensure_browser(self):
+        if self._browser.is_connected():
+            return
+        async with self._lock:
+            if not self._browser.is_connected():
+                log.warning("browser disconnected, relaunching")
+                await self._launch()
+
+    async def stop(self):
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def fetch(self, url: str) -> str:
+        await self._ensure_browser()
+        slots = self._slots
+        slot = await slots.get()
+        try:
+            page = await slot.context.new_page()
+            try:
+                await page.goto(url, timeout=NAVIGATION_TIMEOUT_MS, wait_until="domcontentloaded")
+                content = await page.content()
+                slot.heap_bytes = await page.evaluate(
+                    "performance.memory ? performance.memory.usedJSHeapSize : 0"
+                )
+            finally:
+                await page.close()
+            slot.pages += 1
+            if slot.worn_out():
+                slot = await self._recycle(slot)
             return content
+        except Exception:
+            slot = await self._recycle(slot)
+            raise
+        finally:
+            slots.put_nowait(slot)
+
+
+_pool: BrowserPool = None
+
+
+async def start_browser_pool():
+    global _pool
+    if not RENDERED_SCRAPING or _pool is not None:
+        return
+    pool = BrowserPool()
+    try:
+        await pool.start()
+    except Exception as e:
+        # Static scraping still works without a browser
+        log.warning("rendered scraping disabled", error=str(e))
+        await pool.stop()
+        return
+    _pool = pool
+
+
+async def close_browser_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
+
 
+def rendering_available() -> bool:
+    return _pool is not None and _pool.running
+
+
+async def fetch_rendered_html(url: str) -> str:
+    if not rendering_available():
+        raise RuntimeError("Browser pool is not running")
+    try:
+        log.debug("rendering", url=url)
+        return await _pool.fetch(url)
     except Exception as e:
-        print(f"[Playwright Error] {e}")
+        log.warning("render failed", url=url, error=str(e))
         raise
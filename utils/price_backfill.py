@@ -0,0 +1,46 @@
+# utils/price_backfill.py
+# One-off job: parse the display price already stored on older items into
+# price_amount/price_currency so they show up in price sorts and filters.
+#
+#     python -m utils.price_backfill
+
+import asyncio
+
+from pymongo import UpdateOne
+
+from database import items_collection
+from utils.prices import parse_price
+
+BATCH_SIZE = 500
+
+
+async def backfill_item_prices(batch_size: int = BATCH_SIZE) -> dict:
+    cursor = items_collection.find(
+        {"price": {"$type": "string"}, "price_amount": {"$exists": False}},
+        {"price": 1},
+        batch_size=batch_size,
+    )
+    ops = []
+    counts = {"parsed": 0, "unparsed": 0}
+    async for item in cursor:
+        parsed = parse_price(item["price"])
+        if parsed:
+            amount, currency = parsed
+            counts["parsed"] += 1
+        else:
+            amount, currency = None, None
+            counts["unparsed"] += 1
+        ops.append(UpdateOne(
+            {"_id": item["_id"]},
+            {"$set": {"price_amount": amount, "price_currency": currency}},
+        ))
+        if len(ops) >= batch_size:
+            await items_collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        await items_collection.bulk_write(ops, ordered=False)
+    return counts
+
+
+if __name__ == "__main__":
+    print(asyncio.run(backfill_item_prices()))
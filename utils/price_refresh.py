@@ -0,0 +1,252 @@
+# utils/price_refresh.py
+# Background re-scrape of wishlist prices. Each tick takes the stalest
+# wishlist items, fetches every distinct product URL once (however many users
+# saved it) with ETag/Last-Modified validators so unchanged pages come back as
+# a cheap 304, and writes results back in one bulk_write every
+# WRITE_INTERVAL_SECONDS as checks finish, renewing the lock as it goes. A
+# tick stops at MAX_TICK_SECONDS (or if it lost the lock); items it didn't
+# reach keep their old price_checked_at and lead the next tick.
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database import items_collection, scheduler_locks_collection
+from utils.extractors import get_plan
+from utils.html_extract import extract_page_metadata
+from utils.http_client import fetch
+from utils.log import get_logger
+from utils.scrape_queue import domain_of
+from utils.scraper_pipeline import extract_price
+from utils.wardrobe_stats import record_item_change
+from utils.wardrobe_version import bump_wardrobe_versions
+
+log = get_logger("price_refresh")
+
+REFRESH_ENABLED = os.getenv("PRICE_REFRESH", "1") != "0"
+REFRESH_EVERY_HOURS = float(os.getenv("PRICE_REFRESH_EVERY_HOURS", 24))
+TICK_SECONDS = int(os.getenv("PRICE_REFRESH_TICK_SECONDS", 300))
+ITEMS_PER_TICK = int(os.getenv("PRICE_REFRESH_ITEMS_PER_TICK", 1000))
+DOMAIN_CONCURRENCY = int(os.getenv("PRICE_REFRESH_DOMAIN_CONCURRENCY", 1))
+DOMAIN_DELAY_SECONDS = float(os.getenv("PRICE_REFRESH_DOMAIN_DELAY", 2))
+HISTORY_LENGTH = int(os.getenv("PRICE_HISTORY_LENGTH", 30))
+MAX_TICK_SECONDS = float(os.getenv("PRICE_REFRESH_MAX_TICK_SECONDS", TICK_SECONDS))
+WRITE_INTERVAL_SECONDS = 15
+LEASE_SECONDS = TICK_SECONDS * 2
+
+LOCK_ID = "price_refresh"
+_worker_id = uuid.uuid4().hex
+_task: asyncio.Task = None
+
+ITEM_FIELDS = {
+    "users_id": 1, "source": 1, "ownership": 1, "category": 1, "subcategory": 1,
+    "site_name": 1, "price": 1, "price_amount": 1, "price_currency": 1,
+    "created_at": 1, "price_history": {"$slice": -1}, "http_etag": 1, "http_last_modified": 1,
+}
+
+
+class _DomainPacer:
+    """At most DOMAIN_CONCURRENCY requests per domain, DOMAIN_DELAY_SECONDS apart."""
+
+    def __init__(self):
+        self._sems = {}
+        self._last = {}
+
+    async def __call__(self, url, fetcher):
+        domain = domain_of(url)
+        sem = self._sems.setdefault(domain, asyncio.Semaphore(DOMAIN_CONCURRENCY))
+        async with sem:
+            wait = self._last.get(domain, 0) + DOMAIN_DELAY_SECONDS - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await fetcher(url)
+            finally:
+                self._last[domain] = time.monotonic()
+
+
+async def _acquire_lock(ttl_seconds: int) -> bool:
+    # Only one uvicorn worker runs the refresh at a time
+    now = datetime.utcnow()
+    try:
+        await scheduler_locks_collection.find_one_and_update(
+            {"_id": LOCK_ID, "$or": [{"until": {"$lt": now}}, {"holder": _worker_id}]},
+            {"$set": {"holder": _worker_id, "until": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def _stale_items(limit: int) -> list:
+    cutoff = datetime.utcnow() - timedelta(hours=REFRESH_EVERY_HOURS)
+    # Never-checked items (null price_checked_at) sort first
+    return await items_collection.find(
+        {
+            "ownership": "wishlist",
+            "status": {"$ne": "pending"},
+            "$or": [{"price_checked_at": {"$lt": cutoff}}, {"price_checked_at": None}],
+        },
+        ITEM_FIELDS,
+    ).sort("price_checked_at", 1).limit(limit).to_list(length=limit)
+
+
+def _validators(items: list) -> dict:
+    # Conditional only when every item saving this URL was last checked against
+    # the same response; otherwise a 304 would vouch for items holding an older
+    # page. One unconditional GET gives them all the current validators.
+    headers = {}
+    etags = {item.get("http_etag") for item in items}
+    if len(etags) == 1 and None not in etags:
+        headers["If-None-Match"] = etags.pop()
+    last_modified = {item.get("http_last_modified") for item in items}
+    if len(last_modified) == 1 and None not in last_modified:
+        headers["If-Modified-Since"] = last_modified.pop()
+    return headers
+
+
+async def _check_url(url: str, items: list, pacer: _DomainPacer):
+    """Returns (new price fields or None, response validators, was_modified)."""
+    async def conditional_get(u):
+        return await fetch(u, headers=_validators(items))
+
+    try:
+        result = await pacer(url, conditional_get)
+    except Exception as e:
+        log.warning("refresh fetch failed", url=url, error=str(e))
+        return None, {}, False
+
+    if result.status_code == 304:
+        return None, {}, False
+    validators = {
+        "http_etag": result.headers.get("etag"),
+        "http_last_modified": result.headers.get("last-modified"),
+    }
+    if result.status_code != 200:
+        return None, validators, False
+
+    # Same per-domain extractor order as the save-time scrape, so both read the same price
+    plan = await get_plan(domain_of(url))
+    fields = extract_price(extract_page_metadata(result.text, **plan.parse_options), plan)
+    # JS-only shops have no static price; leave the stored one alone
+    return (fields if fields["price_amount"] is not None else None), validators, True
+
+
+def _item_update(item: dict, fields: dict, validators: dict, now: datetime):
+    update = {"$set": {"price_checked_at": now, **validators}}
+    changed = fields is not None and (
+        fields["price_amount"] != item.get("price_amount")
+        or fields["price_currency"] != item.get("price_currency")
+    )
+    if changed:
+        update["$set"].update(fields)
+        history = []
+        if not item.get("price_history") and item.get("price_amount") is not None:
+            # Seed the history with the price captured at save time
+            saved_at = item.get("created_at") or item["_id"].generation_time.replace(tzinfo=None)
+            history.append({"amount": item["price_amount"], "currency": item.get("price_currency"), "at": saved_at})
+        history.append({"amount": fields["price_amount"], "currency": fields["price_currency"], "at": now})
+        update["$push"] = {"price_history": {"$each": history, "$slice": -HISTORY_LENGTH}}
+    return update, changed
+
+
+async def _write_results(results: list, counts: dict):
+    """One bulk_write for a batch of finished [(items, check result)]."""
+    now = datetime.utcnow()
+    ops = []
+    changed_items = []
+    for group, (fields, validators, modified) in results:
+        counts["checked"] += 1
+        if not modified:
+            counts["not_modified"] += 1
+        validators = {k: v for k, v in validators.items() if v}
+        for item in group:
+            update, changed = _item_update(item, fields, validators, now)
+            ops.append(UpdateOne({"_id": item["_id"]}, update))
+            if changed:
+                changed_items.append((item, {**item, **fields}))
+
+    if ops:
+        await items_collection.bulk_write(ops, ordered=False)
+    # Validators and price_checked_at are never sent to clients (ITEM_EXCLUDE), so
+    # only a new price (and its history entry) changes what a listing shows
+    await bump_wardrobe_versions(before["users_id"] for before, _ in changed_items)
+    for before, after in changed_items:
+        await record_item_change(before, after)
+    counts["changed"] += len(changed_items)
+
+
+async def refresh_once(limit: int = ITEMS_PER_TICK, lease_seconds: int = None) -> dict:
+    """One tick; with lease_seconds, renews the scheduler lock after every write and stops if it's lost."""
+    items = await _stale_items(limit)
+    by_url = {}
+    for item in items:
+        by_url.setdefault(item["source"], []).append(item)
+
+    pacer = _DomainPacer()
+    pending = {
+        asyncio.ensure_future(_check_url(url, group, pacer)): group
+        for url, group in by_url.items()
+    }
+    counts = {"items": len(items), "urls": len(by_url), "checked": 0, "not_modified": 0, "changed": 0, "failed": 0}
+    deadline = time.monotonic() + MAX_TICK_SECONDS
+    try:
+        while pending:
+            timeout = min(WRITE_INTERVAL_SECONDS, max(deadline - time.monotonic(), 0))
+            done, _ = await asyncio.wait(pending, timeout=timeout)
+            finished = []
+            for task in done:
+                group = pending.pop(task)
+                if task.exception() is not None:
+                    # Its items keep their price_checked_at and come up again next tick
+                    log.error("refresh check crashed", url=group[0]["source"], error=repr(task.exception()))
+                    counts["failed"] += 1
+                else:
+                    finished.append((group, task.result()))
+            await _write_results(finished, counts)
+            if not pending:
+                break
+            if time.monotonic() >= deadline:
+                log.info("refresh tick hit its time cap", unchecked_urls=len(pending))
+                break
+            if lease_seconds and not await _acquire_lock(lease_seconds):
+                log.warning("refresh lock lost mid-tick", unchecked_urls=len(pending))
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+    return counts
+
+
+async def _loop():
+    while True:
+        try:
+            if await _acquire_lock(LEASE_SECONDS):
+                counts = await refresh_once(lease_seconds=LEASE_SECONDS)
+                if counts["items"]:
+                    log.info("refresh tick", **counts)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("refresh tick failed")
+        await asyncio.sleep(TICK_SECONDS)
+
+
+async def start_price_refresh():
+    global _task
+    if REFRESH_ENABLED and _task is None:
+        _task = asyncio.create_task(_loop())
+
+
+async def stop_price_refresh():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
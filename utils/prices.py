@@ -0,0 +1,153 @@
+# utils/prices.py
+# One place for price handling. Scraped prices are turned into an integer
+# amount in minor units (pence, cents) plus an ISO 4217 currency, which is
+# what gets stored and indexed; display strings are formatted from that.
+
+import re
+from decimal import Decimal, InvalidOperation
+
+CURRENCY_SYMBOLS = {
+    "GBP": "£", "USD": "$", "EUR": "€", "CAD": "C$", "AUD": "A$", "JPY": "¥"
+}
+
+# Checked longest first so "C$" wins over "$"
+SYMBOL_CURRENCIES = [
+    ("US$", "USD"), ("C$", "CAD"), ("CA$", "CAD"), ("A$", "AUD"), ("AU$", "AUD"),
+    ("£", "GBP"), ("€", "EUR"), ("¥", "JPY"), ("$", "USD"), ("kr", "SEK"), ("zł", "PLN"),
+]
+KNOWN_CODES = {
+    "GBP", "USD", "EUR", "CAD", "AUD", "JPY", "CHF", "SEK", "NOK", "DKK", "PLN",
+    "CZK", "NZD", "HKD", "SGD", "KRW", "INR", "CNY", "ZAR", "AED", "SAR", "MXN", "BRL",
+}
+MINOR_UNITS = {"JPY": 0, "KRW": 0}
+
+_NUMBER = re.compile(
+    r"\d{1,3}(?:[.,'\u00a0\u202f ]\d{3})+(?:[.,]\d{1,2})?(?!\d)"  # grouped: 1.234,56 / 12 500
+    r"|\d+(?:[.,]\d+)?"  # plain: 49 / 49,99 / 1234.56
+    r"|(?<![\w.,])[.,]\d{1,2}(?!\d)"  # no leading zero: .99 / ,50
+)
+_EXPONENT = re.compile(r"[eE][+-]?\d")
+_CODE = re.compile(r"\b([A-Z]{3})\b")
+
+
+def minor_exponent(currency: str) -> int:
+    return MINOR_UNITS.get((currency or "").upper(), 2)
+
+
+def detect_currency(raw: str):
+    for match in _CODE.finditer(raw.upper()):
+        if match.group(1) in KNOWN_CODES:
+            return match.group(1)
+    for symbol, code in SYMBOL_CURRENCIES:
+        if symbol in raw:
+            return code
+    return None
+
+
+def _normalize_number(token: str) -> str:
+    """Turn '1.234,56', '1,234.56', '49,99', "1'299" etc. into '1234.56' form."""
+    token = re.sub(r"['\u00a0\u202f ]", "", token)
+    last_dot, last_comma = token.rfind("."), token.rfind(",")
+    if last_dot >= 0 and last_comma >= 0:
+        decimal = "." if last_dot > last_comma else ","
+    elif last_dot >= 0 or last_comma >= 0:
+        sep = "." if last_dot >= 0 else ","
+        parts = token.split(sep)
+        # A single separator followed by exactly three digits is a thousands
+        # separator ("1,234" / "1.234"); anything else is a decimal point.
+        if len(parts) > 2 or len(parts[-1]) == 3:
+            return token.replace(sep, "")
+        decimal = sep
+    else:
+        return token
+    thousands = "," if decimal == "." else "."
+    return token.replace(thousands, "").replace(decimal, ".")
+
+
+def parse_price(raw, currency_hint: str = ""):
+    """
+    Parse a scraped price into (amount_minor, currency). The hint (from
+    product:price:currency or a JSON-LD priceCurrency) wins over anything
+    detected in the string. Returns None if no number can be found.
+    """
+    if raw is None:
+        return None
+    if isinstance(raw, (int, float, Decimal)):
+        raw = str(raw)
+    raw = raw.strip()
+    if not raw:
+        return None
+
+    match = _NUMBER.search(raw)
+    if not match or _EXPONENT.match(raw, match.end()):
+        # Exponent notation ("1.5E3", str(1e21) == "1e+21") is no price we can
+        # trust, and reading up to the "e" would take 1e+21 for 1
+        return None
+    try:
+        value = Decimal(_normalize_number(match.group(0)))
+    except InvalidOperation:
+        return None
+
+    currency = (currency_hint or "").strip().upper() or detect_currency(raw)
+    amount = int((value * (10 ** minor_exponent(currency))).to_integral_value())
+    return amount, currency
+
+
+def parse_offer(offers):
+    """
+    (raw_price, currency) from a JSON-LD `offers` value: a single Offer, an
+    AggregateOffer (lowPrice) or a list of offers. None if there's no price.
+    """
+    if isinstance(offers, list):
+        for offer in offers:
+            found = parse_offer(offer)
+            if found:
+                return found
+        return None
+    if not isinstance(offers, dict):
+        return None
+    price = offers.get("price") or offers.get("lowPrice")
+    currency = offers.get("priceCurrency", "")
+    spec = offers.get("priceSpecification")
+    if not price and isinstance(spec, dict):
+        price = spec.get("price")
+        currency = currency or spec.get("priceCurrency", "")
+    if price:
+        return str(price), currency or ""
+    return None
+
+
+def format_price(amount_minor: int, currency: str = None) -> str:
+    """£49, £49.99; currencies without a symbol get their code: CHF 1,299.00."""
+    if amount_minor is None:
+        return None
+    currency = (currency or "").upper()
+    exponent = minor_exponent(currency)
+    value = Decimal(amount_minor) / (10 ** exponent)
+    symbol = CURRENCY_SYMBOLS.get(currency)
+    if symbol is None and currency:
+        return f"{currency} {value:,.{exponent}f}"
+    if exponent == 0 or amount_minor % (10 ** exponent) == 0:
+        number = str(int(value))
+    else:
+        number = f"{value:.{exponent}f}"
+    return f"{symbol or ''}{number}"
+
+
+def price_fields(raw, currency_hint: str = "") -> dict:
+    """Item fields for a scraped price: display string plus the indexed numeric form."""
+    parsed = parse_price(raw, currency_hint)
+    if parsed is None:
+        # Keep whatever the retailer showed so the item still has a price label
+        return {"price": str(raw).strip() or None if raw else None, "price_amount": None, "price_currency": None}
+    amount, currency = parsed
+    return {
+        # Without a currency a bare number says less than the retailer's own label
+        "price": raw.strip() if isinstance(raw, str) and not currency else format_price(amount, currency),
+        "price_amount": amount,
+        "price_currency": currency,
+    }
+
+
+def to_minor_units(value: float, currency: str) -> int:
+    return int((Decimal(str(value)) * (10 ** minor_exponent(currency))).to_integral_value())
@@ -0,0 +1,135 @@
+# utils/responses.py
+# Response plumbing for the list endpoints: orjson serialization that
+# understands ObjectId/datetime (no jsonable_encoder pass, no per-item _id
+# conversion), and gzip/brotli compression for large JSON bodies.
+
+import gzip
+import json
+import os
+
+from bson import ObjectId
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 5))
+# Low brotli qualities are about as fast as gzip and still noticeably smaller
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=lambda v: v.isoformat() if hasattr(v, "isoformat") else _default(v),
+                      separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; Mongo documents can be returned as-is."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def _pick_encoding(accept_encoding: str):
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    Compress complete JSON/text responses over COMPRESS_MIN_BYTES with brotli
+    or gzip, whichever the client prefers (brotli first). Streaming responses
+    (more than one body message) and anything already encoded pass through
+    untouched, so file downloads and NDJSON streams keep streaming.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _pick_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message  # held until we see the body
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if start_message is not None:
+                start, start_message = start_message, None
+                if message.get("more_body") or len(body) < COMPRESS_MIN_BYTES:
+                    # Streaming or small: send as-is from here on
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressed = _compress(body, encoding)
+                headers = MutableHeaders(raw=start["headers"])
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(compressed))
+                headers.add_vary_header("Accept-Encoding")
+                await send(start)
+                await send({"type": "http.response.body", "body": compressed})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
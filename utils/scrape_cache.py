@@ -0,0 +1,173 @@
+# utils/scrape_cache.py
+# Scrape results shared across users: a small in-process LRU in front of a
+# Mongo collection, with concurrent misses for one URL sharing a single fetch.
+# Entries are keyed by canonical URL key (utils/canonical_url.py), so tracking
+# variants of a product share one scrape; results are also stored under the
+# page's rel=canonical so a later save of that URL is a hit too.
+
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from database import scrape_cache_collection
+from utils.canonical_url import url_key
+from utils.log import get_logger
+from utils.scraper_pipeline import scrape_product_data
+from utils.single_flight import SingleFlight
+
+log = get_logger("scrape_cache")
+
+CACHE_TTL_SECONDS = int(os.getenv("SCRAPE_CACHE_TTL", 6 * 60 * 60))
+LOCAL_CACHE_SIZE = int(os.getenv("SCRAPE_CACHE_LOCAL_SIZE", 1024))
+
+_local = OrderedDict()  # key -> (expires_at_monotonic, data)
+_flights = SingleFlight()  # url key -> scrape in progress
+stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0}
+
+
+def is_usable_result(data: dict) -> bool:
+    # Failed fetches come back as a placeholder; don't pin those for hours
+    return bool(data) and not (data.get("title") == "Unknown Product" and not data.get("price"))
+
+
+def _local_get(key):
+    entry = _local.get(key)
+    if entry is None:
+        return None
+    expires, data = entry
+    if expires < time.monotonic():
+        _local.pop(key, None)
+        return None
+    _local.move_to_end(key)
+    return data
+
+
+def _local_put(key, data, ttl=CACHE_TTL_SECONDS):
+    _local[key] = (time.monotonic() + ttl, data)
+    _local.move_to_end(key)
+    while len(_local) > LOCAL_CACHE_SIZE:
+        _local.popitem(last=False)
+
+
+async def _shared_get(key):
+    doc = await scrape_cache_collection.find_one(
+        {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}
+    )
+    if not doc:
+        return None
+    remaining = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+    return doc["data"], remaining
+
+
+async def _shared_put(key, data):
+    now = datetime.utcnow()
+    await scrape_cache_collection.update_one(
+        {"_id": key},
+        {"$set": {
+            "data": data,
+            "scraped_at": now,
+            "expires_at": now + timedelta(seconds=CACHE_TTL_SECONDS),
+        }},
+        upsert=True,
+    )
+
+
+async def _load(key, url, refresh):
+    if not refresh:
+        shared = await _shared_get(key)
+        if shared:
+            data, remaining = shared
+            stats["shared_hits"] += 1
+            _local_put(key, data, ttl=remaining)
+            return data
+
+    stats["misses"] += 1
+    data = await scrape_product_data(url)
+    if is_usable_result(data):
+        keys = {key}
+        if data.get("canonical_url"):
+            keys.add(url_key(data["canonical_url"]))
+        for cache_key in keys:
+            _local_put(cache_key, data)
+            try:
+                await _shared_put(cache_key, data)
+            except Exception as e:
+                log.warning("failed to store", key=cache_key, error=str(e))
+    return data
+
+
+async def get_scraped_product(url: str, refresh: bool = False) -> dict:
+    """
+    Return scraped product data for url, scraping at most once per URL across
+    concurrent callers. refresh=True skips both cache tiers and re-scrapes.
+    """
+    key = url_key(url)
+
+    if refresh:
+        stats["refreshes"] += 1
+        _local.pop(key, None)
+    else:
+        data = _local_get(key)
+        if data is not None:
+            stats["local_hits"] += 1
+            return dict(data)
+
+    if key in _flights:
+        stats["coalesced"] += 1
+    return dict(await _flights.do(key, lambda: _load(key, url, refresh)))
+
+
+async def get_cached_product(url: str) -> dict:
+    """Cached scrape data for url from either tier, without scraping on a miss."""
+    key = url_key(url)
+    data = _local_get(key)
+    if data is not None:
+        stats["local_hits"] += 1
+        return dict(data)
+    shared = await _shared_get(key)
+    if shared:
+        data, remaining = shared
+        stats["shared_hits"] += 1
+        _local_put(key, data, ttl=remaining)
+        return dict(data)
+    return None
+
+
+async def get_cached_products(urls: list) -> dict:
+    """Batch form of get_cached_product: url -> data for every cached url, one shared-tier query."""
+    found = {}
+    missing = {}
+    for url in urls:
+        key = url_key(url)
+        data = _local_get(key)
+        if data is not None:
+            stats["local_hits"] += 1
+            found[url] = dict(data)
+        else:
+            missing.setdefault(key, []).append(url)
+    if not missing:
+        return found
+
+    now = datetime.utcnow()
+    cursor = scrape_cache_collection.find(
+        {"_id": {"$in": list(missing)}, "expires_at": {"$gt": now}}
+    )
+    async for doc in cursor:
+        stats["shared_hits"] += 1
+        _local_put(doc["_id"], doc["data"], ttl=(doc["expires_at"] - now).total_seconds())
+        for url in missing[doc["_id"]]:
+            found[url] = dict(doc["data"])
+    return found
+
+
+def cache_stats() -> dict:
+    # Coalesced callers were served without a fetch of their own
+    hits = stats["local_hits"] + stats["shared_hits"] + stats["coalesced"]
+    lookups = hits + stats["misses"]
+    return {
+        **stats,
+        "local_entries": len(_local),
+        "in_flight": len(_flights),
+        "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+    }
@@ -0,0 +1,268 @@
+# utils/scrape_queue.py
+# In-process worker pool for item scrapes. Every job is also recorded in Mongo
+# so work queued before a restart (or on a worker that died) is picked up again.
+#
+# A shop gets at most SCRAPE_PER_DOMAIN scrapes at once. A worker that pulls a
+# job for a shop already at its limit parks it (unclaimed, so no lease ticks
+# and no attempt is spent) and moves on; the job goes back on the queue when
+# one of that shop's scrapes finishes. One big same-shop batch can't tie up
+# every worker.
+
+import asyncio
+import os
+import random
+from collections import deque
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from database import items_collection, scrape_jobs_collection
+from utils.canonical_url import url_key
+from utils.dedupe import find_duplicate
+from utils.image_cache import schedule_prewarm
+from utils.log import get_logger
+from utils.metrics import Gauge, stage_timer
+from utils.scrape_cache import get_scraped_product, is_usable_result
+from utils.classifier import classify_items
+from utils.search_index import search_tokens
+from utils.wardrobe_stats import STAT_FIELDS, record_item_change
+from utils.wardrobe_version import bump_wardrobe_version
+
+log = get_logger("scrape_queue")
+
+WORKERS = int(os.getenv("SCRAPE_WORKERS", 8))
+PER_DOMAIN = int(os.getenv("SCRAPE_PER_DOMAIN", 2))
+MAX_ATTEMPTS = int(os.getenv("SCRAPE_MAX_ATTEMPTS", 3))
+BACKOFF_BASE_SECONDS = float(os.getenv("SCRAPE_BACKOFF_BASE", 5))
+LEASE_SECONDS = int(os.getenv("SCRAPE_LEASE_SECONDS", 120))
+SWEEP_INTERVAL_SECONDS = int(os.getenv("SCRAPE_SWEEP_INTERVAL", 30))
+
+
+def domain_of(url: str) -> str:
+    return urlparse(url).netloc.lower().replace("www.", "")
+
+
+class ScrapeQueue:
+    def __init__(self, workers: int = WORKERS, per_domain: int = PER_DOMAIN):
+        self.workers = workers
+        self.per_domain = per_domain
+        self._queue: asyncio.Queue = None
+        self._tasks = []
+        self._domains = {}
+        self._parked = {}  # domain -> deque of (job_id, url) waiting for a slot
+        self._queued = set()  # queued or parked job ids
+
+    def domain_limit(self, url: str) -> asyncio.Semaphore:
+        domain = domain_of(url)
+        sem = self._domains.get(domain)
+        if sem is None:
+            sem = self._domains[domain] = asyncio.Semaphore(self.per_domain)
+        return sem
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _push(self, job_id, url: str):
+        if job_id not in self._queued:
+            self._queued.add(job_id)
+            self._queue.put_nowait((job_id, url))
+
+    def _unpark(self, domain: str):
+        parked = self._parked.get(domain)
+        if parked:
+            self._queue.put_nowait(parked.popleft())
+            if not parked:
+                del self._parked[domain]
+
+    async def enqueue(self, item_id, url: str, refresh: bool = False):
+        now = datetime.utcnow()
+        result = await scrape_jobs_collection.insert_one({
+            "item_id": item_id,
+            "url": url,
+            "refresh": refresh,
+            "status": "queued",
+            "attempts": 0,
+            "next_run_at": now,
+            "created_at": now,
+        })
+        self._push(result.inserted_id, url)
+        return result.inserted_id
+
+    async def enqueue_many(self, jobs: list):
+        """jobs: [(item_id, url)], written with one insert_many."""
+        if not jobs:
+            return []
+        now = datetime.utcnow()
+        result = await scrape_jobs_collection.insert_many([
+            {
+                "item_id": item_id,
+                "url": url,
+                "refresh": False,
+                "status": "queued",
+                "attempts": 0,
+                "next_run_at": now,
+                "created_at": now,
+            }
+            for item_id, url in jobs
+        ], ordered=False)
+        for job_id, (_, url) in zip(result.inserted_ids, jobs):
+            self._push(job_id, url)
+        return result.inserted_ids
+
+    async def _sweeper(self):
+        # Picks up jobs from before a restart, retries whose backoff has
+        # elapsed, and jobs whose worker died mid-scrape (expired lease)
+        while True:
+            try:
+                now = datetime.utcnow()
+                cursor = scrape_jobs_collection.find(
+                    {"$or": [
+                        {"status": "queued", "next_run_at": {"$lte": now}},
+                        {"status": "running", "lease_until": {"$lt": now}},
+                    ]},
+                    {"_id": 1, "url": 1},
+                ).sort("next_run_at", 1).limit(500)
+                async for job in cursor:
+                    self._push(job["_id"], job["url"])
+            except Exception:
+                log.exception("sweep failed")
+            await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+
+    async def _claim(self, job_id):
+        now = datetime.utcnow()
+        return await scrape_jobs_collection.find_one_and_update(
+            {
+                "_id": job_id,
+                "$or": [
+                    {"status": "queued", "next_run_at": {"$lte": now}},
+                    {"status": "running", "lease_until": {"$lt": now}},
+                ],
+            },
+            {
+                "$set": {"status": "running", "lease_until": now + timedelta(seconds=LEASE_SECONDS)},
+                "$inc": {"attempts": 1},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _worker(self):
+        while True:
+            job_id, url = await self._queue.get()
+            domain = domain_of(url)
+            slot = self.domain_limit(url)
+            if slot.locked():
+                # Shop is at its limit: park the job, not this worker
+                self._parked.setdefault(domain, deque()).append((job_id, url))
+                continue
+            self._queued.discard(job_id)
+            try:
+                # The slot is free, so this takes it without waiting; claim
+                # only once it's held, so the lease covers the scrape alone
+                async with slot:
+                    job = await self._claim(job_id)
+                    scraped = await self._scrape(job) if job else None
+                if job:
+                    await self._settle(job, scraped)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("job crashed", job_id=job_id)
+            finally:
+                self._unpark(domain)
+
+    async def _scrape(self, job):
+        try:
+            return await get_scraped_product(job["url"], refresh=job.get("refresh", False))
+        except Exception as e:
+            log.warning("scrape error", url=job["url"], error=str(e))
+            return None
+
+    async def _settle(self, job, scraped):
+        if scraped and is_usable_result(scraped):
+            await complete_item(job["item_id"], scraped)
+            await self._finish(job, "done")
+        elif job["attempts"] < MAX_ATTEMPTS:
+            await self._retry(job)
+        else:
+            await complete_item(job["item_id"], scraped, status="failed")
+            await self._finish(job, "failed")
+
+    async def _finish(self, job, status):
+        await scrape_jobs_collection.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": status, "finished_at": datetime.utcnow()}},
+        )
+
+    async def _retry(self, job):
+        # Exponential backoff with jitter
+        delay = BACKOFF_BASE_SECONDS * (2 ** (job["attempts"] - 1)) * random.uniform(0.8, 1.2)
+        await scrape_jobs_collection.update_one(
+            {"_id": job["_id"]},
+            {"$set": {
+                "status": "queued",
+                "next_run_at": datetime.utcnow() + timedelta(seconds=delay),
+            }},
+        )
+        asyncio.get_running_loop().call_later(delay, self._push, job["_id"], job["url"])
+
+
+async def complete_item(item_id, scraped: dict, status: str = "ready"):
+    """Fill a pending item in with its scraped metadata."""
+    update = {"status": status, "scraped_at": datetime.utcnow()}
+    if scraped:
+        update.update(scraped)
+    if status == "failed" and not update.get("title"):
+        # The scraper's placeholder for a page it couldn't read; clients expect a title
+        update["title"] = "Unknown Product"
+    with stage_timer("save", update.get("site_name")):
+        before = await items_collection.find_one_and_update(
+            {"_id": ObjectId(item_id)},
+            {"$set": update},
+            projection={**STAT_FIELDS, "title": 1, "source": 1, "source_key": 1, "category_source": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if before:
+            after = {**before, **update}
+            derived = {}
+            if status == "ready" and before.get("category_source") != "user":
+                # Now that there's a title, improve on the URL-only guess from save time
+                derived.update((await classify_items([after]))[0])
+                after.update(derived)
+            await record_item_change(before, after)
+            # Category/subcategory live on the item, so tokens need the merged doc
+            derived["search_tokens"] = search_tokens(after)
+            if status == "ready":
+                if after.get("canonical_url"):
+                    derived["canonical_key"] = after["canonical_key"] = url_key(after["canonical_url"])
+                duplicate = await find_duplicate(after)
+                derived["duplicate_of"] = str(duplicate["_id"]) if duplicate else None
+            await items_collection.update_one({"_id": before["_id"]}, {"$set": derived})
+            await bump_wardrobe_version(before.get("users_id"))
+    # Nothing to prewarm for an item deleted while it was being scraped
+    if before and status == "ready":
+        schedule_prewarm(item_id, update.get("image_url"))
+
+
+scrape_queue = ScrapeQueue()
+Gauge(
+    "scrape_queue_depth", "Scrape jobs waiting for a worker in this process",
+    function=lambda: scrape_queue._queue.qsize() if scrape_queue._queue else 0,
+)
+
+
+async def start_scrape_queue():
+    await scrape_queue.start()
+
+
+async def stop_scrape_queue():
+    await scrape_queue.stop()
@@ -1,11 +1,14 @@
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse, urljoin
+from utils.http_client import fetch_html
+from utils.canonical_url import canonicalize_url, same_site
+from utils.extractors import default_plan, get_plan, record_scrape, run_extractors
+from utils.html_extract import extract_page_metadata
+from utils.playwright_scraper import fetch_rendered_html, rendering_available
+from utils.prices import price_fields
+from utils.log import get_logger
+from utils.metrics import scrape_results, stage_timer
 
-HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-CURRENCY_SYMBOLS = {
-    "GBP": "£", "USD": "$", "EUR": "€", "CAD": "C$", "AUD": "A$", "JPY": "¥"
-}
+log = get_logger("scraper")
 
 def resolve_url(href, base):
     if not href:
@@ -16,77 +19,96 @@ def resolve_url(href, base):
         return "https:" + href
     return urljoin(base, href)
 
-def clean_price(raw_price: str, currency: str = "") -> str:
-    if not raw_price:
-        return None
+def extract_price(page, plan=None) -> dict:
+    # Without a domain plan: meta tags, then CSS price classes, then JSON-LD
+    return run_extractors(plan or default_plan(), page)[0]
 
-    price = raw_price.replace(",", "").replace("£", "").replace("$", "").replace("€", "").strip()
-    try:
-        value = float(price)
-        formatted = f"{value:.2f}"
-        if formatted.endswith(".00"):
-            formatted = str(int(value))
-    except ValueError:
-        return raw_price
-
-    symbol = CURRENCY_SYMBOLS.get(currency.upper(), "")
-    return f"{symbol}{formatted}" if symbol else formatted
-
-def extract_price(soup):
-    selectors = [
-        {"name": "meta", "attrs": {"property": "product:price:amount"}},
-        {"name": "meta", "attrs": {"property": "og:price:amount"}},
-        {"name": "span", "class_": "price"},
-        {"name": "div", "class_": "price"},
-        {"name": "span", "class_": "current-price"},
-        {"name": "span", "class_": "product-price"},
-    ]
-    for sel in selectors:
-        tag = soup.find(sel["name"], attrs=sel.get("attrs")) if "attrs" in sel else \
-              soup.find(sel["name"], class_=sel.get("class_"))
-        if tag:
-            raw = tag.get("content") or tag.text
-            if raw and "menu" not in raw.lower():
-                currency_tag = soup.find("meta", attrs={"property": "product:price:currency"})
-                currency = currency_tag.get("content") if currency_tag else ""
-                return clean_price(raw, currency)
-    return None
-
-def extract_title(soup):
-    title = soup.find("title")
-    return title.text.strip().split("|")[0].strip() if title else "Unknown Product"
-
-def extract_site_icon(soup, base_url):
-    icon = soup.find("link", rel=lambda val: val and "icon" in val.lower())
-    if icon and icon.get("href"):
-        return resolve_url(icon["href"], base_url)
-    og = soup.find("meta", property="og:image")
-    return resolve_url(og.get("content"), base_url) if og else ""
-
-def extract_main_image(soup, base_url):
-    og = soup.find("meta", property="og:image")
-    return resolve_url(og.get("content"), base_url) if og else ""
-
-def extract_all_images(soup, base_url):
-    og_multiple = soup.find_all("meta", property="og:image")
-    unique = {resolve_url(meta["content"], base_url) for meta in og_multiple if meta.get("content")}
-    return list(unique) if unique else [extract_main_image(soup, base_url)]
+def extract_title(page):
+    return page.title.strip().split("|")[0].strip() if page.title is not None else "Unknown Product"
+
+def extract_site_icon(page, base_url):
+    if page.icon_found and page.icon_href:
+        return resolve_url(page.icon_href, base_url)
+    return extract_main_image(page, base_url)
+
+def extract_main_image(page, base_url):
+    return resolve_url(page.og_images[0], base_url) if page.og_images else ""
+
+def extract_all_images(page, base_url):
+    unique = {resolve_url(content, base_url) for content in page.og_images if content}
+    return list(unique) if unique else [extract_main_image(page, base_url)]
+
+def extract_canonical_url(page, url):
+    # Only trust a canonical on the same site; some shops point it at a landing page
+    if not page.canonical_href:
+        return None
+    canonical = resolve_url(page.canonical_href, url)
+    if not canonical.startswith(("http://", "https://")) or not same_site(canonical, url):
+        return None
+    return canonicalize_url(canonical)
 
 def extract_site_name(parsed_url):
     return parsed_url.netloc.replace("www.", "")
 
+def _needs_rendering(page, plan=None) -> bool:
+    # JS-rendered shops serve a shell without a usable title or price
+    if page is None:
+        return True
+    title = extract_title(page)
+    return not title or title == "Unknown Product" or extract_price(page, plan)["price"] is None
+
+async def _fetch_page(url: str, plan=None):
+    try:
+        plan = plan or default_plan()
+        html = await fetch_html(url)
+        with stage_timer("parse", plan.domain):
+            return extract_page_metadata(html, **plan.parse_options)
+    except Exception as e:
+        log.warning("fetch failed", url=url, error=str(e))
+        return None
+
+async def _fetch_rendered_page(url: str, plan=None):
+    try:
+        plan = plan or default_plan()
+        with stage_timer("render", plan.domain):
+            html = await fetch_rendered_html(url)
+        with stage_timer("parse", plan.domain):
+            return extract_page_metadata(html, **plan.parse_options)
+    except Exception as e:
+        log.warning("rendered fallback failed", url=url, error=str(e))
+        return None
+
 async def scrape_product_data(url: str) -> dict:
     parsed = urlparse(url)
     base_url = f"{parsed.scheme}://{parsed.netloc}"
+    domain = extract_site_name(parsed).lower()
+    plan = await get_plan(domain)
 
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
-    except Exception as e:
-        print(f"[Scraper] Error fetching page: {e}")
+    # Domains known to need the browser go straight to it
+    page = None
+    fetches = {}
+    if not (plan.skip_static and rendering_available()):
+        page = await _fetch_page(url, plan)
+        fetches["static"] = not _needs_rendering(page, plan)
+    if not fetches.get("static") and rendering_available():
+        rendered = await _fetch_rendered_page(url, plan)
+        fetches["rendered"] = not _needs_rendering(rendered, plan)
+        if rendered is not None and (page is None or fetches["rendered"]):
+            page = rendered
+
+    if page is None:
+        price, winner, tried = price_fields(None), None, []
+    else:
+        with stage_timer("extract", domain):
+            price, winner, tried = run_extractors(plan, page)
+    await record_scrape(domain, fetches, tried, winner)
+    outcome = "rendered" if fetches.get("rendered") else "static" if fetches.get("static") else "failed"
+    scrape_results.inc(domain=domain, outcome=outcome)
+
+    if page is None:
         return {
             "title": "Unknown Product",
-            "price": None,
+            **price_fields(None),
             "image_url": "",
             "site_icon_url": "",
             "site_name": extract_site_name(parsed),
@@ -94,10 +116,11 @@ async def scrape_product_data(url: str) -> dict:
         }
 
     return {
-        "title": extract_title(soup),
-        "price": extract_price(soup),
-        "image_url": extract_main_image(soup, base_url),
-        "site_icon_url": extract_site_icon(soup, base_url),
+        "title": extract_title(page),
+        **price,
+        "image_url": extract_main_image(page, base_url),
+        "site_icon_url": extract_site_icon(page, base_url),
         "site_name": extract_site_name(parsed),
-        "images": extract_all_images(soup, base_url)
+        "images": extract_all_images(page, base_url),
+        "canonical_url": extract_canonical_url(page, url),
     }
@@ -0,0 +1,143 @@
+# utils/search_index.py
+# Prefix search over a user's wardrobe. Each item stores search_tokens: every
+# word of its title, site_name, category and subcategory plus that word's
+# prefixes, so a (users_id, search_tokens) multikey index answers "all query
+# terms match the start of some word" directly. The newest MAX_CANDIDATES
+# matches are read in created_at order straight off that index and ranked in
+# Python by which fields matched and whether the match was a whole word or
+# just a prefix; older matches beyond the cap aren't considered.
+#
+#     python -m utils.search_index          # backfill items saved before search existed
+
+import asyncio
+import os
+import re
+import unicodedata
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from database import items_collection
+
+MIN_PREFIX = 2
+MAX_PREFIX = 20
+MAX_QUERY_TERMS = 8
+# Ranking reads at most this many matches, newest first; plenty for a top-N result list
+MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", 200))
+BATCH_SIZE = 500
+
+# Field weights: a title hit matters more than a retailer name hit
+FIELD_WEIGHTS = {"title": 3.0, "category": 2.0, "subcategory": 2.0, "site_name": 1.0}
+SEARCH_FIELDS = tuple(FIELD_WEIGHTS)
+EXACT_BONUS = 2.0
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def words(text) -> list:
+    """Lowercased, accent-folded words of `text` ("Réalisation" -> "realisation")."""
+    if not text or not isinstance(text, str):
+        return []
+    folded = text.lower()
+    if not folded.isascii():
+        folded = unicodedata.normalize("NFKD", folded)
+        folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return _WORD.findall(folded.replace("_", " "))
+
+
+def search_tokens(item: dict) -> list:
+    """Words and word prefixes (MIN_PREFIX..MAX_PREFIX chars) over the searchable fields."""
+    tokens = set()
+    for field in SEARCH_FIELDS:
+        for word in words(item.get(field)):
+            if len(word) < MIN_PREFIX:
+                continue
+            tokens.update(word[:n] for n in range(MIN_PREFIX, min(len(word), MAX_PREFIX) + 1))
+    return sorted(tokens)
+
+
+def query_terms(q: str) -> list:
+    seen = []
+    for word in words(q):
+        if len(word) >= MIN_PREFIX and word not in seen:
+            seen.append(word)
+    return seen[:MAX_QUERY_TERMS]
+
+
+def score_item(item: dict, terms: list) -> float:
+    """0 if some term matches no word; otherwise higher for title and whole-word hits."""
+    weights = {}  # word -> weight of the best field it appears in
+    for field, weight in FIELD_WEIGHTS.items():
+        for word in words(item.get(field)):
+            if weights.get(word, 0) < weight:
+                weights[word] = weight
+    total = 0.0
+    for term in terms:
+        best = weights.get(term, 0) * EXACT_BONUS
+        for word, weight in weights.items():
+            if weight > best and word.startswith(term):
+                best = weight
+        if not best:
+            return 0.0
+        total += best
+    return total
+
+
+def search_filter(users_id: str, terms: list, ownership: str = None) -> dict:
+    query = {
+        "users_id": users_id,
+        # Longer terms than MAX_PREFIX are checked exactly by score_item
+        "search_tokens": {"$all": [term[:MAX_PREFIX] for term in terms]},
+    }
+    if ownership:
+        query["ownership"] = ownership.lower()
+    return query
+
+
+async def search_items(users_id: str, q: str, ownership: str = None, limit: int = 20, projection: dict = None) -> list:
+    """Best-first items matching every term of `q` as a word or word prefix.
+
+    Ranks the newest MAX_CANDIDATES matches only, so on a huge wardrobe an
+    older, better-scoring match can be left out of a broad query.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return []
+    fields = {**(projection or {}), **{field: 1 for field in SEARCH_FIELDS}, "created_at": 1}
+    # (users_id, search_tokens, created_at) index: the cap keeps the newest matches, no sort in memory
+    candidates = await items_collection.find(search_filter(users_id, terms, ownership), fields) \
+        .sort("created_at", -1) \
+        .limit(MAX_CANDIDATES) \
+        .to_list(length=MAX_CANDIDATES)
+    scored = [(score_item(item, terms), item) for item in candidates]
+    scored = [pair for pair in scored if pair[0] > 0]
+    # Best score first, newest first among equals
+    scored.sort(key=lambda pair: (pair[0], pair[1].get("created_at") or datetime.min), reverse=True)
+    results = []
+    for score, item in scored[:limit]:
+        item["score"] = score
+        results.append(item)
+    return results
+
+
+async def backfill_search_tokens(batch_size: int = BATCH_SIZE) -> dict:
+    cursor = items_collection.find(
+        {"search_tokens": {"$exists": False}},
+        {field: 1 for field in SEARCH_FIELDS},
+        batch_size=batch_size,
+    )
+    ops = []
+    counts = {"indexed": 0}
+    async for item in cursor:
+        ops.append(UpdateOne({"_id": item["_id"]}, {"$set": {"search_tokens": search_tokens(item)}}))
+        counts["indexed"] += 1
+        if len(ops) >= batch_size:
+            await items_collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        await items_collection.bulk_write(ops, ordered=False)
+    return counts
+
+
+if __name__ == "__main__":
+    print(asyncio.run(backfill_search_tokens()))
@@ -0,0 +1,40 @@
+# utils/single_flight.py
+# Concurrent misses for one key share a single load: the first caller starts
+# load() in a task of its own, and everyone who asks for the same key
+# meanwhile (that first caller included) awaits the task's result or
+# exception instead of loading again. Each cache owns its own SingleFlight,
+# so keys only need to be unique within that cache.
+
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._in_flight = {}  # key -> asyncio.Task running the load
+
+    def __contains__(self, key) -> bool:
+        # Checking this right before do() (no await between) tells whether
+        # the call will join a load already running
+        return key in self._in_flight
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key, load):
+        """load()'s result, running it only if no load for `key` is already in flight."""
+        task = self._in_flight.get(key)
+        if task is None:
+            # The load runs in its own task, so it belongs to no one caller
+            task = asyncio.create_task(load())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        # Shielded: a cancelled caller, the one that started the load included,
+        # stops waiting but leaves the load running for everyone else
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Retrieve it so a failure nobody else awaited doesn't log a warning
+            task.exception()
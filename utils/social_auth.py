@@ -0,0 +1,103 @@
+# utils/social_auth.py
+# Server-side verification of Google / Apple Sign-In ID tokens for
+# /social-login. The client sends the provider's id_token; we check its
+# signature against the provider's published keys (JWKS, cached), its
+# issuer, audience (our OAuth client ids) and expiry, and that the provider
+# verified the email. Only then does the email identify an account.
+#
+# A provider is enabled by setting its client ids:
+#     GOOGLE_CLIENT_IDS=web-id.apps.googleusercontent.com,ios-id.apps...
+#     APPLE_CLIENT_IDS=com.example.wardrobe
+
+import json
+import os
+import time
+
+from jose import JWTError, jwt
+
+from utils.http_client import fetch
+from utils.log import get_logger
+
+log = get_logger("social_auth")
+
+JWKS_TTL_SECONDS = 60 * 60
+# An unknown kid usually means the provider rotated keys; refetch, but not on every bad token
+JWKS_MIN_REFRESH_SECONDS = 60
+
+
+def _client_ids(name: str) -> set:
+    return {value.strip() for value in os.getenv(name, "").split(",") if value.strip()}
+
+
+PROVIDERS = {
+    "google": {
+        "jwks_url": "https://www.googleapis.com/oauth2/v3/certs",
+        "issuers": {"accounts.google.com", "https://accounts.google.com"},
+        "audiences": _client_ids("GOOGLE_CLIENT_IDS"),
+    },
+    "apple": {
+        "jwks_url": "https://appleid.apple.com/auth/keys",
+        "issuers": {"https://appleid.apple.com"},
+        "audiences": _client_ids("APPLE_CLIENT_IDS"),
+    },
+}
+
+_jwks = {}  # provider -> (fetched_at, {kid: jwk})
+
+
+class SocialTokenError(Exception):
+    pass
+
+
+def enabled_providers() -> list:
+    return sorted(name for name, config in PROVIDERS.items() if config["audiences"])
+
+
+async def _fetch_keys(provider: str) -> dict:
+    try:
+        result = await fetch(PROVIDERS[provider]["jwks_url"], headers={"Accept": "application/json"})
+        if result.status_code != 200:
+            raise SocialTokenError(f"HTTP {result.status_code}")
+        keys = {key["kid"]: key for key in json.loads(result.text).get("keys", []) if key.get("kid")}
+    except Exception as e:
+        log.warning("could not fetch signing keys", provider=provider, error=str(e))
+        raise SocialTokenError(f"could not fetch {provider} signing keys")
+    _jwks[provider] = (time.monotonic(), keys)
+    return keys
+
+
+async def _signing_key(provider: str, kid: str) -> dict:
+    fetched_at, keys = _jwks.get(provider, (0.0, {}))
+    age = time.monotonic() - fetched_at
+    if age > JWKS_TTL_SECONDS or (kid not in keys and age > JWKS_MIN_REFRESH_SECONDS):
+        keys = await _fetch_keys(provider)
+    key = keys.get(kid)
+    if key is None:
+        raise SocialTokenError("token signed with an unknown key")
+    return key
+
+
+async def verify_id_token(provider: str, id_token: str) -> dict:
+    """Claims of a valid ID token from `provider`, with a provider-verified email; else SocialTokenError."""
+    config = PROVIDERS.get(provider)
+    if config is None or not config["audiences"]:
+        raise SocialTokenError(f"unsupported provider: {provider}")
+    try:
+        header = jwt.get_unverified_header(id_token)
+        key = await _signing_key(provider, header.get("kid"))
+        # Audience is checked below: jose takes a single audience, we allow several client ids
+        claims = jwt.decode(
+            id_token, key, algorithms=["RS256"], options={"verify_aud": False, "verify_at_hash": False},
+        )
+    except JWTError as e:
+        raise SocialTokenError(f"invalid token: {e}")
+
+    if claims.get("iss") not in config["issuers"]:
+        raise SocialTokenError("wrong issuer")
+    audiences = claims.get("aud")
+    audiences = {audiences} if isinstance(audiences, str) else set(audiences or [])
+    if not audiences & config["audiences"]:
+        raise SocialTokenError("token was issued for another app")
+    if not claims.get("email") or str(claims.get("email_verified")).lower() != "true":
+        raise SocialTokenError("email not verified by the provider")
+    return claims
@@ -0,0 +1,168 @@
+# utils/taxonomy.py
+# The category/subcategory taxonomy as one in-memory snapshot: the nested
+# tree (pre-serialized for GET /categories/tree) and the item classifier
+# trained from it. The snapshot is rebuilt when categories change: at once
+# in the worker that made the change, and in other workers on their next
+# read once TAXONOMY_CHECK_SECONDS have passed (they compare a version
+# counter in Mongo, so there's no need to reload the collections to notice).
+#
+# An empty taxonomy is seeded from DEFAULT_TAXONOMY at startup; keywords
+# are what the classifier learns from, on top of the names themselves.
+
+import asyncio
+import hashlib
+import os
+import time
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from database import categories_collection, subcategories_collection, taxonomy_meta_collection
+from utils.log import get_logger
+from utils.responses import dumps
+
+log = get_logger("taxonomy")
+
+TAXONOMY_CHECK_SECONDS = float(os.getenv("TAXONOMY_CHECK_SECONDS", 10))
+VERSION_ID = "version"
+
+# category -> subcategory -> keywords
+DEFAULT_TAXONOMY = {
+    "Tops": {
+        "T-shirts": ["t-shirt", "tshirt", "tee", "tank", "cami", "vest top", "crop top"],
+        "Shirts": ["shirt", "blouse", "oxford", "poplin", "overshirt"],
+        "Knitwear": ["jumper", "sweater", "cardigan", "knit", "pullover", "sweatshirt", "hoodie", "turtleneck"],
+    },
+    "Bottoms": {
+        "Trousers": ["trousers", "pants", "chinos", "culottes", "joggers", "leggings", "slacks"],
+        "Jeans": ["jeans", "denim"],
+        "Skirts": ["skirt", "miniskirt"],
+        "Shorts": ["shorts", "bermuda"],
+    },
+    "Dresses": {
+        "Dresses": ["dress", "gown", "sundress", "midi", "maxi", "slip"],
+        "Jumpsuits": ["jumpsuit", "playsuit", "romper", "dungarees", "boilersuit"],
+    },
+    "Outerwear": {
+        "Coats": ["coat", "trench", "parka", "overcoat", "puffer", "raincoat", "mac"],
+        "Jackets": ["jacket", "blazer", "bomber", "gilet", "shacket", "windbreaker"],
+    },
+    "Shoes": {
+        "Trainers": ["trainers", "sneakers", "runners", "plimsolls"],
+        "Boots": ["boots", "chelsea", "ankle boot", "wellies"],
+        "Heels": ["heels", "pumps", "stiletto", "slingback", "court shoes"],
+        "Flats": ["loafers", "ballet flats", "flats", "mules", "brogues", "espadrilles"],
+        "Sandals": ["sandals", "sliders", "flip flops", "slides"],
+    },
+    "Bags": {
+        "Bags": ["bag", "tote", "handbag", "clutch", "backpack", "crossbody", "shopper", "purse"],
+    },
+    "Accessories": {
+        "Jewellery": ["necklace", "earrings", "ring", "bracelet", "pendant", "jewellery", "jewelry"],
+        "Hats": ["hat", "cap", "beanie", "beret", "bucket hat"],
+        "Scarves": ["scarf", "shawl", "bandana", "snood"],
+        "Belts": ["belt"],
+        "Sunglasses": ["sunglasses", "shades", "eyewear"],
+    },
+}
+
+
+class TaxonomySnapshot:
+    def __init__(self, tree: list, version: int):
+        self.tree = tree
+        self.version = version
+        self.body = dumps(tree)
+        self.etag = '"%s"' % hashlib.blake2b(self.body, digest_size=8).hexdigest()
+        self.checked_at = time.monotonic()
+        self._classifier = None
+
+    @property
+    def classifier(self):
+        # Built on first use; most workers serve the tree far more than they classify
+        if self._classifier is None:
+            from utils.classifier import Classifier
+            self._classifier = Classifier.from_tree(self.tree)
+        return self._classifier
+
+
+_snapshot: TaxonomySnapshot = None
+_lock = asyncio.Lock()
+
+
+async def _read_version() -> int:
+    doc = await taxonomy_meta_collection.find_one({"_id": VERSION_ID}, {"v": 1})
+    return doc.get("v", 0) if doc else 0
+
+
+async def _build(version: int) -> TaxonomySnapshot:
+    categories = await categories_collection.find({}).sort("name", 1).to_list(length=None)
+    subcategories = await subcategories_collection.find({}).sort("name", 1).to_list(length=None)
+    by_category = {}
+    for sub in subcategories:
+        by_category.setdefault(str(sub.get("category_id")), []).append({
+            "id": str(sub["_id"]),
+            "name": sub["name"],
+            "keywords": sub.get("keywords") or [],
+        })
+    tree = [
+        {
+            "id": str(cat["_id"]),
+            "name": cat["name"],
+            "keywords": cat.get("keywords") or [],
+            "subcategories": by_category.get(str(cat["_id"]), []),
+        }
+        for cat in categories
+    ]
+    return TaxonomySnapshot(tree, version)
+
+
+async def reload_taxonomy() -> TaxonomySnapshot:
+    global _snapshot
+    async with _lock:
+        version = await _read_version()
+        _snapshot = await _build(version)
+        log.info("taxonomy loaded", version=version, categories=len(_snapshot.tree))
+        return _snapshot
+
+
+async def get_taxonomy() -> TaxonomySnapshot:
+    """Current snapshot; checks Mongo for a newer version at most every TAXONOMY_CHECK_SECONDS."""
+    snapshot = _snapshot
+    if snapshot is None:
+        return await reload_taxonomy()
+    if time.monotonic() - snapshot.checked_at < TAXONOMY_CHECK_SECONDS:
+        return snapshot
+    snapshot.checked_at = time.monotonic()
+    if await _read_version() != snapshot.version:
+        return await reload_taxonomy()
+    return snapshot
+
+
+async def taxonomy_changed() -> TaxonomySnapshot:
+    """Call after writing categories/subcategories: bump the version, rebuild here."""
+    await taxonomy_meta_collection.update_one({"_id": VERSION_ID}, {"$inc": {"v": 1}}, upsert=True)
+    return await reload_taxonomy()
+
+
+async def seed_taxonomy():
+    """Insert DEFAULT_TAXONOMY when there are no categories yet."""
+    if await categories_collection.count_documents({}, limit=1):
+        return
+    try:
+        # Only one worker seeds
+        await taxonomy_meta_collection.insert_one({"_id": "seeded"})
+    except DuplicateKeyError:
+        return
+    for category, subcategories in DEFAULT_TAXONOMY.items():
+        category_id = ObjectId()
+        await categories_collection.insert_one({"_id": category_id, "name": category, "keywords": []})
+        await subcategories_collection.insert_many([
+            {"name": name, "category_id": str(category_id), "keywords": keywords}
+            for name, keywords in subcategories.items()
+        ])
+    await taxonomy_changed()
+
+
+async def start_taxonomy():
+    await seed_taxonomy()
+    await get_taxonomy()
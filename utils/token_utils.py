@@ -1,24 +1,83 @@
+import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from jose import jwt
+from dotenv import load_dotenv
+from jose import jwt, JWTError
+
+load_dotenv()
 
-SECRET_KEY = "your_secret_key"  # Make sure to use a strong secret key
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+
+# Signing keys as "kid:secret" pairs, newest first. New tokens are signed with
+# the first key; tokens signed with any listed key still verify, so a key can
+# be rotated out by adding a new one in front and dropping the old one once
+# its tokens have expired. SECRET_KEY alone works as a single "default" key.
+# There is deliberately no fallback: a well-known key would let anyone mint
+# tokens for any user, so the app refuses to start without one.
+def _load_keys() -> "OrderedDict[str, str]":
+    keys = OrderedDict()
+    for pair in os.getenv("JWT_SIGNING_KEYS", "").split(","):
+        kid, _, secret = pair.strip().partition(":")
+        if kid and secret:
+            keys[kid] = secret
+    if not keys and os.getenv("SECRET_KEY"):
+        keys["default"] = os.getenv("SECRET_KEY")
+    if not keys:
+        raise RuntimeError("No JWT signing key configured: set JWT_SIGNING_KEYS (kid:secret,...) or SECRET_KEY")
+    return keys
+
+SIGNING_KEYS = _load_keys()
+ACTIVE_KID = next(iter(SIGNING_KEYS))
+
+# Verified tokens, so hot clients don't pay for a signature check per request
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 4096))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 300))
+_verified = OrderedDict()  # token -> (cached_until, claims)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """
     Generate a JWT token for user authentication.
 
-    :param data: Dictionary containing user-related claims (e.g., {"sub": user_email, "user_id": user_id})
-    :param expires_delta: Optional expiration time override (default: 30 minutes)
+    :param data: Dictionary containing user-related claims (e.g., {"sub": user_id})
+    :param expires_delta: Optional expiration time override (default: ACCESS_TOKEN_EXPIRE_MINUTES)
     :return: Encoded JWT token string
     """
     to_encode = data.copy()
-    
+
     # Set expiration time
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    
+
     # Encode the JWT token
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(
+        to_encode, SIGNING_KEYS[ACTIVE_KID], algorithm=ALGORITHM, headers={"kid": ACTIVE_KID}
+    )
     return encoded_jwt
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verify a token and return its claims. Raises JWTError if the token is
+    invalid, expired or signed with an unknown key.
+    """
+    now = time.time()
+    cached = _verified.get(token)
+    if cached is not None:
+        cached_until, claims = cached
+        if cached_until > now:
+            _verified.move_to_end(token)
+            return claims
+        _verified.pop(token, None)
+
+    kid = jwt.get_unverified_header(token).get("kid", "default")
+    secret = SIGNING_KEYS.get(kid)
+    if secret is None:
+        raise JWTError("Unknown signing key")
+    claims = jwt.decode(token, secret, algorithms=[ALGORITHM])
+
+    # Never cache past the token's own expiry
+    _verified[token] = (min(now + TOKEN_CACHE_TTL, claims.get("exp", now)), claims)
+    if len(_verified) > TOKEN_CACHE_SIZE:
+        _verified.popitem(last=False)
+    return claims
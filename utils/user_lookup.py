@@ -0,0 +1,45 @@
+# utils/user_lookup.py
+# Users are matched case-insensitively on email and username. Rather than
+# regex scans, each user stores casefolded copies (email_key/username_key)
+# behind unique indexes, so lookups are exact-match index seeks.
+
+from pymongo import UpdateOne
+
+from database import users_collection
+from utils.log import get_logger
+
+log = get_logger("users")
+
+MIGRATION_BATCH = 500
+
+
+def lookup_key(value: str) -> str:
+    return (value or "").strip().casefold()
+
+
+def lookup_fields(email: str, username: str) -> dict:
+    return {"email_key": lookup_key(email), "username_key": lookup_key(username)}
+
+
+async def migrate_user_lookup_keys():
+    """Backfill lookup keys on users created before they existed. Safe to rerun."""
+    cursor = users_collection.find(
+        {"$or": [{"email_key": {"$exists": False}}, {"username_key": {"$exists": False}}]},
+        {"email": 1, "username": 1},
+    )
+    ops = []
+    migrated = 0
+    async for user in cursor:
+        ops.append(UpdateOne(
+            {"_id": user["_id"]},
+            {"$set": lookup_fields(user.get("email"), user.get("username"))},
+        ))
+        if len(ops) >= MIGRATION_BATCH:
+            await users_collection.bulk_write(ops, ordered=False)
+            migrated += len(ops)
+            ops = []
+    if ops:
+        await users_collection.bulk_write(ops, ordered=False)
+        migrated += len(ops)
+    if migrated:
+        log.info("backfilled lookup keys", users=migrated)
@@ -0,0 +1,365 @@
+# utils/wardrobe_io.py
+# Wardrobe export/import as NDJSON: one JSON object per line, a header line
+# first, then every item, then every outfit.
+#
+#   {"type": "wardrobe", "format": 1, "users_id": ..., "exported_at": ...}
+#   {"type": "item", "id": ..., "source": ..., "title": ..., ...}
+#   {"type": "outfit", "id": ..., "name": ..., "items": [item ids], ...}
+#
+# Both directions stream. Export reads a Motor cursor in EXPORT_BATCH_SIZE
+# batches and yields ~64 KB chunks, optionally through an incremental gzip
+# compressor. Import parses the upload as it arrives (gzip detected by its
+# magic bytes) and writes IMPORT_CHUNK items at a time with unordered
+# bulk_write. Memory stays flat either way, except for the old->new id map
+# and the outfit lines, which import holds until every item is in.
+#
+# Only the client-facing fields in ITEM_FIELDS/OUTFIT_FIELDS travel; the
+# file is untrusted input, so import type-checks each one and rejects the
+# file at the first bad value. Fields derived from others (search tokens,
+# URL keys, duplicate flags, status) are recomputed on import. Imported items keep their
+# scraped metadata and are not scraped again; only items exported before
+# their scrape finished are queued. Items are matched on their URL key, so
+# importing the same file twice adds nothing the second time.
+
+import zlib
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database import items_collection, outfits_collection
+from utils.canonical_url import canonicalize_url, url_key
+from utils.classifier import classify_items
+from utils.log import get_logger
+from utils.price_refresh import HISTORY_LENGTH as PRICE_HISTORY_LENGTH
+from utils.prices import price_fields
+from utils.responses import GZIP_LEVEL, dumps
+from utils.scrape_queue import scrape_queue
+from utils.search_index import search_tokens
+from utils.wardrobe_stats import record_items_added
+from utils.wardrobe_version import bump_wardrobe_version
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    import json
+    _loads = json.loads
+
+log = get_logger("wardrobe_io")
+
+FORMAT_VERSION = 1
+# Big enough to amortize round trips, small enough to keep one batch in memory
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+IMPORT_CHUNK = 500
+MAX_LINE_BYTES = 1024 * 1024
+
+MAX_STRING = 4096
+MAX_IMAGES = 50
+MAX_OUTFIT_ITEMS = 100
+
+
+def _string(value):
+    if not isinstance(value, str) or len(value) > MAX_STRING:
+        raise ValueError("must be a string")
+    return value
+
+
+def _amount(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value < 1e9:
+        raise ValueError("must be a non-negative number")
+    return float(value)
+
+
+def _currency(value):
+    if not isinstance(value, str) or len(value) != 3 or not value.isalpha():
+        raise ValueError("must be a 3-letter currency code")
+    return value.upper()
+
+
+def _datetime(value):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.rstrip("Z"))
+        except ValueError:
+            pass
+    raise ValueError("must be an ISO 8601 datetime")
+
+
+def _strings(value, limit: int):
+    if not isinstance(value, list) or len(value) > limit:
+        raise ValueError(f"must be a list of at most {limit} strings")
+    return [_string(entry) for entry in value]
+
+
+def _price_history(value):
+    if not isinstance(value, list):
+        raise ValueError("must be a list")
+    return [
+        {"amount": _amount(entry.get("amount")), "currency": _currency(entry.get("currency")), "at": _datetime(entry.get("at"))}
+        for entry in value[-PRICE_HISTORY_LENGTH:] if isinstance(entry, dict)
+    ]
+
+
+# Everything an item carries across accounts, with its validator; anything
+# else in the file (and any null) is dropped
+ITEM_FIELDS = {
+    "source": _string, "ownership": _string, "title": _string, "category": _string, "subcategory": _string,
+    "category_source": _string, "image_url": _string, "images": lambda v: _strings(v, MAX_IMAGES),
+    "site_name": _string, "site_icon_url": _string, "canonical_url": _string, "image_color": _string,
+    "price": _string, "price_amount": _amount, "price_currency": _currency, "price_history": _price_history,
+    "created_at": _datetime, "scraped_at": _datetime,
+}
+OUTFIT_FIELDS = {"name": _string, "items": lambda v: _strings(v, MAX_OUTFIT_ITEMS), "created_at": _datetime}
+ITEM_EXPORT_FIELDS = {field: 1 for field in ITEM_FIELDS}
+OUTFIT_EXPORT_FIELDS = {field: 1 for field in OUTFIT_FIELDS}
+
+
+def _validated(line: dict, fields: dict) -> dict:
+    doc = {}
+    for field, check in fields.items():
+        value = line.get(field)
+        if value is None:
+            continue
+        try:
+            doc[field] = check(value)
+        except (ValueError, TypeError, AttributeError) as e:
+            raise ImportFormatError(f"{field} {e}")
+    return doc
+
+
+class ImportFormatError(ValueError):
+    counts: dict = None
+
+
+def _line(doc: dict, kind: str) -> bytes:
+    doc["id"] = str(doc.pop("_id"))
+    return dumps({"type": kind, **doc}) + b"\n"
+
+
+async def export_wardrobe(users_id: str, compress: bool = False):
+    """Async iterator of NDJSON (or gzip) chunks for one user's items and outfits."""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+    buffer = bytearray()
+
+    def flush() -> bytes:
+        chunk = bytes(buffer)
+        buffer.clear()
+        return compressor.compress(chunk) if compressor else chunk
+
+    buffer += dumps({
+        "type": "wardrobe", "format": FORMAT_VERSION, "users_id": users_id, "exported_at": datetime.utcnow(),
+    }) + b"\n"
+    counts = {"items": 0, "outfits": 0}
+    sources = (
+        ("item", items_collection.find({"users_id": users_id}, ITEM_EXPORT_FIELDS, batch_size=EXPORT_BATCH_SIZE)),
+        ("outfit", outfits_collection.find({"users_id": users_id}, OUTFIT_EXPORT_FIELDS, batch_size=EXPORT_BATCH_SIZE)),
+    )
+    for kind, cursor in sources:
+        async for doc in cursor.sort("_id", 1):
+            buffer += _line(doc, kind)
+            counts[kind + "s"] += 1
+            if len(buffer) >= EXPORT_CHUNK_BYTES:
+                chunk = flush()
+                if chunk:
+                    yield chunk
+    chunk = flush()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+    log.info("wardrobe exported", users_id=users_id, compressed=compress, **counts)
+
+
+async def ndjson_lines(chunks):
+    """(line number, raw line) for each non-blank line of a raw, optionally gzipped, NDJSON stream."""
+    decompressor = None
+    pending = b""
+    first = True
+    number = 0
+    async for chunk in chunks:
+        if first and chunk:
+            first = False
+            if chunk[:2] == b"\x1f\x8b":
+                decompressor = zlib.decompressobj(47)  # gzip or zlib header
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        if len(pending) > MAX_LINE_BYTES:
+            raise ImportFormatError(f"line {number + len(lines) + 1} is longer than {MAX_LINE_BYTES} bytes")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if decompressor:
+        pending += decompressor.flush()
+    if pending.strip():
+        yield number + 1, pending
+
+
+def _item_doc(line: dict, users_id: str, now: datetime):
+    """Validated item document for `line`; None when it has no product URL."""
+    doc = _validated(line, ITEM_FIELDS)
+    source = doc.get("source")
+    if not source or not source.lower().startswith(("http://", "https://")):
+        return None
+    doc["users_id"] = users_id
+    doc["source"] = canonicalize_url(source)
+    doc["source_key"] = url_key(doc["source"])
+    if doc.get("canonical_url"):
+        doc["canonical_key"] = url_key(doc["canonical_url"])
+    doc.setdefault("created_at", now)
+    if doc.get("price") and doc.get("price_amount") is None:
+        doc.update(price_fields(doc["price"]))
+    elif doc.get("price_amount") is not None and not doc.get("price_currency"):
+        # An amount means nothing without its currency
+        doc["price_amount"] = None
+    doc.setdefault("price_amount", None)
+    doc.setdefault("price_currency", None)
+    # Exports taken mid-scrape have nothing to keep; those get scraped here
+    doc["status"] = "ready" if doc.get("title") else "pending"
+    return doc
+
+
+class WardrobeImport:
+    """One import into one user's wardrobe; feed it lines, then finish()."""
+
+    def __init__(self, users_id: str):
+        self.users_id = users_id
+        self.now = datetime.utcnow()
+        self.items = []  # (old id, doc) waiting for the next bulk write
+        self.outfits = []
+        self.id_map = {}  # exported item id -> new item id
+        self.scrape_jobs = []
+        self.counts = {"items_imported": 0, "items_existing": 0, "outfits_imported": 0, "outfits_existing": 0, "skipped": 0}
+
+    async def add(self, line: dict):
+        kind = line.get("type")
+        if kind == "item":
+            doc = _item_doc(line, self.users_id, self.now)
+            if doc is None:
+                self.counts["skipped"] += 1
+                return
+            self.items.append((str(line.get("id") or ""), doc))
+            if len(self.items) >= IMPORT_CHUNK:
+                await self._write_items()
+        elif kind == "outfit":
+            self.outfits.append(_validated(line, OUTFIT_FIELDS))
+        elif kind != "wardrobe":
+            self.counts["skipped"] += 1
+
+    async def _write_items(self):
+        batch, self.items = self.items, []
+        docs = [doc for _, doc in batch]
+        unclassified = [doc for doc in docs if not doc.get("category") and doc.get("category_source") != "user"]
+        for doc, fields in zip(unclassified, await classify_items(unclassified)):
+            doc.update(fields)
+        ops = []
+        for doc in docs:
+            doc["_id"] = ObjectId()
+            doc["search_tokens"] = search_tokens(doc)
+            ops.append(UpdateOne(
+                {"users_id": self.users_id, "source_key": doc["source_key"]}, {"$setOnInsert": doc}, upsert=True,
+            ))
+
+        try:
+            result = await items_collection.bulk_write(ops, ordered=False)
+            upserted = set(result.upserted_ids)
+        except BulkWriteError as e:
+            # Items saved before URL keys existed collide on (users_id, source); matched below
+            upserted = {entry["index"] for entry in e.details.get("upserted", [])}
+
+        inserted = [docs[index] for index in sorted(upserted)]
+        existing = [index for index in range(len(docs)) if index not in upserted]
+        for index in upserted:
+            old_id, doc = batch[index]
+            self.id_map[old_id] = str(doc["_id"])
+            if doc["status"] == "pending":
+                self.scrape_jobs.append((doc["_id"], doc["source"]))
+        if existing:
+            found = {}
+            async for item in items_collection.find(
+                {"users_id": self.users_id, "$or": [
+                    {"source_key": {"$in": [docs[i]["source_key"] for i in existing]}},
+                    {"source": {"$in": [docs[i]["source"] for i in existing]}},
+                ]},
+                {"source_key": 1, "source": 1},
+            ):
+                found[item.get("source_key") or url_key(item["source"])] = str(item["_id"])
+            for index in existing:
+                old_id, doc = batch[index]
+                if doc["source_key"] in found:
+                    self.id_map[old_id] = found[doc["source_key"]]
+        self.counts["items_imported"] += len(inserted)
+        self.counts["items_existing"] += len(existing)
+        if inserted:
+            await record_items_added(self.users_id, inserted)
+
+    async def _write_outfits(self):
+        for start in range(0, len(self.outfits), IMPORT_CHUNK):
+            ops = []
+            for outfit in self.outfits[start:start + IMPORT_CHUNK]:
+                # Only items imported (or matched) in this wardrobe
+                items = list(dict.fromkeys(self.id_map[item_id] for item_id in outfit.get("items", []) if item_id in self.id_map))
+                if not items or not outfit.get("name"):
+                    self.counts["skipped"] += 1
+                    continue
+                outfit.update(users_id=self.users_id, items=items)
+                outfit.setdefault("created_at", self.now)
+                ops.append(UpdateOne(
+                    {"users_id": self.users_id, "name": outfit["name"], "items": items},
+                    {"$setOnInsert": outfit}, upsert=True,
+                ))
+            if ops:
+                result = await outfits_collection.bulk_write(ops, ordered=False)
+                self.counts["outfits_imported"] += result.upserted_count
+                self.counts["outfits_existing"] += len(ops) - result.upserted_count
+        self.outfits = []
+
+    async def finish(self) -> dict:
+        if self.items:
+            await self._write_items()
+        await self._write_outfits()
+        if self.scrape_jobs:
+            await scrape_queue.enqueue_many(self.scrape_jobs)
+        await bump_wardrobe_version(self.users_id)
+        self.counts["scrape_queued"] = len(self.scrape_jobs)
+        return self.counts
+
+
+async def _read(job: WardrobeImport, chunks):
+    try:
+        async for number, raw in ndjson_lines(chunks):
+            try:
+                line = _loads(raw)
+            except ValueError:
+                raise ImportFormatError(f"line {number} is not valid JSON")
+            if not isinstance(line, dict):
+                raise ImportFormatError(f"line {number} is not a JSON object")
+            try:
+                await job.add(line)
+            except ImportFormatError as e:
+                raise ImportFormatError(f"line {number}: {e}")
+    except zlib.error as e:
+        raise ImportFormatError(f"corrupt gzip stream: {e}")
+
+
+async def import_wardrobe(users_id: str, chunks) -> dict:
+    """
+    Import an NDJSON (or gzipped) stream into `users_id`'s wardrobe; returns
+    counts. On a malformed line, ImportFormatError carries the counts for what
+    was written before it (importing the fixed file again skips those).
+    """
+    job = WardrobeImport(users_id)
+    try:
+        await _read(job, chunks)
+    except ImportFormatError as e:
+        e.counts = await job.finish()
+        log.warning("wardrobe import stopped", users_id=users_id, error=str(e), **e.counts)
+        raise
+    counts = await job.finish()
+    log.info("wardrobe imported", users_id=users_id, **counts)
+    return counts
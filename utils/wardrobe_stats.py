@@ -0,0 +1,162 @@
+# utils/wardrobe_stats.py
+# Per-user wardrobe summary (counts by ownership/category/subcategory/retailer
+# and price totals) kept in one document and updated with $inc on every item
+# write, so reading it is a single _id lookup however big the wardrobe is.
+# recompute_user_stats rebuilds it from the items if it ever drifts.
+#
+#     python -m utils.wardrobe_stats --check [users_id ...]
+
+import asyncio
+import sys
+from datetime import datetime
+
+from database import items_collection, user_stats_collection
+
+DIMENSIONS = ("ownership", "category", "subcategory", "site_name")
+# Fields an item needs loaded to compute its contribution
+STAT_FIELDS = {"users_id": 1, "price_amount": 1, "price_currency": 1, **{d: 1 for d in DIMENSIONS}}
+NONE_KEY = "_none"
+
+
+def _encode_key(value) -> str:
+    # Field names can't contain "." or start with "$" (site names do, e.g. asos.com)
+    if value is None or value == "":
+        return NONE_KEY
+    return str(value).replace(".", "．").replace("$", "＄")
+
+
+def _decode_key(key: str):
+    return None if key == NONE_KEY else key.replace("．", ".").replace("＄", "$")
+
+
+def _dimension_value(item: dict, dimension: str):
+    value = item.get(dimension)
+    return value.lower() if dimension == "ownership" and isinstance(value, str) else value
+
+
+def _contribution(item: dict, sign: int) -> dict:
+    inc = {"total": sign}
+    for dimension in DIMENSIONS:
+        inc[f"{dimension}.{_encode_key(_dimension_value(item, dimension))}"] = sign
+    if item.get("price_amount") is not None:
+        path = f"value.{_encode_key(_dimension_value(item, 'ownership'))}.{_encode_key(item.get('price_currency'))}"
+        inc[path] = sign * item["price_amount"]
+    return inc
+
+
+def stats_delta(before: dict = None, after: dict = None) -> dict:
+    """$inc that moves a user's summary from counting `before` to counting `after`."""
+    inc = {}
+    for item, sign in ((before, -1), (after, 1)):
+        if item:
+            for path, value in _contribution(item, sign).items():
+                inc[path] = inc.get(path, 0) + value
+    return {path: value for path, value in inc.items() if value}
+
+
+async def apply_stats_delta(users_id: str, inc: dict):
+    if not users_id or not inc:
+        return
+    await user_stats_collection.update_one(
+        {"_id": users_id},
+        {"$inc": inc, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+async def record_item_change(before: dict = None, after: dict = None):
+    users_id = (after or before or {}).get("users_id")
+    await apply_stats_delta(users_id, stats_delta(before, after))
+
+
+async def record_items_added(users_id: str, items: list):
+    inc = {}
+    for item in items:
+        for path, value in _contribution(item, 1).items():
+            inc[path] = inc.get(path, 0) + value
+    await apply_stats_delta(users_id, inc)
+
+
+def _decode_doc(doc: dict) -> dict:
+    result = {"total": max(doc.get("total", 0), 0)}
+    for dimension in DIMENSIONS:
+        counts = doc.get(dimension) or {}
+        result[dimension] = {
+            _decode_key(key) or "": count for key, count in counts.items() if count > 0
+        }
+    result["value"] = {
+        _decode_key(ownership) or "": {
+            _decode_key(currency) or "": amount for currency, amount in totals.items() if amount
+        }
+        for ownership, totals in (doc.get("value") or {}).items()
+    }
+    return result
+
+
+async def read_user_stats(users_id: str) -> dict:
+    doc = await user_stats_collection.find_one({"_id": users_id})
+    return _decode_doc(doc or {})
+
+
+async def _aggregate_stats(users_id: str) -> dict:
+    facets = {d: [{"$group": {"_id": f"${d}", "count": {"$sum": 1}}}] for d in DIMENSIONS}
+    facets["value"] = [
+        {"$match": {"price_amount": {"$type": "number"}}},
+        {"$group": {
+            "_id": {"ownership": {"$toLower": "$ownership"}, "currency": "$price_currency"},
+            "amount": {"$sum": "$price_amount"},
+        }},
+    ]
+    facets["total"] = [{"$count": "n"}]
+    # Ownership is counted lowercased, like the listing endpoint queries it
+    facets["ownership"] = [{"$group": {"_id": {"$toLower": "$ownership"}, "count": {"$sum": 1}}}]
+
+    result = await items_collection.aggregate([
+        {"$match": {"users_id": users_id}},
+        {"$facet": facets},
+    ]).to_list(length=1)
+    facet = result[0] if result else {}
+
+    doc = {"total": facet["total"][0]["n"] if facet.get("total") else 0}
+    for dimension in DIMENSIONS:
+        doc[dimension] = {_encode_key(row["_id"]): row["count"] for row in facet.get(dimension, [])}
+    doc["value"] = {}
+    for row in facet.get("value", []):
+        ownership = _encode_key(row["_id"].get("ownership"))
+        doc["value"].setdefault(ownership, {})[_encode_key(row["_id"].get("currency"))] = row["amount"]
+    return doc
+
+
+async def recompute_user_stats(users_id: str) -> dict:
+    """Rebuild a user's summary from their items (repair path)."""
+    doc = await _aggregate_stats(users_id)
+    await user_stats_collection.replace_one(
+        {"_id": users_id},
+        {**doc, "updated_at": datetime.utcnow()},
+        upsert=True,
+    )
+    return _decode_doc(doc)
+
+
+async def check_user_stats(users_id: str) -> dict:
+    """Compare the incrementally maintained summary with a fresh aggregation."""
+    stored = await read_user_stats(users_id)
+    actual = _decode_doc(await _aggregate_stats(users_id))
+    return {"consistent": stored == actual, "stored": stored, "actual": actual}
+
+
+async def _main(args):
+    users = args or await items_collection.distinct("users_id")
+    inconsistent = 0
+    for users_id in users:
+        report = await check_user_stats(users_id)
+        if not report["consistent"]:
+            inconsistent += 1
+            print(f"[Stats] {users_id} drifted; stored={report['stored']} actual={report['actual']}")
+    print(f"[Stats] Checked {len(users)} users, {inconsistent} inconsistent")
+    return inconsistent
+
+
+if __name__ == "__main__":
+    argv = [a for a in sys.argv[1:] if a != "--check"]
+    sys.exit(1 if asyncio.run(_main(argv)) else 0)
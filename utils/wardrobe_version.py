@@ -0,0 +1,74 @@
+# utils/wardrobe_version.py
+# A per-user counter bumped on every write to that user's items or outfits.
+# List endpoints derive a weak ETag from it (plus the query string), so a
+# client revalidating with If-None-Match gets a 304 after a single _id
+# lookup instead of a full listing query and serialization.
+
+from datetime import datetime
+from hashlib import blake2b
+
+from pymongo import UpdateOne
+from starlette.responses import Response
+
+from database import wardrobe_versions_collection
+
+# Bump when the listing payload shape changes so old ETags stop matching
+SCHEMA_TAG = "1"
+# Clients may keep a copy but must revalidate it every time
+LIST_CACHE_CONTROL = "private, no-cache"
+
+
+async def bump_wardrobe_version(users_id: str):
+    if not users_id:
+        return
+    await wardrobe_versions_collection.update_one(
+        {"_id": users_id},
+        {"$inc": {"v": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+async def bump_wardrobe_versions(users_ids):
+    """Bump several users at once (background jobs touching many wardrobes)."""
+    ops = [
+        UpdateOne({"_id": users_id}, {"$inc": {"v": 1}, "$set": {"updated_at": datetime.utcnow()}}, upsert=True)
+        for users_id in set(users_ids) if users_id
+    ]
+    if ops:
+        await wardrobe_versions_collection.bulk_write(ops, ordered=False)
+
+
+async def get_wardrobe_version(users_id: str) -> int:
+    doc = await wardrobe_versions_collection.find_one({"_id": users_id}, {"v": 1})
+    return doc.get("v", 0) if doc else 0
+
+
+def listing_key(request) -> str:
+    """Path plus normalized query string: each page/sort/filter is its own representation."""
+    return f"{request.url.path}?{'&'.join(sorted(str(request.query_params).split('&')))}"
+
+
+def wardrobe_etag(version: int, request) -> str:
+    digest = blake2b(listing_key(request).encode("utf-8"), digest_size=6).hexdigest()
+    return f'W/"{SCHEMA_TAG}.{version}.{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request, etag: str) -> bool:
+    """Weak comparison against If-None-Match (RFC 9110 13.1.2)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    ours = _opaque(etag)
+    return any(_opaque(tag) == ours for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL})
+